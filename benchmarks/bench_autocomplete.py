@@ -0,0 +1,182 @@
+#! bench_autocomplete.py
+# Replays keystroke sequences against the autocomplete handlers and reports per keystroke latency
+#
+# Usage: python -m benchmarks.bench_autocomplete [--sizes small,medium,large] [--keystrokes recorded.json]
+#        [--budget-ms 250] [--save-baseline]
+
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, List, Dict
+from dom.data_model import Game
+from dom.game_state_manager import game_states
+from utils.command_autocompletes import player_list_autocomplete, party_list_autocomplete, \
+    dilemma_name_autocomplete, dilemma_choice_autocomplete, player_item_autocomplete, game_item_autocomplete, \
+    player_action_autocomplete, game_action_autocomplete, resource_type_autocomplete
+from benchmarks.bench_runner import BenchmarkSuite, build_parser, finish_suite, quiet_bot_logging, load_json
+from benchmarks.fake_discord import FakeRestClient, FakeGuild, FakeUser, FakeCommand, FakeInteraction, \
+    INTERACTION_ACK_DEADLINE_MS
+from benchmarks.game_generator import SCALE_PRESETS, generate_game, write_game_fixture
+
+AUTOCOMPLETE_GUILD_ID_BASE = 920000000000000000
+
+
+class AutocompleteTarget:
+    def __init__(self, handler: Callable, option_name: str, get_names: Callable[[Game, int], List[str]],
+                 namespace: Callable[[Game], dict] = lambda game: {}):
+        self.handler = handler
+        self.option_name = option_name
+        self.get_names = get_names
+        self.namespace = namespace
+
+
+def get_first_dilemma(game: Game):
+    latest_round = game.get_latest_round()
+    return latest_round.round_dilemmas[0] if latest_round and latest_round.round_dilemmas else None
+
+
+def get_dilemma_choices(game: Game, user_id: int) -> List[str]:
+    dilemma = get_first_dilemma(game)
+    return sorted(dilemma.dilemma_choices) if dilemma else []
+
+
+AUTOCOMPLETE_TARGETS: Dict[str, AutocompleteTarget] = {
+    "player_list_autocomplete": AutocompleteTarget(
+        player_list_autocomplete, "player",
+        lambda game, user_id: [player.player_discord_name for player in game.players]),
+    "party_list_autocomplete": AutocompleteTarget(
+        party_list_autocomplete, "party", lambda game, user_id: [party.party_name for party in game.parties]),
+    "dilemma_name_autocomplete": AutocompleteTarget(
+        dilemma_name_autocomplete, "dilemma_name",
+        lambda game, user_id: [dilemma.dilemma_name for dilemma in game.get_latest_round().round_dilemmas]),
+    "dilemma_choice_autocomplete": AutocompleteTarget(
+        dilemma_choice_autocomplete, "dilemma_choice", get_dilemma_choices,
+        lambda game: {"dilemma_name": get_first_dilemma(game).dilemma_name} if get_first_dilemma(game) else {}),
+    "player_item_autocomplete": AutocompleteTarget(
+        player_item_autocomplete, "item",
+        lambda game, user_id: [item.item_name for item in game.get_player(user_id).player_items]),
+    "game_item_autocomplete": AutocompleteTarget(
+        game_item_autocomplete, "item", lambda game, user_id: [item.item_name for item in game.items]),
+    "player_action_autocomplete": AutocompleteTarget(
+        player_action_autocomplete, "action",
+        lambda game, user_id: [action.action_name for action in game.get_player(user_id).player_actions]),
+    "game_action_autocomplete": AutocompleteTarget(
+        game_action_autocomplete, "action", lambda game, user_id: [action.action_name for action in game.actions]),
+    "resource_type_autocomplete": AutocompleteTarget(
+        resource_type_autocomplete, "resource_type",
+        lambda game, user_id: [definition.resource_name for definition in game.resource_definitions]),
+}
+
+
+def generate_keystrokes(names: List[str], sequences: int, rng: random.Random) -> List[List[str]]:
+    # Each sequence types a name one character at a time, with one typo that is then backspaced over
+    keystroke_sequences = []
+    for name in rng.sample(names, k=min(len(names), sequences)):
+        typed = [""]
+        typo_at = rng.randint(1, len(name)) if name else 0
+        for i in range(1, len(name) + 1):
+            typed.append(name[:i])
+            if i == typo_at:
+                typed.append(name[:i] + rng.choice("qxzj"))
+                typed.append(name[:i])
+        keystroke_sequences.append(typed)
+    return keystroke_sequences
+
+
+async def replay_sequences(guild: FakeGuild, user: FakeUser, target: AutocompleteTarget, namespace: dict,
+                           keystroke_sequences: List[List[str]], replays: int) -> List[float]:
+    timings_ms = []
+    channel = guild.get_channel(guild.id)
+    command = FakeCommand(target.handler.__name__)
+    for keystrokes in keystroke_sequences * replays:
+        for current in keystrokes:
+            interaction = FakeInteraction(guild, channel, user, command,
+                                          data={"options": {target.option_name: current}},
+                                          namespace={**namespace, target.option_name: current})
+            start = time.perf_counter()
+            await target.handler(interaction, current)
+            timings_ms.append((time.perf_counter() - start) * 1000)
+    return timings_ms
+
+
+def pick_user(game: Game) -> FakeUser:
+    # A living player who is part of a dilemma, so every handler has something player specific to return
+    dilemma = get_first_dilemma(game)
+    candidates = [player for player in game.players if not player.is_dead
+                  and (dilemma is None or player.player_id in dilemma.dilemma_player_ids)]
+    player = candidates[0] if candidates else game.players[0]
+    return FakeUser(player.player_id, player.player_discord_name)
+
+
+def bench_size(suite: BenchmarkSuite, size: str, size_index: int, work_dir: str, handler_names: List[str],
+               sequences: int, recorded: Dict[str, List[List[str]]], rest_latency_ms: float, seed: int) -> float:
+    game = generate_game(SCALE_PRESETS[size])
+    game_path = write_game_fixture(game, os.path.join(work_dir, size, "game.json"))
+    guild_id = AUTOCOMPLETE_GUILD_ID_BASE + size_index
+    game_states.game_routes[(guild_id, None)] = game_path
+    loaded_game = suite.run_async(game_states.get_game(guild_id))
+
+    guild = FakeGuild(guild_id, FakeRestClient(latency_ms=rest_latency_ms, jitter_ms=0, route_limit=None))
+    user = pick_user(loaded_game)
+    guild.add_member(user)
+    rng = random.Random(seed)
+
+    worst_p99_ms = 0.0
+    for handler_name in handler_names:
+        target = AUTOCOMPLETE_TARGETS[handler_name]
+        keystroke_sequences = recorded.get(handler_name) or \
+            generate_keystrokes(target.get_names(loaded_game, user.id), sequences, rng)
+        if not keystroke_sequences:
+            continue
+        timings_ms = suite.run_async(replay_sequences(guild, user, target, target.namespace(loaded_game),
+                                                      keystroke_sequences, suite.iterations))
+        worst_p99_ms = max(worst_p99_ms, suite.record(handler_name, size, timings_ms).p99_ms)
+
+    game_states.invalidate(game_path)
+    del game_states.game_routes[(guild_id, None)]
+    return worst_p99_ms
+
+
+def main() -> int:
+    parser = build_parser("Benchmark autocomplete latency by replaying keystrokes", default_sizes="small,medium",
+                          default_iterations=1)
+    parser.add_argument('--handlers', default=','.join(AUTOCOMPLETE_TARGETS),
+                        help="Comma separated autocomplete handlers to replay")
+    parser.add_argument('--sequences', type=int, default=20, help="Generated keystroke sequences per handler")
+    parser.add_argument('--keystrokes', default=None,
+                        help="JSON file of recorded sequences, mapping a handler name to lists of typed values")
+    parser.add_argument('--rest-latency-ms', type=float, default=80,
+                        help="Simulated latency of any REST calls made by a handler")
+    parser.add_argument('--budget-ms', type=float, default=250,
+                        help="p99 latency every handler must stay under, well inside Discord's 3 second deadline")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    handler_names = [handler_name for handler_name in args.handlers.split(',') if handler_name]
+    unknown_handlers = set(handler_names) - set(AUTOCOMPLETE_TARGETS)
+    if unknown_handlers:
+        parser.error(f'Unknown autocomplete handlers: {", ".join(sorted(unknown_handlers))}')
+    recorded = load_json(args.keystrokes, {}) if args.keystrokes else {}
+    quiet_bot_logging()
+
+    suite = BenchmarkSuite("autocomplete", iterations=args.iterations)
+    worst_p99_ms = 0.0
+    with tempfile.TemporaryDirectory(prefix="wolfbot_bench_") as work_dir:
+        for size_index, size in enumerate(filter(None, args.sizes.split(','))):
+            print(f'Autocomplete benchmarks for the {size} game:')
+            worst_p99_ms = max(worst_p99_ms, bench_size(suite, size, size_index, work_dir, handler_names,
+                                                         args.sequences, recorded, args.rest_latency_ms, args.seed))
+
+    exit_code = finish_suite(suite, args)
+    if worst_p99_ms > args.budget_ms:
+        print(f'Worst p99 of {worst_p99_ms:.1f}ms is over the {args.budget_ms:.0f}ms budget '
+              f'(Discord deadline {INTERACTION_ACK_DEADLINE_MS}ms)')
+        return 1
+    print(f'Worst p99 of {worst_p99_ms:.1f}ms is within the {args.budget_ms:.0f}ms budget')
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#! bench_persistence.py
+# Benchmarks the data model persistence path and lookup methods across synthetic game sizes
+#
+# Usage: python -m benchmarks.bench_persistence [--sizes small,medium,large] [--iterations 10] [--save-baseline]
+
+import os
+import sys
+import tempfile
+import dom.data_model as gdm
+from dom.conf_vars import ConfVars as Conf
+from benchmarks.bench_runner import BenchmarkSuite, build_parser, finish_suite, quiet_bot_logging
+from benchmarks.game_generator import SCALE_PRESETS, generate_game, write_game_fixture, write_csv_fixtures
+
+
+def bench_size(suite: BenchmarkSuite, size: str, work_dir: str):
+    game = generate_game(SCALE_PRESETS[size])
+    size_dir = os.path.join(work_dir, size)
+    game_path = write_game_fixture(game, os.path.join(size_dir, "game.json"))
+    fixture_paths = write_csv_fixtures(game, size_dir)
+
+    # write_dom_to_json leaves the dirty sections set, so each setup clears them first as write_game would
+    def dirty_all():
+        game.mark_flushed()
+        game.mark_dirty()
+
+    def dirty_state():
+        game.mark_flushed()
+        game.mark_dirty(gdm.SECTION_STATE)
+
+    suite.bench("write_dom_to_json.full", size, lambda: gdm.write_dom_to_json(game), setup=dirty_all)
+    suite.bench("write_dom_to_json.state_only", size, lambda: gdm.write_dom_to_json(game), setup=dirty_state)
+    suite.bench("read_json_to_dom", size, lambda: gdm.read_json_to_dom(game_path))
+    suite.bench("read_json_to_dom.with_history", size,
+                lambda: gdm.read_json_to_dom(game_path).ensure_history_loaded())
+
+    action_map = gdm.map_action_list(game.actions)
+    item_map = gdm.map_item_list(game.items)
+    attribute_map = gdm.map_attribute_definition_list(game.attribute_definitions)
+    resource_map = gdm.map_resource_definition_list(game.resource_definitions)
+    skill_map = gdm.map_skill_list(game.skills)
+    status_map = gdm.map_status_modifier_list(game.status_modifiers)
+    suite.bench("read_players_file", size, lambda: suite.run_async(
+        gdm.read_players_file(fixture_paths["players"], game_attribute_definitions=attribute_map,
+                              game_resource_definitions=resource_map, game_status_modifiers=status_map,
+                              game_skills=skill_map, game_actions=action_map, game_items=item_map)))
+
+    # Lookups are cheap individually, so each iteration sweeps every key to get a measurable timing
+    player_ids = [player.player_id for player in game.players]
+    action_names = [action.action_name for action in game.actions]
+    item_names = [item.item_name for item in game.items]
+    party_channels = [party.channel_id for party in game.parties]
+    sample_player = game.players[len(game.players) // 2]
+    sample_action_names = [action.action_name for action in sample_player.player_actions]
+
+    suite.bench("Game.get_player.all", size, lambda: [game.get_player(player_id) for player_id in player_ids])
+    suite.bench("Game.get_action.all", size, lambda: [game.get_action(action_name) for action_name in action_names])
+    suite.bench("Game.get_item.all", size, lambda: [game.get_item(item_name) for item_name in item_names])
+    suite.bench("Game.get_party.all", size, lambda: [game.get_party(channel_id) for channel_id in party_channels])
+    suite.bench("Game.get_player_party.all", size, lambda: [game.get_player_party(player) for player in game.players])
+    suite.bench("Game.get_latest_round", size, lambda: [game.get_latest_round() for _ in range(100)])
+    suite.bench("Player.get_action.all", size,
+                lambda: [sample_player.get_action(action_name) for action_name in sample_action_names])
+
+
+def main() -> int:
+    parser = build_parser("Benchmark the data model persistence path", default_sizes="small,medium",
+                          default_iterations=10)
+    args = parser.parse_args()
+
+    # Snapshots and fsyncs measure the disk rather than the data model, so they are left out of these timings
+    Conf.SNAPSHOT_COUNT = 0
+    Conf.WRITE_DURABILITY = 'none'
+    quiet_bot_logging()
+
+    suite = BenchmarkSuite("persistence", iterations=args.iterations)
+    with tempfile.TemporaryDirectory(prefix="wolfbot_bench_") as work_dir:
+        for size in filter(None, args.sizes.split(',')):
+            print(f'Persistence benchmarks for the {size} game:')
+            bench_size(suite, size, work_dir)
+    return finish_suite(suite, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+#! bench_rendering.py
+# Benchmarks message rendering and emoji substitution across catalog sizes and guild emoji map sizes
+#
+# Usage: python -m benchmarks.bench_rendering [--sizes small,medium,large] [--emoji-counts 10,100,500] [--save-baseline]
+
+import sys
+from typing import List
+from dom.data_model import Game
+from utils.message_formatter import construct_action_display, construct_item_display, \
+    construct_player_resources_display_table, uses_to_emoji_map
+from utils.string_decorator import emoji_sub
+from cogs.emoji_manager import get_guild_emojis
+from cogs.voting import construct_vote_report
+from benchmarks.bench_runner import BenchmarkSuite, build_parser, finish_suite, quiet_bot_logging
+from benchmarks.fake_discord import FakeRestClient, FakeGuild, FakeEmoji
+from benchmarks.game_generator import SCALE_PRESETS, generate_game
+
+RENDER_GUILD_ID_BASE = 910000000000000000
+
+
+def get_game_emoji_names(game: Game) -> List[str]:
+    emoji_texts = [definition.emoji_text for definition in game.resource_definitions + game.attribute_definitions
+                   + game.item_type_definitions if definition.emoji_text]
+    emoji_texts.extend(uses_to_emoji_map.values())
+    return sorted({emoji_text.strip(':') for emoji_text in emoji_texts})
+
+
+def build_guild(game: Game, emoji_count: int) -> FakeGuild:
+    # The game's own emojis are always present; the rest pad the map out to the requested size
+    emoji_names = get_game_emoji_names(game)
+    emoji_names.extend(f'filler_emoji_{i}' for i in range(max(emoji_count - len(emoji_names), 0)))
+    # A separate guild id per map size keeps the cached emoji maps from leaking between runs
+    return FakeGuild(RENDER_GUILD_ID_BASE + emoji_count, FakeRestClient(latency_ms=0, jitter_ms=0),
+                     emojis=[FakeEmoji(800000000000000000 + i, name) for i, name in enumerate(emoji_names)])
+
+
+def build_sample_text(game: Game, length: int = 1750) -> str:
+    # Roughly the shape of a rendered action list: prose with an emoji code every few words
+    emoji_codes = [f':{emoji_name}:' for emoji_name in get_game_emoji_names(game)]
+    words = []
+    i = 0
+    while sum(len(word) + 1 for word in words) < length:
+        words.append(emoji_codes[i % len(emoji_codes)] if i % 4 == 0 else f'word{i}')
+        i += 1
+    return ' '.join(words)
+
+
+def bench_size(suite: BenchmarkSuite, size: str, emoji_counts: List[int]):
+    game = generate_game(SCALE_PRESETS[size])
+    latest_round = game.get_latest_round()
+    sample_text = build_sample_text(game)
+
+    for emoji_count in emoji_counts:
+        guild = build_guild(game, emoji_count)
+        emoji_map = suite.run_async(get_guild_emojis(guild))
+        label = f'{size},emojis={emoji_count}'
+
+        suite.bench("emoji_sub", label, lambda: suite.run_async(emoji_sub(text=sample_text, emoji_map=emoji_map)))
+        suite.bench("construct_action_display", label,
+                    lambda: suite.run_async(construct_action_display(guild=guild, game=game, actions=game.actions)))
+        suite.bench("construct_item_display", label,
+                    lambda: suite.run_async(construct_item_display(guild=guild, game=game, items=game.items)))
+        suite.bench("construct_player_resources_display_table", label,
+                    lambda: suite.run_async(construct_player_resources_display_table(players=game.players,
+                                                                                     guild=guild, game=game)))
+        suite.bench("construct_vote_report", label,
+                    lambda: suite.run_async(construct_vote_report(report_name=f'{latest_round.round_number}',
+                                                                  report_type="Round", game=game,
+                                                                  votes=latest_round.votes)))
+
+
+def main() -> int:
+    parser = build_parser("Benchmark message rendering and emoji substitution", default_sizes="small,medium",
+                          default_iterations=10)
+    parser.add_argument('--emoji-counts', default="10,100,500", help="Comma separated guild emoji map sizes")
+    args = parser.parse_args()
+    quiet_bot_logging()
+
+    emoji_counts = [int(emoji_count) for emoji_count in args.emoji_counts.split(',') if emoji_count]
+    suite = BenchmarkSuite("rendering", iterations=args.iterations)
+    for size in filter(None, args.sizes.split(',')):
+        print(f'Rendering benchmarks for the {size} game:')
+        bench_size(suite, size, emoji_counts)
+    return finish_suite(suite, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
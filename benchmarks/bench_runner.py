@@ -0,0 +1,165 @@
+#! bench_runner.py
+# Shared harness for the offline benchmark suites: timing, result history and regression checks against a baseline
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import time
+from typing import Callable, Optional, List, Dict
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_TOLERANCE = 0.25
+
+
+class BenchmarkResult:
+    def __init__(self, name: str, size: str, iterations: int, timings_ms: List[float]):
+        self.name = name
+        self.size = size
+        self.iterations = iterations
+        self.median_ms = statistics.median(timings_ms)
+        self.mean_ms = statistics.fmean(timings_ms)
+        self.min_ms = min(timings_ms)
+        self.max_ms = max(timings_ms)
+        self.p99_ms = sorted(timings_ms)[min(int(round(0.99 * (len(timings_ms) - 1))), len(timings_ms) - 1)]
+        self.stdev_ms = statistics.stdev(timings_ms) if len(timings_ms) > 1 else 0.0
+
+    @property
+    def key(self) -> str:
+        return f'{self.name}[{self.size}]'
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "size": self.size, "iterations": self.iterations,
+                "median_ms": round(self.median_ms, 4), "mean_ms": round(self.mean_ms, 4),
+                "min_ms": round(self.min_ms, 4), "max_ms": round(self.max_ms, 4), "p99_ms": round(self.p99_ms, 4),
+                "stdev_ms": round(self.stdev_ms, 4)}
+
+
+class BenchmarkSuite:
+    def __init__(self, suite_name: str, iterations: int, warmup: int = 1):
+        self.suite_name = suite_name
+        self.iterations = iterations
+        self.warmup = warmup
+        self.results: List[BenchmarkResult] = []
+        # Async targets all run on one loop so the loop's startup cost is not part of any timing
+        self.loop = asyncio.new_event_loop()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def bench(self, name: str, size: str, func: Callable[[], object], setup: Optional[Callable[[], object]] = None,
+              iterations: Optional[int] = None) -> BenchmarkResult:
+        # setup runs before every iteration, outside of the timed region
+        iterations = iterations or self.iterations
+        timings_ms = []
+        for i in range(self.warmup + iterations):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if i >= self.warmup:
+                timings_ms.append(elapsed_ms)
+        return self.record(name, size, timings_ms)
+
+    def record(self, name: str, size: str, timings_ms: List[float]) -> BenchmarkResult:
+        # For suites that time their own samples, such as one sample per replayed keystroke
+        result = BenchmarkResult(name, size, len(timings_ms), timings_ms)
+        self.results.append(result)
+        print(f'  {result.key:<55} median {result.median_ms:10.3f}ms  p99 {result.p99_ms:10.3f}ms  '
+              f'min {result.min_ms:10.3f}ms  stdev {result.stdev_ms:8.3f}ms')
+        return result
+
+    def close(self):
+        self.loop.close()
+
+
+def quiet_bot_logging():
+    # Per call info logging from the code under test would otherwise dominate both the output and the timings
+    logging.getLogger('wolfbot_logger').setLevel(logging.WARNING)
+
+
+def get_git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def load_json(file_path: str, default):
+    if not os.path.isfile(file_path):
+        return default
+    with open(file_path, 'r', encoding="utf8") as json_file:
+        return json.load(json_file)
+
+
+def save_json(file_path: str, json_object):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'w', encoding="utf8") as json_file:
+        json.dump(json_object, json_file, indent=2)
+
+
+def record_history(suite: BenchmarkSuite, history_path: str):
+    history = load_json(history_path, [])
+    history.append({"suite": suite.suite_name,
+                    "timestamp": int(time.time()),
+                    "commit": get_git_commit(),
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": [result.to_dict() for result in suite.results]})
+    save_json(history_path, history)
+
+
+def find_regressions(suite: BenchmarkSuite, baseline_path: str, tolerance: float) -> List[str]:
+    baseline: Dict[str, dict] = load_json(baseline_path, {})
+    regressions = []
+    for result in suite.results:
+        baseline_result = baseline.get(result.key)
+        if baseline_result is None:
+            continue
+        allowed_ms = baseline_result["median_ms"] * (1 + tolerance)
+        if result.median_ms > allowed_ms:
+            regressions.append(f'{result.key}: median {result.median_ms:.3f}ms vs baseline '
+                               f'{baseline_result["median_ms"]:.3f}ms (+{tolerance:.0%} allowed)')
+    return regressions
+
+
+def build_parser(description: str, default_sizes: str, default_iterations: int) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--sizes', default=default_sizes, help="Comma separated game size presets to run")
+    parser.add_argument('--iterations', type=int, default=default_iterations)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Fractional slowdown over the baseline median that counts as a regression")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--no-history', action='store_true', help="Do not append this run to the history file")
+    return parser
+
+
+def finish_suite(suite: BenchmarkSuite, args: argparse.Namespace) -> int:
+    suite.close()
+    history_path = os.path.join(RESULTS_DIR, "history.json")
+    baseline_path = os.path.join(RESULTS_DIR, f'baseline_{suite.suite_name}.json')
+
+    if not args.no_history:
+        record_history(suite, history_path)
+        print(f'Appended results to {history_path}')
+
+    if args.save_baseline:
+        save_json(baseline_path, {result.key: result.to_dict() for result in suite.results})
+        print(f'Saved baseline to {baseline_path}')
+        return 0
+
+    regressions = find_regressions(suite, baseline_path, args.tolerance)
+    if regressions:
+        print(f'Regressions against {baseline_path}:')
+        for regression in regressions:
+            print(f'  {regression}')
+        return 1
+    print(f'No regressions against {baseline_path}' if os.path.isfile(baseline_path)
+          else f'No baseline at {baseline_path}; run with --save-baseline to create one')
+    return 0
@@ -0,0 +1,65 @@
+#! check_import_time.py
+# Measures the import cost of the bot's startup modules with -X importtime and fails when it exceeds a budget
+#
+# Usage: python -m benchmarks.check_import_time [--budget-ms 1500] [--top 15]
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+from cogs import COG_EXTENSIONS
+
+# Modules imported by wolfbot2.py before the cogs are loaded
+CORE_MODULES = ["dom.conf_vars", "bot_logging.logging_manager", "dom.data_model", "dom.game_state_manager",
+                "utils.command_sync"]
+
+DEFAULT_BUDGET_MS = 1500
+
+
+def measure_import_times(modules: List[str]) -> List[Tuple[str, int, int]]:
+    import_statement = '; '.join(f'import {module}' for module in modules)
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', import_statement],
+                            cwd=repo_root, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        raise SystemExit(f'Importing the startup modules failed with exit code {result.returncode}')
+
+    # Lines look like 'import time:   self [us] | cumulative | imported package'
+    import_times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, package = line[len('import time:'):].split('|')
+        # Drop the single space after the separator, keeping the indentation that marks nested imports
+        import_times.append((package[1:].rstrip(), int(self_us), int(cumulative_us)))
+    return import_times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check the bot's startup import time against a budget")
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('IMPORT_BUDGET_MS', DEFAULT_BUDGET_MS)))
+    parser.add_argument('--top', type=int, default=15, help="Number of slowest modules to report")
+    args = parser.parse_args()
+
+    import_times = measure_import_times(CORE_MODULES + COG_EXTENSIONS)
+
+    # Top level imports are the ones without indentation; their cumulative times add up to the total
+    total_us = sum(cumulative_us for package, self_us, cumulative_us in import_times if not package.startswith(' '))
+    slowest = sorted(import_times, key=lambda e: e[1], reverse=True)[:args.top]
+
+    print(f'Slowest modules by self time:')
+    for package, self_us, cumulative_us in slowest:
+        print(f'  {package.strip():<50} self {self_us / 1000:8.1f}ms  cumulative {cumulative_us / 1000:8.1f}ms')
+    print(f'Total startup import time: {total_us / 1000:.1f}ms (budget {args.budget_ms:.0f}ms)')
+
+    if total_us / 1000 > args.budget_ms:
+        print(f'Startup import time is over budget!')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
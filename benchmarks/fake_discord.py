@@ -0,0 +1,274 @@
+#! fake_discord.py
+# Stand-in Discord objects for driving the cogs offline, with simulated REST latency and rate limits
+
+import asyncio
+import itertools
+import random
+import time
+from typing import Optional, List, Dict
+from bot_logging.metrics_manager import time_phase, PHASE_DISCORD_API
+
+# Discord fails an interaction that has not been responded to or deferred within three seconds
+INTERACTION_ACK_DEADLINE_MS = 3000
+MAX_RATE_LIMIT_RETRIES = 5
+
+
+class FakeRateLimited(Exception):
+    def __init__(self, route: str):
+        super().__init__(f'Route {route} was still rate limited after {MAX_RATE_LIMIT_RETRIES} retries')
+        self.route = route
+
+
+class FakeInteractionResponded(Exception):
+    def __init__(self, command_name: str):
+        super().__init__(f'Interaction for {command_name} was already responded to')
+
+
+class RouteBucket:
+    def __init__(self, limit: int, per_seconds: float):
+        self.limit = limit
+        self.per_seconds = per_seconds
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def try_acquire(self) -> Optional[float]:
+        # Returns None when the request may go out, otherwise the seconds until the bucket resets
+        now = time.monotonic()
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.per_seconds
+        if self.remaining > 0:
+            self.remaining -= 1
+            return None
+        return self.reset_at - now
+
+
+class FakeRestClient:
+    def __init__(self, latency_ms: float = 80, jitter_ms: float = 40, route_limit: Optional[int] = 5,
+                 route_limit_seconds: float = 5, rate_limit_chance: float = 0.0, seed: int = 1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.route_limit = route_limit
+        self.route_limit_seconds = route_limit_seconds
+        self.rate_limit_chance = rate_limit_chance
+        self.rng = random.Random(seed)
+        self.buckets: Dict[str, RouteBucket] = {}
+        self.calls: Dict[str, int] = {}
+        self.rate_limited: Dict[str, int] = {}
+        self.rate_limit_wait_ms = 0.0
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    @property
+    def total_rate_limited(self) -> int:
+        return sum(self.rate_limited.values())
+
+    def get_retry_after(self, route: str, bucket_key: str) -> Optional[float]:
+        if self.route_limit is not None:
+            bucket = self.buckets.get(bucket_key)
+            if bucket is None:
+                bucket = self.buckets[bucket_key] = RouteBucket(self.route_limit, self.route_limit_seconds)
+            retry_after = bucket.try_acquire()
+            if retry_after is not None:
+                return retry_after
+        if self.rate_limit_chance and self.rng.random() < self.rate_limit_chance:
+            return self.rng.uniform(0.1, 1.0)
+        return None
+
+    async def request(self, route: str, bucket_key: Optional[str] = None):
+        # Mirrors discord.py's HTTPClient: a 429 is waited out and retried transparently, up to a retry limit
+        self.calls[route] = self.calls.get(route, 0) + 1
+        with time_phase(PHASE_DISCORD_API):
+            for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+                await asyncio.sleep(max(self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms), 0) / 1000)
+                retry_after = self.get_retry_after(route, bucket_key) if bucket_key is not None else None
+                if retry_after is None:
+                    return
+                self.rate_limited[route] = self.rate_limited.get(route, 0) + 1
+                self.rate_limit_wait_ms += retry_after * 1000
+                await asyncio.sleep(retry_after)
+        raise FakeRateLimited(route)
+
+
+class FakeUser:
+    def __init__(self, user_id: int, name: str, manage_guild: bool = False):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.roles = []
+        self.guild_permissions = FakePermissions(manage_guild=manage_guild)
+
+
+class FakePermissions:
+    def __init__(self, manage_guild: bool = False):
+        self.manage_guild = manage_guild
+
+
+class FakeNamespace:
+    # Like app_commands.Namespace, options the user has not filled in yet read as None
+    def __init__(self, options: Optional[dict] = None):
+        self.__dict__.update(options or {})
+
+    def __getattr__(self, name: str):
+        return None
+
+
+class FakeCommand:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class FakeEmoji:
+    def __init__(self, emoji_id: int, name: str):
+        self.id = emoji_id
+        self.name = name
+
+
+class FakeMessage:
+    def __init__(self, channel: 'FakeTextChannel', message_id: int, content: str = ""):
+        self.channel = channel
+        self.id = message_id
+        self.content = content
+        self.pinned = False
+        self.edits = 0
+
+    async def edit(self, content: Optional[str] = None, **kwargs):
+        await self.channel.rest.request("PATCH /channels/{channel_id}/messages/{message_id}",
+                                        bucket_key=f'PATCH {self.channel.id}')
+        if content is not None:
+            self.content = content
+        self.edits += 1
+        return self
+
+    async def pin(self, **kwargs):
+        await self.channel.rest.request("PUT /channels/{channel_id}/pins/{message_id}",
+                                        bucket_key=f'PUT pins {self.channel.id}')
+        self.pinned = True
+
+
+class FakeTextChannel:
+    def __init__(self, guild: 'FakeGuild', channel_id: int, name: str):
+        self.guild = guild
+        self.rest = guild.rest
+        self.id = channel_id
+        self.name = name
+        self.members: List[FakeUser] = []
+        self.messages: Dict[int, FakeMessage] = {}
+
+    def __str__(self) -> str:
+        return self.name
+
+    def get_or_create_message(self, message_id: int) -> FakeMessage:
+        message = self.messages.get(message_id)
+        if message is None:
+            message = self.messages[message_id] = FakeMessage(self, message_id)
+        return message
+
+    async def send(self, content: Optional[str] = None, **kwargs) -> FakeMessage:
+        await self.rest.request("POST /channels/{channel_id}/messages", bucket_key=f'POST {self.id}')
+        message = self.get_or_create_message(self.guild.next_snowflake())
+        message.content = content or ""
+        return message
+
+    async def fetch_message(self, message_id: int) -> FakeMessage:
+        await self.rest.request("GET /channels/{channel_id}/messages/{message_id}", bucket_key=f'GET {self.id}')
+        return self.get_or_create_message(message_id)
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, rest: FakeRestClient, name: str = "Load Test Guild",
+                 emojis: Optional[List[FakeEmoji]] = None):
+        self.id = guild_id
+        self.rest = rest
+        self.name = name
+        self.emojis = emojis if emojis is not None else []
+        self.members: Dict[int, FakeUser] = {}
+        self.channels: Dict[int, FakeTextChannel] = {}
+        self.snowflakes = itertools.count(990000000000000000)
+
+    def next_snowflake(self) -> int:
+        return next(self.snowflakes)
+
+    def add_member(self, member: FakeUser):
+        self.members[member.id] = member
+
+    def get_channel(self, channel_id: int) -> FakeTextChannel:
+        # Every channel id resolves, so game data generated offline never points at a missing channel
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            channel = self.channels[channel_id] = FakeTextChannel(self, channel_id, f'channel-{channel_id}')
+        return channel
+
+    async def fetch_channel(self, channel_id: int) -> FakeTextChannel:
+        await self.rest.request("GET /channels/{channel_id}", bucket_key=f'GET channel {channel_id}')
+        return self.get_channel(channel_id)
+
+    def get_member(self, member_id: int) -> Optional[FakeUser]:
+        return self.members.get(member_id)
+
+    async def fetch_member(self, member_id: int) -> Optional[FakeUser]:
+        await self.rest.request("GET /guilds/{guild_id}/members/{user_id}", bucket_key=f'GET member {self.id}')
+        return self.members.get(member_id)
+
+
+class FakeInteractionResponse:
+    def __init__(self, interaction: 'FakeInteraction'):
+        self.interaction = interaction
+        self.responded = False
+
+    def is_done(self) -> bool:
+        return self.responded
+
+    async def acknowledge(self, content: Optional[str], ephemeral: bool):
+        if self.responded:
+            raise FakeInteractionResponded(self.interaction.command.name)
+        # Interaction callbacks are exempt from the per channel buckets, so they only pay the latency
+        await self.interaction.guild.rest.request("POST /interactions/{interaction_id}/{token}/callback")
+        self.responded = True
+        self.interaction.ack_ms = (time.perf_counter() - self.interaction.created_at) * 1000
+        if content is not None:
+            self.interaction.sent_messages.append((content, ephemeral))
+
+    async def defer(self, ephemeral: bool = False, thinking: bool = False):
+        await self.acknowledge(None, ephemeral)
+
+    async def send_message(self, content: Optional[str] = None, ephemeral: bool = False, **kwargs):
+        await self.acknowledge(content, ephemeral)
+
+
+class FakeFollowup:
+    def __init__(self, interaction: 'FakeInteraction'):
+        self.interaction = interaction
+
+    async def send(self, content: Optional[str] = None, ephemeral: bool = False, **kwargs):
+        await self.interaction.guild.rest.request("POST /webhooks/{application_id}/{token}")
+        self.interaction.sent_messages.append((content, ephemeral))
+
+
+class FakeInteraction:
+    def __init__(self, guild: FakeGuild, channel: FakeTextChannel, user: FakeUser, command, data: Optional[dict] = None,
+                 namespace: Optional[dict] = None):
+        self.guild = guild
+        self.guild_id = guild.id
+        self.channel = channel
+        self.channel_id = channel.id
+        self.user = user
+        self.command = command
+        self.data = data or {}
+        self.namespace = FakeNamespace(namespace)
+        self.response = FakeInteractionResponse(self)
+        self.followup = FakeFollowup(self)
+        self.created_at = time.perf_counter()
+        self.ack_ms: Optional[float] = None
+        self.sent_messages: List[tuple] = []
+
+    @property
+    def first_message(self) -> str:
+        # discord.py sends str(content), so non string content is compared the way the user would see it
+        return str(self.sent_messages[0][0]) if self.sent_messages else ""
+
+    @property
+    def acked_late(self) -> bool:
+        return self.ack_ms is None or self.ack_ms > INTERACTION_ACK_DEADLINE_MS
@@ -0,0 +1,268 @@
+#! game_generator.py
+# Generates deterministic synthetic games, and the CSV and JSON fixtures for them, at a configurable scale
+#
+# Usage: python -m benchmarks.game_generator --out /tmp/big_game [--preset large] [--players 500] [--seed 7] [--csv]
+
+import argparse
+import csv
+import os
+import random
+from typing import List, Dict
+import dom.data_model as gdm
+from dom.data_model import Game, Player, Party, Round, Dilemma, Vote, Action, Item, Resource, ResourceCost, Attribute, \
+    AttributeModifier, AttributeDefinition, ResourceDefinition, ItemTypeDefinition, Skill, StatusModifier
+
+WORDS = ["ash", "bramble", "cinder", "dusk", "ember", "fable", "gloam", "hollow", "iron", "juniper", "kestrel",
+         "lantern", "moss", "nettle", "onyx", "pyre", "quill", "raven", "sable", "thorn", "umber", "vesper", "willow",
+         "yarrow", "zephyr"]
+TIMINGS = ["Day", "Night", "Any"]
+RARITIES = ["Common", "Uncommon", "Rare", "Legendary"]
+CLASSES = ["Common", "Unique", "Rogue", "Seer", "Guard", "Merchant"]
+
+
+class GameScale:
+    def __init__(self, players: int = 20, actions: int = 40, items: int = 40, rounds: int = 5,
+                 votes_per_round: int = 20, dilemmas_per_round: int = 1, parties: int = 4, resources: int = 4,
+                 attributes: int = 4, actions_per_player: int = 5, items_per_player: int = 3, seed: int = 1):
+        self.players = players
+        self.actions = actions
+        self.items = items
+        self.rounds = rounds
+        self.votes_per_round = votes_per_round
+        self.dilemmas_per_round = dilemmas_per_round
+        self.parties = parties
+        self.resources = resources
+        self.attributes = attributes
+        self.actions_per_player = actions_per_player
+        self.items_per_player = items_per_player
+        self.seed = seed
+
+
+SCALE_PRESETS: Dict[str, GameScale] = {
+    "small": GameScale(),
+    "medium": GameScale(players=100, actions=200, items=200, rounds=15, votes_per_round=100, dilemmas_per_round=3,
+                        parties=15, resources=6, attributes=6, actions_per_player=8, items_per_player=6),
+    "large": GameScale(players=500, actions=1000, items=1000, rounds=40, votes_per_round=500, dilemmas_per_round=6,
+                       parties=60, resources=8, attributes=8, actions_per_player=12, items_per_player=10),
+}
+
+
+def make_name(rng: random.Random, index: int, word_count: int = 2) -> str:
+    # The index suffix keeps names unique, which the game relies on for lookups
+    return ' '.join(rng.choice(WORDS).capitalize() for _ in range(word_count)) + f' {index}'
+
+
+def make_sentence(rng: random.Random, word_count: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(word_count)).capitalize() + '.'
+
+
+def generate_game(scale: GameScale) -> Game:
+    rng = random.Random(scale.seed)
+
+    attribute_defs = [AttributeDefinition(attribute_name=f'Attribute {i}', attribute_max=rng.choice([-1, 5, 10]),
+                                          emoji_text=f':attribute_{i}:')
+                      for i in range(scale.attributes)]
+    resource_defs = [ResourceDefinition(resource_name=f'Resource {i}', resource_max=rng.choice([-1, 50, 100]),
+                                        is_commodity=rng.random() < 0.5, is_perishable=rng.random() < 0.25,
+                                        emoji_text=f':resource_{i}:')
+                     for i in range(scale.resources)]
+    item_type_defs = [ItemTypeDefinition(item_type=item_type, is_equippable=item_type != "Consumable",
+                                         max_equippable=1 if item_type != "Consumable" else 0,
+                                         emoji_text=f':{item_type.lower()}:')
+                      for item_type in ("Weapon", "Armor", "Trinket", "Consumable")]
+    skills = [Skill(skill_name=make_name(rng, i), skill_req=None, skill_restrict=None,
+                    skill_desc=make_sentence(rng, 12),
+                    modifies_attributes=[AttributeModifier(att_name=rng.choice(attribute_defs).attribute_name,
+                                                           modification=rng.randint(1, 2))])
+              for i in range(max(scale.attributes * 2, 1))]
+    status_mods = [StatusModifier(modifier_type=rng.choice(["Buff", "Debuff"]), modifier_name=make_name(rng, i),
+                                  modifier_desc=make_sentence(rng, 10), modifier_duration=rng.randint(1, 3),
+                                  modifier_stacks=rng.randint(0, 2),
+                                  modifies_attributes=[
+                                      AttributeModifier(att_name=rng.choice(attribute_defs).attribute_name,
+                                                        modification=rng.choice([-1, 1]))])
+                   for i in range(max(scale.attributes, 1))]
+    actions = [Action(action_name=make_name(rng, i), action_timing=rng.choice(TIMINGS),
+                      action_costs=[ResourceCost(res_name=resource_def.resource_name, amount=rng.randint(1, 5))
+                                    for resource_def in rng.sample(resource_defs, k=min(len(resource_defs),
+                                                                                        rng.randint(0, 2)))],
+                      action_uses=rng.choice([-1, 1, 2, 3]),
+                      action_classes=rng.sample(CLASSES, k=rng.randint(1, 2)),
+                      action_level_req=rng.randint(0, 3), action_priority=rng.randint(1, 100),
+                      action_desc=make_sentence(rng, rng.randint(15, 40)))
+               for i in range(scale.actions)]
+    items = [Item(item_name=make_name(rng, i), item_type=rng.choice(item_type_defs).item_type, item_subtype=None,
+                  item_rarity=rng.choice(RARITIES), item_properties=make_sentence(rng, 4),
+                  item_desc=make_sentence(rng, rng.randint(10, 30)), is_equipped=False,
+                  item_action=rng.choice(actions) if actions and rng.random() < 0.3 else None)
+             for i in range(scale.items)]
+
+    players = []
+    for i in range(scale.players):
+        player_id = 100000000000000000 + i
+        players.append(Player(player_id=player_id, player_discord_name=f'player_{i}_{rng.choice(WORDS)}',
+                              player_mod_channel=200000000000000000 + i,
+                              player_resources=[Resource(resource_type=resource_def.resource_name,
+                                                         resource_amt=rng.randint(0, 30),
+                                                         resource_income=rng.randint(0, 5),
+                                                         resource_max=resource_def.resource_max,
+                                                         is_commodity=resource_def.is_commodity,
+                                                         is_perishable=resource_def.is_perishable)
+                                                for resource_def in resource_defs],
+                              player_attributes=[Attribute(name=attribute_def.attribute_name,
+                                                           level=rng.randint(0, 5),
+                                                           max_level=attribute_def.attribute_max)
+                                                 for attribute_def in attribute_defs],
+                              player_status_mods=rng.sample(status_mods, k=min(len(status_mods), rng.randint(0, 2))),
+                              player_skills=rng.sample(skills, k=min(len(skills), rng.randint(0, 3))),
+                              player_actions=rng.sample(actions, k=min(len(actions), scale.actions_per_player)),
+                              player_items=rng.sample(items, k=min(len(items), scale.items_per_player)),
+                              is_dead=rng.random() < 0.1))
+
+    parties = []
+    shuffled_ids = [player.player_id for player in players]
+    rng.shuffle(shuffled_ids)
+    party_size = max(len(shuffled_ids) // max(scale.parties, 1), 1)
+    for i in range(scale.parties):
+        parties.append(Party(player_ids=set(shuffled_ids[i * party_size:(i + 1) * party_size]),
+                             party_name=f'Party {make_name(rng, i, word_count=1)}', max_size=party_size + 2,
+                             channel_id=300000000000000000 + i))
+
+    rounds = [generate_round(rng, scale, players, round_number) for round_number in range(1, scale.rounds + 1)]
+    if rounds:
+        rounds[-1].is_active_round = True
+
+    game = Game(is_active=True, parties_locked=False, voting_locked=False, items_locked=False,
+                resources_locked=False, players=players, parties=parties, rounds=rounds,
+                attribute_definitions=attribute_defs, resource_definitions=resource_defs,
+                item_type_definitions=item_type_defs, skills=skills, status_modifiers=status_mods, actions=actions,
+                items=items, pi_views=[])
+    return game
+
+
+def generate_round(rng: random.Random, scale: GameScale, players: List[Player], round_number: int) -> Round:
+    base_timestamp = 1700000000 + round_number * 86400
+    voters = rng.sample(players, k=min(len(players), scale.votes_per_round))
+    votes = [Vote(player_id=voter.player_id, choice=str(rng.choice(players).player_id),
+                  timestamp=base_timestamp + rng.randint(0, 86399))
+             for voter in voters]
+
+    dilemmas = []
+    for i in range(scale.dilemmas_per_round):
+        dilemma_players = rng.sample(players, k=min(len(players), max(len(players) // 4, 1)))
+        choices = {f'Choice {make_name(rng, choice_index, word_count=1)}' for choice_index in range(rng.randint(2, 5))}
+        dilemma_votes = [Vote(player_id=player.player_id, choice=rng.choice(sorted(choices)),
+                              timestamp=base_timestamp + rng.randint(0, 86399))
+                         for player in dilemma_players if rng.random() < 0.7]
+        dilemmas.append(Dilemma(dilemma_votes=dilemma_votes, dilemma_name=f'Dilemma {round_number}-{i}',
+                                dilemma_channel_id=400000000000000000 + i,
+                                dilemma_message_id=500000000000000000 + round_number * 100 + i,
+                                dilemma_player_ids={player.player_id for player in dilemma_players},
+                                dilemma_choices=choices, is_active_dilemma=False))
+
+    return Round(votes=votes, round_channel_id=600000000000000000, round_message_id=700000000000000000 + round_number,
+                 round_number=round_number, round_dilemmas=dilemmas, is_active_round=False)
+
+
+def write_csv(file_path: str, field_names: List[str], rows: List[dict]):
+    with open(file_path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=field_names)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_csv_fixtures(game: Game, out_dir: str) -> Dict[str, str]:
+    # Written in the layouts the read_*_file functions expect, so they can drive initialize-game
+    os.makedirs(out_dir, exist_ok=True)
+    fixture_paths = {name: os.path.join(out_dir, f'{name}.csv') for name in
+                     ("attributes", "resources", "item_types", "skills", "status_modifiers", "actions", "items",
+                      "players", "parties")}
+
+    write_csv(fixture_paths["attributes"], ["attribute_name", "attribute_max", "emoji_text"],
+              [{"attribute_name": a.attribute_name, "attribute_max": a.attribute_max, "emoji_text": a.emoji_text}
+               for a in game.attribute_definitions])
+    write_csv(fixture_paths["resources"], ["resource_name", "resource_max", "is_commodity", "is_perishable",
+                                           "emoji_text"],
+              [{"resource_name": r.resource_name, "resource_max": r.resource_max, "is_commodity": r.is_commodity,
+                "is_perishable": r.is_perishable, "emoji_text": r.emoji_text}
+               for r in game.resource_definitions])
+    write_csv(fixture_paths["item_types"], ["item_type", "is_equippable", "max_equippable", "emoji_text"],
+              [{"item_type": t.item_type, "is_equippable": t.is_equippable, "max_equippable": t.max_equippable,
+                "emoji_text": t.emoji_text}
+               for t in game.item_type_definitions])
+    write_csv(fixture_paths["skills"], ["skill_name", "skill_req", "skill_restrict", "skill_desc",
+                                        "modifies_attributes"],
+              [{"skill_name": s.skill_name, "skill_req": s.skill_req or "", "skill_restrict": s.skill_restrict or "",
+                "skill_desc": s.skill_desc,
+                "modifies_attributes": ';'.join(f'{m.att_name}:{m.modification}' for m in s.modifies_attributes)}
+               for s in game.skills])
+    write_csv(fixture_paths["status_modifiers"], ["modifier_type", "modifier_name", "modifier_desc",
+                                                  "modifier_duration", "modifier_stacks", "modifies_attributes"],
+              [{"modifier_type": m.modifier_type, "modifier_name": m.modifier_name, "modifier_desc": m.modifier_desc,
+                "modifier_duration": m.modifier_duration, "modifier_stacks": m.modifier_stacks,
+                "modifies_attributes": ';'.join(f'{a.att_name}:{a.modification}' for a in m.modifies_attributes)}
+               for m in game.status_modifiers])
+    write_csv(fixture_paths["actions"], ["action_name", "action_timing", "action_costs", "action_uses",
+                                         "action_classes", "action_level_req", "action_priority", "action_desc"],
+              [{"action_name": a.action_name, "action_timing": a.action_timing,
+                "action_costs": ';'.join(f'{c.res_name}:{c.amount}' for c in a.action_costs),
+                "action_uses": a.action_uses, "action_classes": ';'.join(a.action_classes),
+                "action_level_req": a.action_level_req, "action_priority": a.action_priority,
+                "action_desc": a.action_desc}
+               for a in game.actions])
+    write_csv(fixture_paths["items"], ["item_name", "item_type", "item_subtype", "item_rarity", "item_properties",
+                                       "item_desc", "is_equipped", "action_name"],
+              [{"item_name": i.item_name, "item_type": i.item_type, "item_subtype": i.item_subtype or "",
+                "item_rarity": i.item_rarity, "item_properties": i.item_properties, "item_desc": i.item_descr,
+                "is_equipped": i.is_equipped, "action_name": i.item_action.action_name if i.item_action else ""}
+               for i in game.items])
+    write_csv(fixture_paths["players"], ["player_id", "name", "mod_channel", "attributes", "resources", "skills",
+                                         "status_modifiers", "actions", "items"],
+              [{"player_id": p.player_id, "name": p.player_discord_name, "mod_channel": p.player_mod_channel,
+                "attributes": ';'.join(f'{a.name}:{a.level}' for a in p.player_attributes),
+                "resources": ';'.join(f'{r.resource_type}:{r.resource_amt}:{r.resource_income}'
+                                      for r in p.player_resources),
+                "skills": ';'.join(s.skill_name for s in p.player_skills),
+                "status_modifiers": ';'.join(m.modifier_name for m in p.player_status_mods),
+                "actions": ';'.join(a.action_name for a in p.player_actions),
+                "items": ';'.join(i.item_name for i in p.player_items)}
+               for p in game.players])
+    write_csv(fixture_paths["parties"], ["name", "player_ids", "max_size", "channel_id"],
+              [{"name": p.party_name, "player_ids": ';'.join(str(player_id) for player_id in sorted(p.player_ids)),
+                "max_size": p.max_size, "channel_id": p.channel_id}
+               for p in game.parties])
+    return fixture_paths
+
+
+def write_game_fixture(game: Game, game_path: str) -> str:
+    os.makedirs(os.path.dirname(game_path) or '.', exist_ok=True)
+    game.file_path = game_path
+    game.mark_dirty()
+    gdm.write_dom_to_json(game=game)
+    game.mark_flushed()
+    return game_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic game and its fixtures")
+    parser.add_argument('--out', required=True, help="Directory the fixtures are written to")
+    parser.add_argument('--preset', choices=sorted(SCALE_PRESETS), default="small")
+    parser.add_argument('--csv', action='store_true', help="Also write the CSV files read by initialize-game")
+    for scale_field, default_value in vars(GameScale()).items():
+        parser.add_argument(f'--{scale_field.replace("_", "-")}', type=type(default_value), default=None)
+    args = parser.parse_args()
+
+    scale = SCALE_PRESETS[args.preset]
+    scale_overrides = {field: getattr(args, field) for field in vars(scale) if getattr(args, field) is not None}
+    scale = GameScale(**{**vars(scale), **scale_overrides})
+
+    game = generate_game(scale)
+    game_path = write_game_fixture(game, os.path.join(args.out, "game.json"))
+    print(f'Wrote game with {len(game.players)} players and {len(game.rounds)} rounds to {game_path}')
+    if args.csv:
+        fixture_paths = write_csv_fixtures(game, args.out)
+        print(f'Wrote CSV fixtures: {", ".join(sorted(fixture_paths.values()))}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+#! load_test.py
+# Drives the voting, action submission and resource transfer commands concurrently against a fake Discord layer
+#
+# Usage: python -m benchmarks.load_test [--preset medium] [--players 40] [--window 10] [--scenarios vote,action]
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Optional, List, Dict
+import dom.data_model as gdm
+from dom.data_model import Game
+from dom.conf_vars import ConfVars as Conf
+from dom.game_state_manager import game_states
+from bot_logging.metrics_manager import track_interaction, format_metrics_summary
+from cogs.voting import VotingManager
+from cogs.moderator_request_management import ModRequestManager
+from cogs.resource_management import ResourceManager
+from benchmarks.bench_runner import quiet_bot_logging, save_json
+from benchmarks.fake_discord import FakeRestClient, FakeGuild, FakeUser, FakeEmoji, FakeInteraction
+from benchmarks.game_generator import SCALE_PRESETS, GameScale, generate_game, write_game_fixture
+
+LOAD_TEST_GUILD_ID = 900000000000000000
+SCENARIOS = ("vote", "action", "transfer")
+# A request counts as applied when the first message sent back to the user starts with these
+SUCCESS_PREFIXES = {"vote": "Registered vote",
+                    "action": "Submitted request for action",
+                    "transfer": "Sent "}
+
+
+class RequestOutcome:
+    def __init__(self, scenario: str, interaction: FakeInteraction, elapsed_ms: float,
+                 error: Optional[Exception] = None):
+        self.scenario = scenario
+        self.elapsed_ms = elapsed_ms
+        self.ack_ms = interaction.ack_ms
+        self.acked_late = interaction.acked_late
+        self.error = error
+        self.succeeded = error is None and interaction.first_message.startswith(SUCCESS_PREFIXES[scenario])
+
+
+def read_game_state(game: Game) -> Dict[str, dict]:
+    latest_round = game.get_latest_round()
+    return {"votes": {vote.player_id: vote.choice for vote in latest_round.votes},
+            "action_uses": {(player.player_id, action.action_name): action.action_uses
+                            for player in game.players for action in player.player_actions},
+            "resources": {(player.player_id, resource.resource_type): resource.resource_amt
+                          for player in game.players for resource in player.player_resources}}
+
+
+class ExpectedState:
+    # The state the game should be in given only the requests that were acknowledged as applied
+    def __init__(self, game: Game):
+        self.initial = read_game_state(game)
+        self.values = read_game_state(game)
+        self.touched: Dict[str, set] = {state_name: set() for state_name in self.values}
+
+    def set(self, state_name: str, key, value):
+        self.values[state_name][key] = value
+        self.touched[state_name].add(key)
+
+    def add(self, state_name: str, key, delta: int):
+        self.set(state_name, key, self.values[state_name][key] + delta)
+
+    def count_lost_updates(self, actual: Dict[str, dict]) -> Dict[str, int]:
+        # A value the user was told about that the game no longer holds, including one later overwritten by a
+        # request that was never acknowledged
+        return {state_name: sum(1 for key in touched_keys
+                                if actual[state_name].get(key) != self.values[state_name].get(key))
+                for state_name, touched_keys in self.touched.items()}
+
+    def count_unacknowledged_changes(self, actual: Dict[str, dict]) -> Dict[str, int]:
+        return {state_name: sum(1 for key in set(initial_values) | set(actual[state_name])
+                                if key not in self.touched[state_name]
+                                and actual[state_name].get(key) != initial_values.get(key))
+                for state_name, initial_values in self.initial.items()}
+
+
+def count_mismatches(expected: Dict[str, dict], actual: Dict[str, dict]) -> Dict[str, int]:
+    return {state_name: sum(1 for key in set(expected_values) | set(actual[state_name])
+                            if expected_values.get(key) != actual[state_name].get(key))
+            for state_name, expected_values in expected.items()}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+class LoadTest:
+    def __init__(self, game: Game, guild: FakeGuild, scenarios: List[str], seed: int):
+        self.game = game
+        self.guild = guild
+        self.scenarios = scenarios
+        self.rng = random.Random(seed)
+        self.expected = ExpectedState(game)
+        self.outcomes: List[RequestOutcome] = []
+        self.voting_cog = VotingManager(bot=None)
+        self.mod_request_cog = ModRequestManager(bot=None)
+        self.resource_cog = ResourceManager(bot=None)
+        self.living_ids = [player.player_id for player in game.players if not player.is_dead]
+
+    async def invoke(self, scenario: str, user: FakeUser, command, cog, **kwargs) -> RequestOutcome:
+        # Commands are invoked through their callbacks, so cooldown checks do not throttle the simulated burst
+        interaction = FakeInteraction(self.guild, self.guild.get_channel(Conf.VOTE_CHANNEL), user, command,
+                                      data={"options": kwargs})
+        error = None
+        try:
+            with track_interaction("command", command.name):
+                await command.callback(cog, interaction, **kwargs)
+        except Exception as e:
+            error = e
+        outcome = RequestOutcome(scenario, interaction, (time.perf_counter() - interaction.created_at) * 1000,
+                                 error)
+        self.outcomes.append(outcome)
+        return outcome
+
+    async def vote(self, user: FakeUser):
+        if self.rng.random() < 0.1:
+            target, other = None, 'No Vote'
+        else:
+            target, other = str(self.rng.choice(self.living_ids)), None
+        outcome = await self.invoke("vote", user, VotingManager.round_vote, self.voting_cog, player=target,
+                                    other=other)
+        if outcome.succeeded:
+            self.expected.set("votes", user.id, target if target is not None else other)
+
+    async def submit_action(self, user: FakeUser):
+        player = self.game.get_player(user.id)
+        if not player.player_actions:
+            return
+        action = self.rng.choice(player.player_actions)
+        target = self.game.get_player(self.rng.choice(self.living_ids)).player_discord_name
+        outcome = await self.invoke("action", user, ModRequestManager.action_submission, self.mod_request_cog,
+                                    action=action.action_name, target1=target, target2=None, target3=None,
+                                    request_details=None)
+        if outcome.succeeded:
+            uses_key = (user.id, action.action_name)
+            # Actions with -1 uses are unlimited
+            if self.expected.values["action_uses"][uses_key] != -1:
+                self.expected.add("action_uses", uses_key, -1)
+            for action_cost in action.action_costs:
+                self.expected.add("resources", (user.id, action_cost.res_name), -action_cost.amount)
+
+    async def transfer(self, user: FakeUser):
+        player = self.game.get_player(user.id)
+        commodities = [resource for resource in player.player_resources if resource.is_commodity]
+        if not commodities or len(self.living_ids) < 2:
+            return
+        resource = self.rng.choice(commodities)
+        recipient_id = self.rng.choice([player_id for player_id in self.living_ids if player_id != user.id])
+        amount = self.rng.randint(1, max(min(resource.resource_amt, 5), 1))
+        outcome = await self.invoke("transfer", user, ResourceManager.resource_transfer, self.resource_cog,
+                                    recipient_player=str(recipient_id), resource_type=resource.resource_type,
+                                    resource_amt=amount)
+        if outcome.succeeded:
+            self.expected.add("resources", (user.id, resource.resource_type), -amount)
+            self.expected.add("resources", (recipient_id, resource.resource_type), amount)
+
+    async def run_player(self, user: FakeUser, request_times: List[float], run_start: float):
+        # A user waits for their previous command to finish before sending the next one, like the Discord client
+        for request_time in request_times:
+            await asyncio.sleep(max(run_start + request_time - time.perf_counter(), 0))
+            scenario = self.rng.choice(self.scenarios)
+            if scenario == "vote":
+                await self.vote(user)
+            elif scenario == "action":
+                await self.submit_action(user)
+            else:
+                await self.transfer(user)
+
+    async def run(self, users: List[FakeUser], requests_per_player: int, window_seconds: float) -> float:
+        run_start = time.perf_counter()
+        await asyncio.gather(*(self.run_player(user, sorted(self.rng.uniform(0, window_seconds)
+                                                            for _ in range(requests_per_player)), run_start)
+                               for user in users))
+        return time.perf_counter() - run_start
+
+
+def prepare_game(scale: GameScale, game_path: str) -> Game:
+    game = generate_game(scale)
+    # Uncapped resources mean transfers and costs never clamp, so every acknowledged change has an exact expected value
+    for resource_definition in game.resource_definitions:
+        resource_definition.resource_max = -1
+    for player in game.players:
+        for resource in player.player_resources:
+            resource.resource_max = -1
+    game.is_active = True
+    game.voting_locked = False
+    game.resources_locked = False
+    write_game_fixture(game, game_path)
+    return game
+
+
+def summarize(outcomes: List[RequestOutcome], elapsed_seconds: float) -> Dict[str, dict]:
+    summary = {}
+    for scenario in sorted({outcome.scenario for outcome in outcomes}):
+        scenario_outcomes = [outcome for outcome in outcomes if outcome.scenario == scenario]
+        latencies = [outcome.elapsed_ms for outcome in scenario_outcomes]
+        ack_latencies = [outcome.ack_ms for outcome in scenario_outcomes if outcome.ack_ms is not None]
+        summary[scenario] = {"requests": len(scenario_outcomes),
+                             "applied": sum(1 for outcome in scenario_outcomes if outcome.succeeded),
+                             "errors": sum(1 for outcome in scenario_outcomes if outcome.error is not None),
+                             "late_acks": sum(1 for outcome in scenario_outcomes if outcome.acked_late),
+                             "throughput_per_s": round(len(scenario_outcomes) / elapsed_seconds, 2),
+                             "p50_ms": round(percentile(latencies, 50), 1),
+                             "p95_ms": round(percentile(latencies, 95), 1),
+                             "p99_ms": round(percentile(latencies, 99), 1),
+                             "max_ms": round(max(latencies), 1),
+                             "ack_p95_ms": round(percentile(ack_latencies, 95), 1)}
+    return summary
+
+
+async def run_load_test(args) -> dict:
+    scale = SCALE_PRESETS[args.preset]
+    with tempfile.TemporaryDirectory(prefix="wolfbot_load_") as work_dir:
+        game_path = os.path.join(work_dir, "game.json")
+        generated_game = prepare_game(scale, game_path)
+
+        game_states.game_routes[(LOAD_TEST_GUILD_ID, None)] = game_path
+        game_states.invalidate(game_path)
+        game = await game_states.get_game(LOAD_TEST_GUILD_ID)
+
+        rest = FakeRestClient(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                              route_limit=args.route_limit or None, route_limit_seconds=args.route_limit_seconds,
+                              rate_limit_chance=args.rate_limit_chance, seed=args.seed)
+        guild = FakeGuild(LOAD_TEST_GUILD_ID, rest,
+                          emojis=[FakeEmoji(800000000000000000 + i, f'resource_{i}') for i in range(scale.resources)])
+        living_players = [player for player in generated_game.players if not player.is_dead][:args.players]
+        users = [FakeUser(player.player_id, player.player_discord_name) for player in living_players]
+        for user in users:
+            guild.add_member(user)
+
+        scenarios = [scenario for scenario in args.scenarios.split(',') if scenario]
+        load_test = LoadTest(game, guild, scenarios, args.seed)
+        elapsed_seconds = await load_test.run(users, args.requests_per_player, args.window)
+
+        memory_state = read_game_state(game)
+        disk_state = read_game_state(gdm.read_json_to_dom(game_path))
+        game_states.invalidate(game_path)
+
+    return {"preset": args.preset,
+            "players": len(users),
+            "elapsed_seconds": round(elapsed_seconds, 3),
+            "throughput_per_s": round(len(load_test.outcomes) / elapsed_seconds, 2),
+            "scenarios": summarize(load_test.outcomes, elapsed_seconds),
+            "rest_calls": rest.total_calls,
+            "rest_rate_limited": rest.total_rate_limited,
+            "rest_rate_limit_wait_ms": round(rest.rate_limit_wait_ms, 1),
+            "rest_calls_by_route": dict(sorted(rest.calls.items())),
+            "lost_updates": load_test.expected.count_lost_updates(disk_state),
+            "unacknowledged_changes": load_test.expected.count_unacknowledged_changes(disk_state),
+            "unpersisted_changes": count_mismatches(memory_state, disk_state),
+            "errors": sorted({f'{type(outcome.error).__name__}: {outcome.error}'
+                              for outcome in load_test.outcomes if outcome.error is not None})}
+
+
+def print_report(report: dict):
+    print(f'Load test of {report["players"]} players on the {report["preset"]} game: '
+          f'{report["elapsed_seconds"]:.2f}s, {report["throughput_per_s"]} requests/s')
+    for scenario, stats in report["scenarios"].items():
+        print(f'  {scenario:<10} {stats["requests"]:5d} requests, {stats["applied"]:5d} applied, '
+              f'{stats["errors"]:4d} errors, {stats["late_acks"]:4d} acks over 3s | p50 {stats["p50_ms"]:8.1f}ms  '
+              f'p95 {stats["p95_ms"]:8.1f}ms  p99 {stats["p99_ms"]:8.1f}ms  max {stats["max_ms"]:8.1f}ms  '
+              f'ack p95 {stats["ack_p95_ms"]:8.1f}ms')
+    print(f'  REST: {report["rest_calls"]} calls, {report["rest_rate_limited"]} rate limited, '
+          f'{report["rest_rate_limit_wait_ms"]:.0f}ms spent waiting out rate limits')
+    for route, calls in report["rest_calls_by_route"].items():
+        print(f'    {route}: {calls}')
+    print(f'  Lost updates (acknowledged but not on disk): {report["lost_updates"]}')
+    print(f'  Unacknowledged changes (on disk but never acknowledged): {report["unacknowledged_changes"]}')
+    print(f'  Unpersisted changes (in memory but not on disk): {report["unpersisted_changes"]}')
+    for error in report["errors"]:
+        print(f'  Error: {error}')
+    for summary_line in format_metrics_summary(limit=10):
+        print(f'  {summary_line}')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test the player facing commands against a fake Discord layer")
+    parser.add_argument('--preset', choices=sorted(SCALE_PRESETS), default="medium")
+    parser.add_argument('--players', type=int, default=40, help="Number of concurrently active players")
+    parser.add_argument('--requests-per-player', type=int, default=1)
+    parser.add_argument('--window', type=float, default=10, help="Seconds over which the requests are spread")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="Comma separated scenarios to mix")
+    parser.add_argument('--latency-ms', type=float, default=80, help="Simulated REST round trip time")
+    parser.add_argument('--jitter-ms', type=float, default=40)
+    parser.add_argument('--route-limit', type=int, default=5,
+                        help="Requests allowed per route and channel before a 429 (0 disables the buckets)")
+    parser.add_argument('--route-limit-seconds', type=float, default=5)
+    parser.add_argument('--rate-limit-chance', type=float, default=0.0,
+                        help="Chance of an additional random 429 on any rate limited route")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json-out', default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    unknown_scenarios = set(filter(None, args.scenarios.split(','))) - set(SCENARIOS)
+    if unknown_scenarios:
+        parser.error(f'Unknown scenarios: {", ".join(sorted(unknown_scenarios))}')
+    quiet_bot_logging()
+
+    report = asyncio.run(run_load_test(args))
+    print_report(report)
+    if args.json_out:
+        save_json(os.path.abspath(args.json_out), report)
+    lost_update_count = sum(report["lost_updates"].values()) + sum(report["unpersisted_changes"].values())
+    return 1 if lost_update_count else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,25 +2,99 @@
 # a class for managing bot_logging across modules
 
 import os
+import json
+import queue
+import atexit
 import logging
+import threading
 import discord
-from logging.handlers import TimedRotatingFileHandler
-from dotenv import load_dotenv
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
+from dom.conf_vars import ConfVars as Conf
 
-load_dotenv()
-BASE_PATH = os.getenv('BASE_PATH')
 
-def create_logger(path):
-    created_logger = logging.getLogger('wolfbot_logger')
+class LazyQueueHandler(QueueHandler):
+    # The stock QueueHandler formats the message before queueing it; skipping that leaves the formatting, and
+    # the str() of any arguments, to the listener thread instead of the event loop
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
 
+
+class SamplingFilter(logging.Filter):
+    # Keeps one of every N records for a sampled level or sample_key, where N comes from the configured rate
+    def __init__(self, sample_rates: dict[str, float]):
+        super().__init__()
+        self.sample_intervals = {key: max(round(1 / rate), 1) for key, rate in sample_rates.items() if rate > 0}
+        self.dropped_keys = {key for key, rate in sample_rates.items() if rate <= 0}
+        self.seen_counts: dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        sample_key = getattr(record, 'sample_key', None) or record.levelname
+        if sample_key in self.dropped_keys:
+            return False
+        sample_interval = self.sample_intervals.get(sample_key, 1)
+        if sample_interval == 1:
+            return True
+        seen_count = self.seen_counts.get(sample_key, 0)
+        self.seen_counts[sample_key] = seen_count + 1
+        return seen_count % sample_interval == 0
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        log_entry = {"time": self.formatTime(record, self.datefmt),
+                     "level": record.levelname,
+                     "message": record.getMessage()}
+        if record.exc_info:
+            log_entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(log_entry, ensure_ascii=False, default=str)
+
+
+def parse_sample_rates(sample_rates: str) -> dict[str, float]:
+    # Rates look like 'DEBUG=0.1,autocomplete=0.05'; keys are level names or a record's sample_key
+    parsed_rates = {}
+    for sample_rate in sample_rates.split(','):
+        if '=' not in sample_rate:
+            continue
+        sample_key, rate = sample_rate.split('=', 1)
+        parsed_rates[sample_key.strip()] = float(rate)
+    return parsed_rates
+
+
+class DeferredSetupHandler(logging.Handler):
+    # Stands in for the real handlers until the first record arrives, so the configuration is read, the log file set
+    # up and the listener thread started on first use rather than on import
+    def __init__(self, target_logger: logging.Logger):
+        super().__init__()
+        self.target_logger = target_logger
+        self.setup_lock = threading.Lock()
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        with self.setup_lock:
+            if self in self.target_logger.handlers:
+                self.target_logger.removeHandler(self)
+                add_log_handlers(self.target_logger, Conf.BASE_PATH)
+        for handler in self.target_logger.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+    def emit(self, record: logging.LogRecord):
+        pass
+
+
+def add_log_handlers(target_logger: logging.Logger, path):
     file_path = os.path.join(path, "wolfbot_log.txt")
 
     handler = TimedRotatingFileHandler(file_path,
                                        when="d",
                                        interval=1,
-                                       backupCount=15)
-    fmt = '[%(asctime)s] [%(levelname)s] - %(message)s'
-    formatter = logging.Formatter(fmt=fmt, datefmt='%Y%m%d %H:%M:%S')
+                                       backupCount=15,
+                                       delay=True)
+    if Conf.LOG_FORMAT == 'json':
+        formatter = JsonFormatter(datefmt='%Y%m%d %H:%M:%S')
+    else:
+        fmt = '[%(asctime)s] [%(levelname)s] - %(message)s'
+        formatter = logging.Formatter(fmt=fmt, datefmt='%Y%m%d %H:%M:%S')
     handler.setFormatter(formatter)
     handler.setLevel(logging.INFO)
 
@@ -28,14 +102,19 @@ def create_logger(path):
     console.setFormatter(formatter)
     console.setLevel(logging.INFO)
 
-    created_logger.addHandler(handler)
-    created_logger.addHandler(console)
-    created_logger.setLevel(logging.INFO)
+    # Disk and console writes happen on the listener's thread so logging never blocks the event loop
+    log_queue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(parse_sample_rates(Conf.LOG_SAMPLE_RATES)))
+    listener = QueueListener(log_queue, handler, console, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
 
-    return created_logger
+    target_logger.addHandler(queue_handler)
 
 def log_interaction_call(interaction: discord.Interaction):
-    logger.info(f'Received command {interaction.command.name} with parameters {interaction.data} initiated by user {interaction.user.name}')
+    logger.info('Received command %s with parameters %s initiated by user %s',
+                interaction.command.name, interaction.data, interaction.user.name)
 
 def log_info(msg: str):
     logger.info(msg)
@@ -46,4 +125,6 @@ def log_warning(msg: str):
 def log_error(msg: str):
     logger.error(msg)
 
-logger = create_logger(BASE_PATH)
+logger = logging.getLogger('wolfbot_logger')
+logger.setLevel(logging.INFO)
+logger.addHandler(DeferredSetupHandler(logger))
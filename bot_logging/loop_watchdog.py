@@ -0,0 +1,69 @@
+#! loop_watchdog.py
+# Watches the event loop for blocking code and reports what was running when it stalled
+
+import asyncio
+import faulthandler
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+import bot_logging.metrics_manager as metrics
+from bot_logging.logging_manager import logger
+
+
+class LoopWatchdog:
+    def __init__(self, lag_threshold_ms: float, stall_dump_seconds: int, heartbeat_interval: float = 0.5):
+        self.lag_threshold_ms = lag_threshold_ms
+        self.stall_dump_seconds = stall_dump_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.last_heartbeat = time.monotonic()
+        self.loop_thread_id: Optional[int] = None
+        self.heartbeat_task: Optional[asyncio.Task] = None
+        self.watch_thread: Optional[threading.Thread] = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        self.loop_thread_id = threading.get_ident()
+        self.last_heartbeat = time.monotonic()
+        self.heartbeat_task = asyncio.get_running_loop().create_task(self.heartbeat())
+        # The loop cannot report on itself while it is blocked, so stalls are caught from a separate thread
+        self.watch_thread = threading.Thread(target=self.watch, name="loop-watchdog", daemon=True)
+        self.watch_thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.heartbeat_task is not None:
+            self.heartbeat_task.cancel()
+        if self.stall_dump_seconds > 0:
+            faulthandler.cancel_dump_traceback_later()
+
+    async def heartbeat(self):
+        while True:
+            sleep_start = time.perf_counter()
+            await asyncio.sleep(self.heartbeat_interval)
+            # A sleep that wakes up late means something held the event loop; the overshoot is the lag
+            lag_ms = max((time.perf_counter() - sleep_start - self.heartbeat_interval) * 1000, 0.0)
+            metrics.event_loop_lag_ms = lag_ms
+            self.last_heartbeat = time.monotonic()
+            if lag_ms > self.lag_threshold_ms:
+                logger.warning(f'Event loop was blocked for {lag_ms:.0f}ms; most recent interaction was '
+                               f'{metrics.last_interaction_name}')
+            # Last resort for hard hangs: faulthandler dumps every thread's stack if the loop stops re-arming it
+            if self.stall_dump_seconds > 0:
+                faulthandler.dump_traceback_later(self.stall_dump_seconds, exit=False)
+
+    def watch(self):
+        reported_heartbeat = None
+        check_interval = max(self.lag_threshold_ms / 2000, 0.05)
+        while not self.stopped.wait(check_interval):
+            heartbeat = self.last_heartbeat
+            stalled_ms = (time.monotonic() - heartbeat - self.heartbeat_interval) * 1000
+            if stalled_ms <= self.lag_threshold_ms or heartbeat == reported_heartbeat:
+                continue
+            # Only one report per stall; the stack is taken while the loop is still blocked so it shows the culprit
+            reported_heartbeat = heartbeat
+            loop_frame = sys._current_frames().get(self.loop_thread_id)
+            loop_stack = ''.join(traceback.format_stack(loop_frame)) if loop_frame is not None else 'unavailable'
+            logger.warning(f'Event loop has been blocked for over {stalled_ms:.0f}ms; most recent interaction was '
+                           f'{metrics.last_interaction_name}. Event loop stack:\n{loop_stack}')
@@ -0,0 +1,252 @@
+#! metrics_manager.py
+# Collects per command latency, phase timing and error metrics for app commands, autocompletes and buttons
+
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, List, Dict
+import discord
+from discord import app_commands
+from bot_logging.logging_manager import logger
+
+# Upper bounds of the latency histogram buckets in milliseconds; the last bucket catches everything slower
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf'))
+
+PHASE_TOTAL = "total"
+PHASE_STATE_LOAD = "state_load"
+PHASE_PERSIST = "persist"
+PHASE_DISCORD_API = "discord_api"
+# Whatever is left of the total once the measured phases are taken out: validation, mutation and formatting
+PHASE_HANDLER = "handler"
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.bucket_counts: List[int] = [0] * len(LATENCY_BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float):
+        for i, bucket_bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bucket_bound:
+                self.bucket_counts[i] += 1
+                break
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, pct: float) -> float:
+        # Estimated as the upper bound of the bucket holding the requested rank, capped at the observed max
+        if self.count == 0:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        for bucket_bound, bucket_count in zip(LATENCY_BUCKETS_MS, self.bucket_counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(bucket_bound, self.max_ms)
+        return self.max_ms
+
+    def mean(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
+
+
+class CommandMetrics:
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.cooldowns = 0
+        self.phases: Dict[str, LatencyHistogram] = {}
+
+    def observe_phase(self, phase: str, elapsed_ms: float):
+        self.phases.setdefault(phase, LatencyHistogram()).observe(elapsed_ms)
+
+
+class InteractionTimer:
+    def __init__(self, metrics: CommandMetrics):
+        self.metrics = metrics
+        self.start = time.perf_counter()
+        self.phase_ms: Dict[str, float] = {}
+
+    def add_phase(self, phase: str, elapsed_ms: float):
+        self.phase_ms[phase] = self.phase_ms.get(phase, 0.0) + elapsed_ms
+
+    def finish(self):
+        global interactions_completed
+        interactions_completed += 1
+        total_ms = (time.perf_counter() - self.start) * 1000
+        self.metrics.calls += 1
+        self.metrics.observe_phase(PHASE_TOTAL, total_ms)
+        for phase, elapsed_ms in self.phase_ms.items():
+            self.metrics.observe_phase(phase, elapsed_ms)
+        self.metrics.observe_phase(PHASE_HANDLER, max(total_ms - sum(self.phase_ms.values()), 0.0))
+
+
+command_metrics: Dict[str, CommandMetrics] = {}
+current_timer: ContextVar[Optional[InteractionTimer]] = ContextVar('current_timer', default=None)
+metrics_since = time.time()
+
+# Process wide gauges and counters that are not tied to a single command
+game_write_latency = LatencyHistogram()
+game_write_bytes = 0
+cache_hits: Dict[str, int] = {}
+cache_misses: Dict[str, int] = {}
+http_requests_in_flight = 0
+event_loop_lag_ms = 0.0
+interactions_completed = 0
+# Name of the interaction most recently started, readable from the loop watchdog thread
+last_interaction_name = "none"
+
+
+def get_command_metrics(kind: str, name: str) -> CommandMetrics:
+    metrics_key = f'{kind}:{name}'
+    metrics = command_metrics.get(metrics_key)
+    if metrics is None:
+        metrics = command_metrics[metrics_key] = CommandMetrics(kind, name)
+    return metrics
+
+
+@contextmanager
+def track_interaction(kind: str, name: str):
+    global last_interaction_name
+    last_interaction_name = f'{kind} {name}'
+    timer = InteractionTimer(get_command_metrics(kind, name))
+    token = current_timer.set(timer)
+    try:
+        yield timer
+    except Exception:
+        timer.metrics.errors += 1
+        raise
+    finally:
+        current_timer.reset(token)
+        timer.finish()
+
+
+@contextmanager
+def time_phase(phase: str):
+    # Attributes the enclosed time to a phase of the interaction currently being handled, if there is one
+    timer = current_timer.get()
+    phase_start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timer is not None:
+            timer.add_phase(phase, (time.perf_counter() - phase_start) * 1000)
+
+
+def record_game_write(elapsed_ms: float, bytes_written: int):
+    global game_write_bytes
+    game_write_latency.observe(elapsed_ms)
+    game_write_bytes += bytes_written
+
+
+def record_cache_lookup(cache_name: str, hit: bool):
+    cache_counts = cache_hits if hit else cache_misses
+    cache_counts[cache_name] = cache_counts.get(cache_name, 0) + 1
+
+
+def record_error(kind: str, name: str, error: Exception):
+    metrics = get_command_metrics(kind, name)
+    if isinstance(error, app_commands.CommandOnCooldown):
+        metrics.cooldowns += 1
+    else:
+        metrics.errors += 1
+
+
+def instrumented_button(func):
+    # Wraps a discord.ui.button callback so it is tracked like an app command
+    @functools.wraps(func)
+    async def wrapper(self, interaction: discord.Interaction, button: discord.ui.Button):
+        with track_interaction("button", func.__name__):
+            return await func(self, interaction, button)
+    return wrapper
+
+
+def instrument_http_client(http_client):
+    # Every REST call made by discord.py goes through HTTPClient.request, which makes it the one place to time them
+    original_request = http_client.request
+
+    async def timed_request(*args, **kwargs):
+        global http_requests_in_flight
+        http_requests_in_flight += 1
+        try:
+            with time_phase(PHASE_DISCORD_API):
+                return await original_request(*args, **kwargs)
+        finally:
+            http_requests_in_flight -= 1
+
+    http_client.request = timed_request
+
+
+def instrument_webhook_adapter():
+    # Interaction responses and followups skip HTTPClient and go through the webhook adapter instead; they are most of
+    # a command's Discord time, so its request method is timed under the same phase
+    try:
+        from discord.webhook.async_ import AsyncWebhookAdapter
+    except ImportError:
+        logger.warning('Could not instrument interaction responses; their time is counted as handler time')
+        return
+    original_request = AsyncWebhookAdapter.request
+    if getattr(original_request, 'is_instrumented', False):
+        return
+
+    @functools.wraps(original_request)
+    async def timed_request(self, *args, **kwargs):
+        global http_requests_in_flight
+        http_requests_in_flight += 1
+        try:
+            with time_phase(PHASE_DISCORD_API):
+                return await original_request(self, *args, **kwargs)
+        finally:
+            http_requests_in_flight -= 1
+
+    timed_request.is_instrumented = True
+    AsyncWebhookAdapter.request = timed_request
+
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    async def _call(self, interaction: discord.Interaction):
+        kind = "autocomplete" if interaction.type == discord.InteractionType.autocomplete else "command"
+        command_name = (interaction.data or {}).get("name", "unknown")
+        if kind == "autocomplete":
+            # Autocompletes fire on every keystroke, so these records are sampled by the logging pipeline
+            logger.info('Autocomplete for %s requested by user %s', command_name, interaction.user.name,
+                        extra={"sample_key": "autocomplete"})
+        with track_interaction(kind, command_name):
+            await super()._call(interaction)
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        command_name = (interaction.data or {}).get("name", "unknown")
+        record_error("command", command_name, error)
+        if isinstance(error, app_commands.CommandOnCooldown):
+            await interaction.response.send_message(
+                f"Cooldown is in force, please wait for {round(error.retry_after)} seconds", ephemeral=True)
+            return
+        await super().on_error(interaction, error)
+
+
+def format_metrics_summary(limit: int = 20) -> List[str]:
+    summary_lines = [f'Command metrics since {time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(metrics_since))}']
+    ranked_metrics = sorted(command_metrics.values(),
+                            key=lambda e: e.phases[PHASE_TOTAL].total_ms if PHASE_TOTAL in e.phases else 0.0,
+                            reverse=True)
+    for metrics in ranked_metrics[:limit]:
+        total = metrics.phases.get(PHASE_TOTAL, LatencyHistogram())
+        phase_means = ', '.join(f'{phase} {histogram.mean():.0f}'
+                                for phase, histogram in metrics.phases.items() if phase != PHASE_TOTAL)
+        summary_lines.append(f'{metrics.kind} {metrics.name}: {metrics.calls} calls, {metrics.errors} errors, '
+                             f'{metrics.cooldowns} cooldowns, p50 {total.percentile(50):.0f}ms, '
+                             f'p95 {total.percentile(95):.0f}ms, max {total.max_ms:.0f}ms '
+                             f'(mean ms by phase: {phase_means})')
+    return summary_lines
+
+
+def log_metrics_summary():
+    if not command_metrics:
+        return
+    for summary_line in format_metrics_summary():
+        logger.info(summary_line)
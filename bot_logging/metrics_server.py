@@ -0,0 +1,98 @@
+#! metrics_server.py
+# Serves the collected bot metrics over a local HTTP endpoint in the Prometheus text exposition format
+
+import math
+from typing import List, Optional
+from aiohttp import web
+from discord.ext import commands
+import bot_logging.metrics_manager as metrics
+from bot_logging.metrics_manager import LatencyHistogram, LATENCY_BUCKETS_MS
+from bot_logging.logging_manager import logger
+
+
+def escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label(str(value))}"' for key, value in labels.items()) + '}'
+
+
+def histogram_lines(metric_name: str, histogram: LatencyHistogram, labels: dict[str, str]) -> List[str]:
+    # Prometheus histograms are cumulative and measured in seconds
+    lines = []
+    cumulative_count = 0
+    for bucket_bound, bucket_count in zip(LATENCY_BUCKETS_MS, histogram.bucket_counts):
+        cumulative_count += bucket_count
+        bucket_label = '+Inf' if math.isinf(bucket_bound) else f'{bucket_bound / 1000:g}'
+        lines.append(f'{metric_name}_bucket{format_labels({**labels, "le": bucket_label})} {cumulative_count}')
+    lines.append(f'{metric_name}_sum{format_labels(labels)} {histogram.total_ms / 1000:.6f}')
+    lines.append(f'{metric_name}_count{format_labels(labels)} {histogram.count}')
+    return lines
+
+
+def render_metrics(bot: commands.Bot) -> str:
+    lines = ['# HELP wolfbot_interaction_seconds Interaction latency by phase',
+             '# TYPE wolfbot_interaction_seconds histogram']
+    for command in metrics.command_metrics.values():
+        for phase, histogram in command.phases.items():
+            lines.extend(histogram_lines('wolfbot_interaction_seconds', histogram,
+                                         {"kind": command.kind, "name": command.name, "phase": phase}))
+
+    lines.extend(['# HELP wolfbot_interaction_errors_total Interactions that raised an error',
+                  '# TYPE wolfbot_interaction_errors_total counter'])
+    for command in metrics.command_metrics.values():
+        lines.append(f'wolfbot_interaction_errors_total{format_labels({"kind": command.kind, "name": command.name})} '
+                     f'{command.errors}')
+    lines.extend(['# HELP wolfbot_interaction_cooldowns_total Interactions rejected by a cooldown',
+                  '# TYPE wolfbot_interaction_cooldowns_total counter'])
+    for command in metrics.command_metrics.values():
+        lines.append(f'wolfbot_interaction_cooldowns_total{format_labels({"kind": command.kind, "name": command.name})} '
+                     f'{command.cooldowns}')
+
+    lines.extend(['# HELP wolfbot_game_write_seconds Time spent writing game state to disk',
+                  '# TYPE wolfbot_game_write_seconds histogram'])
+    lines.extend(histogram_lines('wolfbot_game_write_seconds', metrics.game_write_latency, {}))
+    lines.extend(['# HELP wolfbot_game_write_bytes_total Bytes of game state written to disk',
+                  '# TYPE wolfbot_game_write_bytes_total counter',
+                  f'wolfbot_game_write_bytes_total {metrics.game_write_bytes}'])
+
+    lines.extend(['# HELP wolfbot_cache_lookups_total Cache lookups by result',
+                  '# TYPE wolfbot_cache_lookups_total counter'])
+    for cache_name in sorted(set(metrics.cache_hits) | set(metrics.cache_misses)):
+        lines.append(f'wolfbot_cache_lookups_total{format_labels({"cache": cache_name, "result": "hit"})} '
+                     f'{metrics.cache_hits.get(cache_name, 0)}')
+        lines.append(f'wolfbot_cache_lookups_total{format_labels({"cache": cache_name, "result": "miss"})} '
+                     f'{metrics.cache_misses.get(cache_name, 0)}')
+
+    lines.extend(['# HELP wolfbot_http_requests_in_flight Discord REST requests waiting on a response',
+                  '# TYPE wolfbot_http_requests_in_flight gauge',
+                  f'wolfbot_http_requests_in_flight {metrics.http_requests_in_flight}'])
+    gateway_latency = bot.latency if bot.latency is not None and not math.isnan(bot.latency) else 0.0
+    lines.extend(['# HELP wolfbot_gateway_latency_seconds Heartbeat latency to the discord gateway',
+                  '# TYPE wolfbot_gateway_latency_seconds gauge',
+                  f'wolfbot_gateway_latency_seconds {gateway_latency:.6f}'])
+    lines.extend(['# HELP wolfbot_event_loop_lag_seconds How late the event loop last woke a sleeping task',
+                  '# TYPE wolfbot_event_loop_lag_seconds gauge',
+                  f'wolfbot_event_loop_lag_seconds {metrics.event_loop_lag_ms / 1000:.6f}'])
+    return '\n'.join(lines) + '\n'
+
+
+async def start_metrics_server(bot: commands.Bot, host: str, port: int) -> Optional[web.AppRunner]:
+    async def metrics_handler(request: web.Request) -> web.Response:
+        return web.Response(text=render_metrics(bot), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host=host, port=port).start()
+    except OSError as e:
+        logger.error(f'Could not start the metrics endpoint on {host}:{port}\n{e}')
+        await runner.cleanup()
+        return None
+    logger.info(f'Serving metrics on http://{host}:{port}/metrics')
+    return runner
@@ -0,0 +1,108 @@
+#! profiling_manager.py
+# Runs cProfile and tracemalloc against the live bot for a bounded window and writes the results to a report file
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from typing import Optional, List
+import bot_logging.metrics_manager as metrics
+from bot_logging.logging_manager import logger
+from dom.conf_vars import ConfVars as Conf
+
+PROFILE_DIR_NAME = "profiles"
+
+# cProfile can only have one active profiler per thread, so sessions are serialized
+profile_lock = asyncio.Lock()
+
+
+class ProfileResult:
+    def __init__(self, report_path: str, elapsed_seconds: float, interactions: int, summary_lines: List[str]):
+        self.report_path = report_path
+        self.elapsed_seconds = elapsed_seconds
+        self.interactions = interactions
+        self.summary_lines = summary_lines
+
+
+def is_profiling() -> bool:
+    return profile_lock.locked()
+
+
+async def wait_for_window(seconds: int, interaction_limit: Optional[int]):
+    # Ends after the given number of seconds, or earlier once enough interactions have completed
+    window_end = time.monotonic() + seconds
+    start_count = metrics.interactions_completed
+    while time.monotonic() < window_end:
+        if interaction_limit is not None and metrics.interactions_completed - start_count >= interaction_limit:
+            return
+        await asyncio.sleep(0.25)
+
+
+def format_top_functions(profiler: cProfile.Profile, sort_key: str, limit: int) -> str:
+    stats_output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stats_output)
+    stats.strip_dirs().sort_stats(sort_key).print_stats(limit)
+    return stats_output.getvalue()
+
+
+def summarize_top_functions(profiler: cProfile.Profile, limit: int) -> List[str]:
+    stats = pstats.Stats(profiler)
+    # Each stats entry maps (file, line, function) to (calls, primitive calls, total time, cumulative time, callers)
+    ranked_entries = sorted(stats.stats.items(), key=lambda e: e[1][2], reverse=True)[:limit]
+    return [f'{os.path.basename(file_name)}:{line_number} {function_name} - {total_time * 1000:.1f}ms own time, '
+            f'{call_count} calls'
+            for (file_name, line_number, function_name), (primitive_calls, call_count, total_time, cumulative_time,
+                                                           callers) in ranked_entries]
+
+
+def write_report(report_path: str, report_sections: List[str]):
+    os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    with open(report_path, 'w', encoding="utf8") as report_file:
+        report_file.write('\n\n'.join(report_sections))
+
+
+async def run_profile(seconds: int, interaction_limit: Optional[int] = None, limit: int = 10) -> ProfileResult:
+    async with profile_lock:
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start()
+        # Snapshots of a large heap take a while to gather and compare, so they run off the event loop thread
+        memory_before = await asyncio.to_thread(tracemalloc.take_snapshot)
+        start_count = metrics.interactions_completed
+        start_time = time.perf_counter()
+
+        # The profiler is enabled on the event loop thread, so it sees every callback the loop runs in the window
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await wait_for_window(seconds, interaction_limit)
+        finally:
+            profiler.disable()
+            elapsed_seconds = time.perf_counter() - start_time
+            try:
+                memory_after = await asyncio.to_thread(tracemalloc.take_snapshot)
+            finally:
+                if started_tracemalloc:
+                    tracemalloc.stop()
+
+        interactions = metrics.interactions_completed - start_count
+        allocation_diff = await asyncio.to_thread(memory_after.compare_to, memory_before, 'lineno')
+
+        report_sections = [f'Profile of {elapsed_seconds:.1f}s covering {interactions} interactions',
+                           f'Top functions by cumulative time\n{format_top_functions(profiler, "cumulative", 40)}',
+                           f'Top functions by own time\n{format_top_functions(profiler, "tottime", 40)}',
+                           'Top allocation changes\n' + '\n'.join(str(stat) for stat in allocation_diff[:40])]
+        report_path = f'{Conf.BASE_PATH}/{PROFILE_DIR_NAME}/profile_{time.strftime("%Y%m%d_%H%M%S")}.txt'
+        await asyncio.to_thread(write_report, report_path, report_sections)
+        logger.info(f'Wrote profile report to {report_path}')
+
+        summary_lines = ['Top functions by own time:']
+        summary_lines.extend(summarize_top_functions(profiler, limit))
+        summary_lines.append('Top allocation changes:')
+        summary_lines.extend(f'{stat.traceback[0].filename.rsplit(os.sep, 1)[-1]}:{stat.traceback[0].lineno} '
+                             f'{stat.size_diff / 1024:+.1f}KiB in {stat.count_diff:+d} blocks'
+                             for stat in allocation_diff[:limit])
+        return ProfileResult(report_path, elapsed_seconds, interactions, summary_lines)
@@ -0,0 +1,19 @@
+# Cog extensions loaded by the bot at startup; commented out cogs are disabled
+COG_EXTENSIONS = [
+    # "cogs.test",
+    "cogs.game_management",
+    "cogs.player_management",
+    "cogs.voting",
+    # "cogs.dice_rolling",
+    "cogs.resource_management",
+    # "cogs.attribute_management",
+    "cogs.action_item_management",
+    "cogs.action_views",
+    "cogs.item_views",
+    # "cogs.stat_mod_views",
+    # "cogs.persistent_view_management",
+    "cogs.moderator_request_management",
+    "cogs.emoji_manager",
+    "cogs.diagnostics",
+    "cogs.phase_scheduler",
+]
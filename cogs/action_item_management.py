@@ -1,16 +1,19 @@
 #! action_item_management.py
 # Class with slash commands managing actions and items
 
+import copy
 import discord
 from discord import app_commands
 from discord.ext import commands
-from dom.conf_vars import ConfVars as Conf
 import dom.data_model as gdm
+from dom.game_state_manager import game_states
 from bot_logging.logging_manager import log_interaction_call, log_info
 from utils.command_autocompletes import game_item_autocomplete, player_item_autocomplete, player_list_autocomplete, \
     game_action_autocomplete, player_action_autocomplete
 from cogs.moderator_request_management import send_message_to_moderator as modmsg
-from utils.message_formatter import *
+from dom.data_model import Action
+from utils.message_formatter import construct_action_display, construct_action_change_display, construct_item_display, \
+    construct_item_transfer_display
 
 
 class ActionItemManager(commands.Cog):
@@ -26,7 +29,7 @@ class ActionItemManager(commands.Cog):
     #                               item: str):
     #     log_interaction_call(interaction)
     #     await interaction.response.defer(ephemeral=True, thinking=True)
-    #     game = await gdm.get_game(file_path=Conf.GAME_PATH)
+    #     game = await game_states.get_interaction_game(interaction)
     #     guild = interaction.guild
     #
     #     item = game.get_item(item_name=item)
@@ -43,7 +46,7 @@ class ActionItemManager(commands.Cog):
                                    interaction: discord.Interaction):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         game_player = game.get_player(interaction.user.id)
@@ -64,7 +67,7 @@ class ActionItemManager(commands.Cog):
                                           player: str):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         game_player = game.get_player(int(player))
@@ -87,7 +90,7 @@ class ActionItemManager(commands.Cog):
                                    player: str):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         if not game.is_active or game.items_locked:
@@ -111,6 +114,7 @@ class ActionItemManager(commands.Cog):
         sending_player.remove_item(item_to_send)
         receiving_player.add_item(item_to_send)
 
+        game.mark_dirty(gdm.SECTION_PLAYERS)
         await gdm.write_game(game=game)
 
         await interaction.response.send_message(f'Sent item {item} to player {receiving_player.player_discord_name}!',
@@ -147,7 +151,7 @@ class ActionItemManager(commands.Cog):
                                item: str):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         game_player = game.get_player(int(player))
@@ -156,13 +160,18 @@ class ActionItemManager(commands.Cog):
 
         if game_item is None:
             await interaction.followup.send(f'Item {item} not defined in this game!', ephemeral=True)
+            return
         if game_player is None:
             await interaction.followup.send(f'Recipient player was not a valid choice!', ephemeral=True)
+            return
 
+        # The player gets their own copy, so using the item never changes the catalog entry or other players' copies
+        game_item = copy.deepcopy(game_item)
         game_player.add_item(game_item)
         item_mod_responses = await construct_item_transfer_display(action='gained', item=game_item, guild=guild,
                                                                    game=game)
 
+        game.mark_dirty(gdm.SECTION_PLAYERS)
         await gdm.write_game(game=game)
 
         await interaction.followup.send(
@@ -187,7 +196,7 @@ class ActionItemManager(commands.Cog):
                                   item: str):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         game_player = game.get_player(int(player))
@@ -206,6 +215,7 @@ class ActionItemManager(commands.Cog):
         item_mod_responses = await construct_item_transfer_display(action='lost', item=player_item, guild=guild,
                                                                    game=game)
 
+        game.mark_dirty(gdm.SECTION_PLAYERS)
         await gdm.write_game(game=game)
 
         await interaction.followup.send(
@@ -232,7 +242,7 @@ class ActionItemManager(commands.Cog):
                                     item: str):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         sending_player = game.get_player(int(player))
@@ -250,6 +260,7 @@ class ActionItemManager(commands.Cog):
         sending_player.remove_item(item_to_send)
         receiving_player.add_item(item_to_send)
 
+        game.mark_dirty(gdm.SECTION_PLAYERS)
         await gdm.write_game(game=game)
 
         await interaction.followup.send(f'Sent item {item} to player {receiving_player.player_discord_name}!',
@@ -281,7 +292,7 @@ class ActionItemManager(commands.Cog):
     #                                 action: str):
     #     log_interaction_call(interaction)
     #     await interaction.response.defer(ephemeral=True, thinking=True)
-    #     game = await gdm.get_game(file_path=Conf.GAME_PATH)
+    #     game = await game_states.get_interaction_game(interaction)
     #     guild = interaction.guild
     #
     #     action = game.get_action(action_name=action)
@@ -299,7 +310,7 @@ class ActionItemManager(commands.Cog):
                                      interaction: discord.Interaction):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         game_player = game.get_player(interaction.user.id)
@@ -333,7 +344,7 @@ class ActionItemManager(commands.Cog):
                                   player: str):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         game_player = game.get_player(int(player))
@@ -366,7 +377,7 @@ class ActionItemManager(commands.Cog):
                                       uses_to_add: app_commands.Range[int, 1, 5]):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         game_player = game.get_player(int(player))
@@ -382,6 +393,7 @@ class ActionItemManager(commands.Cog):
 
         player_action.action_uses = player_action.action_uses + uses_to_add
 
+        game.mark_dirty(gdm.SECTION_PLAYERS)
         await gdm.write_game(game=game)
 
         formatted_responses = await construct_action_change_display(status='uses_increment', action=player_action,
@@ -410,7 +422,7 @@ class ActionItemManager(commands.Cog):
                                          uses_to_remove: app_commands.Range[int, 1, 5]):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         game_player = game.get_player(int(player))
@@ -429,6 +441,7 @@ class ActionItemManager(commands.Cog):
         else:
             player_action.action_uses = player_action.action_uses - uses_to_remove
 
+        game.mark_dirty(gdm.SECTION_PLAYERS)
         await gdm.write_game(game=game)
 
         formatted_responses = await construct_action_change_display(status='uses_decrement', action=player_action,
@@ -456,7 +469,7 @@ class ActionItemManager(commands.Cog):
                                  action: str):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         game_player = game.get_player(int(player))
@@ -470,8 +483,11 @@ class ActionItemManager(commands.Cog):
             await interaction.followup.send(f'No action {action} could be found in the current game!')
             return
 
+        # The player gets their own copy, so spending its uses never changes the catalog entry or other players' copies
+        game_action = copy.deepcopy(game_action)
         game_player.add_action(game_action)
 
+        game.mark_dirty(gdm.SECTION_PLAYERS)
         await gdm.write_game(game=game)
 
         formatted_responses = await construct_action_change_display(status='gained', action=game_action, guild=guild,
@@ -498,7 +514,7 @@ class ActionItemManager(commands.Cog):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
         guild = interaction.guild
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         game_player = game.get_player(int(player))
 
@@ -514,6 +530,7 @@ class ActionItemManager(commands.Cog):
 
         game_player.remove_action(player_action)
 
+        game.mark_dirty(gdm.SECTION_PLAYERS)
         await gdm.write_game(game=game)
 
         formatted_responses = await construct_action_change_display(status='lost', action=player_action, guild=guild,
@@ -531,5 +548,5 @@ class ActionItemManager(commands.Cog):
 
 async def setup(bot: commands.Bot) -> None:
     cog = ActionItemManager(bot)
-    await bot.add_cog(cog, guilds=[discord.Object(id=Conf.GUILD_ID)])
+    await bot.add_cog(cog, guilds=[discord.Object(id=guild_id) for guild_id in game_states.guild_ids])
     log_info(f'Cog {cog.__class__.__name__} loaded!')
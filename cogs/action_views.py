@@ -2,11 +2,15 @@ import discord
 import time
 from discord import app_commands
 from discord.ext import commands
-from dom.conf_vars import ConfVars as Conf
 import dom.data_model as gdm
+from dom.game_state_manager import game_states
 from dom.data_model import PersistentInteractableView
 from bot_logging.logging_manager import log_interaction_call, log_info
-from utils.message_formatter import *
+from bot_logging.metrics_manager import instrumented_button
+from typing import Optional
+from discord import Guild
+from dom.data_model import Game, Action
+from utils.message_formatter import construct_action_display
 import utils.object_filtering_util as filter_util
 
 action_pi_view_name = "action_view"
@@ -26,7 +30,7 @@ class ActionViewButtons(discord.ui.View):
         await interaction.message.edit(content="List is currently being updated...", view=self)
         await interaction.response.defer(thinking=True, ephemeral=True)
 
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         return game, guild
@@ -65,6 +69,7 @@ class ActionViewButtons(discord.ui.View):
                        style=discord.ButtonStyle.gray,
                        custom_id=f'all_{action_pi_view_name}',
                        disabled=True)
+    @instrumented_button
     async def all_actions_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         initial_message_content = interaction.message.content
         game, guild = await self.base_button_initial_functions(interaction=interaction, button=button)
@@ -88,6 +93,7 @@ class ActionViewButtons(discord.ui.View):
     @discord.ui.button(label="Common Actions",
                        style=discord.ButtonStyle.gray,
                        custom_id=f'common_{action_pi_view_name}')
+    @instrumented_button
     async def common_actions_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         initial_message_content = interaction.message.content
         game, guild = await self.base_button_initial_functions(interaction=interaction, button=button)
@@ -108,6 +114,7 @@ class ActionViewButtons(discord.ui.View):
     @discord.ui.button(label="Unique Actions",
                        style=discord.ButtonStyle.gray,
                        custom_id=f'unique_{action_pi_view_name}')
+    @instrumented_button
     async def unique_actions_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         initial_message_content = interaction.message.content
         game, guild = await self.base_button_initial_functions(interaction=interaction, button=button)
@@ -128,6 +135,7 @@ class ActionViewButtons(discord.ui.View):
     @discord.ui.button(label="Item Actions",
                        style=discord.ButtonStyle.gray,
                        custom_id=f'items_{action_pi_view_name}', )
+    @instrumented_button
     async def item_actions_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         initial_message_content = interaction.message.content
         game, guild = await self.base_button_initial_functions(interaction=interaction, button=button)
@@ -156,7 +164,7 @@ class ActionPersistentInteractiveView(commands.Cog):
                                                action_view_channel: Optional[discord.TextChannel]):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         if action_pi_view_name in [pi_view.view_name for pi_view in game.pi_views]:
@@ -189,10 +197,10 @@ class ActionPersistentInteractiveView(commands.Cog):
         button_message = await action_view_channel.send("Use the buttons below to filter the action list.",
                                                         view=ActionViewButtons())
 
-        game.pi_views.append(PersistentInteractableView(view_name=action_pi_view_name,
-                                                        channel_id=action_view_channel.id,
-                                                        message_ids=msg_channel_ids,
-                                                        button_msg_id=button_message.id))
+        game.add_pi_view(PersistentInteractableView(view_name=action_pi_view_name,
+                                                    channel_id=action_view_channel.id,
+                                                    message_ids=msg_channel_ids,
+                                                    button_msg_id=button_message.id))
 
         await gdm.write_game(game=game)
 
@@ -201,5 +209,5 @@ class ActionPersistentInteractiveView(commands.Cog):
 
 async def setup(bot: commands.Bot) -> None:
     cog = ActionPersistentInteractiveView(bot)
-    await bot.add_cog(cog, guilds=[discord.Object(id=Conf.GUILD_ID)])
+    await bot.add_cog(cog, guilds=[discord.Object(id=guild_id) for guild_id in game_states.guild_ids])
     log_info(f'Cog {cog.__class__.__name__} loaded!')
@@ -4,11 +4,12 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-from dom.conf_vars import ConfVars as Conf
 import dom.data_model as gdm
+from dom.game_state_manager import game_states
 from bot_logging.logging_manager import log_interaction_call, log_info
 from utils.command_autocompletes import player_list_autocomplete, attribute_type_autocomplete
-from utils.message_formatter import *
+from utils.message_formatter import construct_attribute_modified_display, construct_player_attributes_display, \
+    construct_player_attributes_display_table
 
 
 class AttributeManager(commands.Cog):
@@ -24,7 +25,7 @@ class AttributeManager(commands.Cog):
                                     player: str):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         game_player = game.get_player(int(player))
@@ -46,7 +47,7 @@ class AttributeManager(commands.Cog):
                                         interaction: discord.Interaction):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
         game_players = game.players
 
@@ -66,7 +67,7 @@ class AttributeManager(commands.Cog):
                              interaction: discord.Interaction):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         game_player = game.get_player(interaction.user.id)
@@ -93,7 +94,7 @@ class AttributeManager(commands.Cog):
                                    attribute_amt: app_commands.Range[int, 1, 100]):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         game_player = game.get_player(int(player))
@@ -107,6 +108,7 @@ class AttributeManager(commands.Cog):
 
         game_player.modify_attribute(attribute_name=attribute_type, amt=attribute_amt)
 
+        game.mark_dirty(gdm.SECTION_PLAYERS)
         await gdm.write_game(game=game)
 
         await interaction.followup.send(f'Player attribute {attribute_type} increased by {attribute_amt} for '
@@ -137,7 +139,7 @@ class AttributeManager(commands.Cog):
                                       attribute_amt: app_commands.Range[int, 1, 100]):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         game_player = game.get_player(int(player))
@@ -151,6 +153,7 @@ class AttributeManager(commands.Cog):
 
         game_player.modify_attribute(attribute_name=attribute_type, amt=-attribute_amt)
 
+        game.mark_dirty(gdm.SECTION_PLAYERS)
         await gdm.write_game(game=game)
 
         await interaction.followup.send(f'Player attribute {attribute_type} decreased by {attribute_amt} for '
@@ -172,5 +175,5 @@ class AttributeManager(commands.Cog):
 
 async def setup(bot: commands.Bot) -> None:
     cog = AttributeManager(bot)
-    await bot.add_cog(cog, guilds=[discord.Object(id=Conf.GUILD_ID)])
+    await bot.add_cog(cog, guilds=[discord.Object(id=guild_id) for guild_id in game_states.guild_ids])
     log_info(f'Cog {cog.__class__.__name__} loaded!')
@@ -0,0 +1,77 @@
+#! diagnostics.py
+# Class with slash commands reporting on the bot's own performance and health
+
+import discord
+from typing import Optional
+from discord import app_commands
+from discord.ext import commands
+from dom.game_state_manager import game_states
+from bot_logging.logging_manager import log_interaction_call, log_info
+from bot_logging.metrics_manager import format_metrics_summary
+from bot_logging.profiling_manager import run_profile, is_profiling
+from cogs.moderator_request_management import send_message_to_moderator as modmsg
+
+
+async def chunk_lines(lines: list[str], max_length: int = 1900) -> list[str]:
+    chunks: list[str] = []
+    current_chunk = ""
+    for line in lines:
+        if current_chunk and len(current_chunk) + len(line) + 1 > max_length:
+            chunks.append(current_chunk)
+            current_chunk = ""
+        current_chunk = f'{current_chunk}\n{line}' if current_chunk else line
+    if current_chunk:
+        chunks.append(current_chunk)
+    return chunks
+
+
+class Diagnostics(commands.Cog):
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+
+    @app_commands.command(name="bot-metrics",
+                          description="Shows command latency, error and cooldown counts since the bot started")
+    @app_commands.default_permissions(manage_guild=True)
+    async def show_metrics(self,
+                           interaction: discord.Interaction,
+                           limit: app_commands.Range[int, 1, 50] = 20):
+        log_interaction_call(interaction)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        for chunk in await chunk_lines(format_metrics_summary(limit=limit)):
+            await interaction.followup.send(f'```\n{chunk}\n```', ephemeral=True)
+
+    @app_commands.command(name="bot-profile",
+                          description="Profiles the bot for a number of seconds or interactions and reports hot spots")
+    @app_commands.default_permissions(manage_guild=True)
+    async def run_profiler(self,
+                           interaction: discord.Interaction,
+                           seconds: app_commands.Range[int, 1, 600] = 60,
+                           interactions: Optional[app_commands.Range[int, 1, 1000]] = None):
+        log_interaction_call(interaction)
+
+        if is_profiling():
+            await interaction.response.send_message('A profiling session is already running!', ephemeral=True)
+            return
+
+        window_description = f'{seconds} seconds' if interactions is None \
+            else f'{interactions} interactions or {seconds} seconds, whichever comes first'
+        await interaction.response.send_message(f'Profiling the bot for the next {window_description}...',
+                                                ephemeral=True)
+
+        profile_result = await run_profile(seconds=seconds, interaction_limit=interactions)
+
+        summary_lines = [f'**Profile of {profile_result.elapsed_seconds:.1f}s covering '
+                         f'{profile_result.interactions} interactions**',
+                         f'Full report written to `{profile_result.report_path}`']
+        summary_lines.extend(profile_result.summary_lines)
+        for chunk in await chunk_lines(summary_lines):
+            await modmsg(chunk, interaction.guild)
+        await interaction.followup.send('Profiling complete! The summary was posted to the moderator channel.',
+                                        ephemeral=True)
+
+
+async def setup(bot: commands.Bot) -> None:
+    cog = Diagnostics(bot)
+    await bot.add_cog(cog, guilds=[discord.Object(id=guild_id) for guild_id in game_states.guild_ids])
+    log_info(f'Cog {cog.__class__.__name__} loaded!')
@@ -5,7 +5,7 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from typing import Literal, Optional
-from dom.conf_vars import ConfVars as Conf
+from dom.game_state_manager import game_states
 from bot_logging.logging_manager import log_interaction_call, log_info
 import random
 
@@ -69,5 +69,5 @@ class DiceManager(commands.Cog):
 
 async def setup(bot: commands.Bot) -> None:
     cog = DiceManager(bot)
-    await bot.add_cog(cog, guilds=[discord.Object(id=Conf.GUILD_ID)])
+    await bot.add_cog(cog, guilds=[discord.Object(id=guild_id) for guild_id in game_states.guild_ids])
     log_info(f'Cog {cog.__class__.__name__} loaded!')
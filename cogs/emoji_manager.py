@@ -4,13 +4,15 @@
 import discord
 from discord.ext import commands
 from discord import Guild
-from dom.conf_vars import ConfVars as Conf
+from dom.game_state_manager import game_states
 from bot_logging.logging_manager import log_info
 
-guild_emoji_map = {}
+# Emoji mappings per guild id, since each hosted game's guild has its own custom emojis
+guild_emoji_maps: dict[int, dict[str, str]] = {}
 
 async def populate_guild_emojis(guild: Guild) -> dict[str, str]:
     guild_emojis = guild.emojis
+    guild_emoji_map = guild_emoji_maps.setdefault(guild.id, {})
 
     for emoji in guild_emojis:
         guild_emoji_map[f":{emoji.name}:"] = f"<:{emoji.name}:{emoji.id}>"
@@ -18,10 +20,10 @@ async def populate_guild_emojis(guild: Guild) -> dict[str, str]:
     return guild_emoji_map
 
 async def get_guild_emojis(guild: Guild) -> dict[str, str]:
-    if not guild_emoji_map:
+    if not guild_emoji_maps.get(guild.id):
         log_info(f'Guild emoji map was not populated; repopulating now')
         await populate_guild_emojis(guild)
-    return guild_emoji_map
+    return guild_emoji_maps[guild.id]
 
 
 class EmojiManager(commands.Cog):
@@ -31,13 +33,16 @@ class EmojiManager(commands.Cog):
     @commands.Cog.listener()
     async def on_ready(self):
         await self.bot.wait_until_ready()
-        guild = self.bot.get_guild(Conf.GUILD_ID)
-        await populate_guild_emojis(guild=guild)
+        for guild_id in game_states.guild_ids:
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                continue
+            await populate_guild_emojis(guild=guild)
 
-        log_info(f'Custom Emoji mappings loaded for guild {guild.name}')
+            log_info(f'Custom Emoji mappings loaded for guild {guild.name}')
 
 
 async def setup(bot: commands.Bot) -> None:
     cog = EmojiManager(bot)
-    await bot.add_cog(cog, guilds=[discord.Object(id=Conf.GUILD_ID)])
+    await bot.add_cog(cog, guilds=[discord.Object(id=guild_id) for guild_id in game_states.guild_ids])
     log_info(f'Cog {cog.__class__.__name__} loaded!')
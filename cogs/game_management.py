@@ -8,9 +8,17 @@ from discord.ext import commands
 from dom.conf_vars import ConfVars as Conf
 from typing import Optional, Literal
 import dom.data_model as gdm
+from dom.game_state_manager import game_states
+import dom.snapshot_manager as snapshots
+from dom.phase_schedule import forget_schedule
+from dom.action_queue import forget_queue
+from dom.resource_ledger import forget_ledger
 from dom.data_model import Game, Action, Item, Player, Party, Round, Dilemma, Resource, ResourceCost, Attribute, \
     AttributeModifier, ResourceDefinition, AttributeDefinition, ItemTypeDefinition, Skill, StatusModifier
 from bot_logging.logging_manager import log_interaction_call, log_info
+from utils.command_autocompletes import snapshot_autocomplete
+from utils.command_sync import sync_guild_commands
+from datetime import datetime
 
 
 class GameManager(commands.Cog):
@@ -27,7 +35,8 @@ class GameManager(commands.Cog):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
 
-        if os.path.exists(Conf.GAME_PATH):
+        game_path = game_states.get_interaction_game_path(interaction)
+        if os.path.exists(game_path):
             await interaction.followup.send(f'Game file already exists! Delete the game file or change the '
                                             f'config to point to a new location or file!', ephemeral=True)
             return
@@ -64,7 +73,8 @@ class GameManager(commands.Cog):
 
         # If generate channels is enabled, generate channels for players and parties, if they are defined
         if generate_channels:
-            category_channel = await interaction.guild.fetch_channel(Conf.MOD_CATEGORY)
+            guild_settings = game_states.get_guild_settings(interaction.guild_id)
+            category_channel = await interaction.guild.fetch_channel(guild_settings.mod_category)
 
             for player in players:
                 discord_member = await interaction.guild.fetch_member(player.player_id)
@@ -80,7 +90,7 @@ class GameManager(commands.Cog):
                                                                               category=category_channel)
                     player.player_mod_channel = mod_channel.id
 
-            private_chat_channel = await interaction.guild.fetch_channel(Conf.PRIVATE_CHAT_CATEGORY)
+            private_chat_channel = await interaction.guild.fetch_channel(guild_settings.private_chat_category)
             for party in parties:
                 if party.channel_id is None:
                     overwrites = {
@@ -106,10 +116,12 @@ class GameManager(commands.Cog):
                     players=players, parties=parties, rounds=[], attribute_definitions=att_defs,
                     resource_definitions=res_defs, item_type_definitions=item_type_defs, skills=skills,
                     status_modifiers=status_mods, actions=actions, items=items, pi_views=[])
+        game.file_path = game_path
 
         await gdm.write_game(game=game)
+        game_states.invalidate(game_path)
 
-        await interaction.followup.send(f'Initialized a new game at file location {Conf.GAME_PATH}')
+        await interaction.followup.send(f'Initialized a new game at file location {game_path}')
 
     @app_commands.command(name="update-game-actions",
                           description="Updates the existing game with a new version of actions from the actions file")
@@ -118,13 +130,14 @@ class GameManager(commands.Cog):
                                   interaction: discord.Interaction):
         log_interaction_call(interaction)
 
-        game = gdm.read_json_to_dom(filepath=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         # TODO: Check if game exists, if it doesn't fail out
 
         actions = await gdm.read_actions_file(Conf.ACTION_PATH) if Conf.ACTION_PATH else []
 
-        game.actions = actions
+        game.set_actions(actions)
+        game.mark_dirty(gdm.SECTION_CATALOG)
 
         # TODO: Iterate over players and also update their values (but not uses!)
 
@@ -139,13 +152,14 @@ class GameManager(commands.Cog):
                                 interaction: discord.Interaction):
         log_interaction_call(interaction)
 
-        game = gdm.read_json_to_dom(filepath=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         # TODO: Check if game exists, if it doesn't fail out
 
         items = await gdm.read_items_file(Conf.ITEM_PATH) if Conf.ITEM_PATH else []
 
-        game.items = items
+        game.set_items(items)
+        game.mark_dirty(gdm.SECTION_CATALOG)
 
         # TODO: Iterate over players and also update their values (but not uses!)
 
@@ -160,9 +174,9 @@ class GameManager(commands.Cog):
                                        interaction: discord.Interaction,
                                        is_active: Literal['True', 'False']):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
-        game.is_active = True if is_active == 'True' else False
+        game.set_flag('is_active', True if is_active == 'True' else False)
 
         await gdm.write_game(game=game)
         await interaction.response.send_message(f'Game active state has been set to {is_active}!', ephemeral=True)
@@ -174,9 +188,9 @@ class GameManager(commands.Cog):
                                       interaction: discord.Interaction,
                                       is_locked: Literal['True', 'False']):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
-        game.parties_locked = True if is_locked == 'True' else False
+        game.set_flag('parties_locked', True if is_locked == 'True' else False)
 
         await gdm.write_game(game=game)
         await interaction.response.send_message(f'Player party lock status set to {is_locked}!', ephemeral=True)
@@ -188,9 +202,9 @@ class GameManager(commands.Cog):
                                       interaction: discord.Interaction,
                                       is_locked: Literal['True', 'False']):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
-        game.items_locked = True if is_locked == 'True' else False
+        game.set_flag('items_locked', True if is_locked == 'True' else False)
 
         await gdm.write_game(game=game)
         await interaction.response.send_message(f'Item transfer lock status set to {is_locked}!', ephemeral=True)
@@ -202,9 +216,9 @@ class GameManager(commands.Cog):
                                        interaction: discord.Interaction,
                                        is_locked: Literal['True', 'False']):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
-        game.voting_locked = True if is_locked == 'True' else False
+        game.set_flag('voting_locked', True if is_locked == 'True' else False)
 
         await gdm.write_game(game=game)
         await interaction.response.send_message(f'Voting lock status set to {is_locked}!', ephemeral=True)
@@ -216,9 +230,9 @@ class GameManager(commands.Cog):
                                           interaction: discord.Interaction,
                                           is_locked: Literal['True', 'False']):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
-        game.resources_locked = True if is_locked == 'True' else False
+        game.set_flag('resources_locked', True if is_locked == 'True' else False)
 
         await gdm.write_game(game=game)
         await interaction.response.send_message(f'Resources lock status set to {is_locked}!', ephemeral=True)
@@ -262,8 +276,71 @@ class GameManager(commands.Cog):
 
         await interaction.followup.send(f'Deleted channels for category {channel.name}!', ephemeral=True)
 
+    @app_commands.command(name="snapshot-list",
+                          description="Lists the most recent saved snapshots of the game state")
+    @app_commands.default_permissions(manage_guild=True)
+    async def snapshot_list(self,
+                            interaction: discord.Interaction):
+        log_interaction_call(interaction)
+
+        snapshot_list = snapshots.list_snapshots(game_states.get_interaction_game_path(interaction))
+        if not snapshot_list:
+            await interaction.response.send_message(f'No snapshots have been recorded yet!', ephemeral=True)
+            return
+
+        snapshot_lines = []
+        for snapshot in snapshot_list:
+            snapshot_time = datetime.fromtimestamp(snapshot.timestamp).strftime('%Y-%m-%d %H:%M:%S')
+            snapshot_lines.append(f'`{snapshot.snapshot_id}` {snapshot_time} - {snapshot.reason} '
+                                  f'(generation {snapshot.generation})')
+        snapshot_message = '\n'.join(snapshot_lines)
+        await interaction.response.send_message(f'Snapshots, newest first:\n{snapshot_message}'[:2000],
+                                                ephemeral=True)
+
+    @app_commands.command(name="snapshot-restore",
+                          description="Restores the game state to a previously recorded snapshot")
+    @app_commands.autocomplete(snapshot_id=snapshot_autocomplete, snapshot_id_again=snapshot_autocomplete)
+    @app_commands.default_permissions(manage_guild=True)
+    async def snapshot_restore(self,
+                               interaction: discord.Interaction,
+                               snapshot_id: str,
+                               snapshot_id_again: str):
+        log_interaction_call(interaction)
+
+        if snapshot_id != snapshot_id_again:
+            await interaction.response.send_message(
+                f'Both snapshot arguments must be the same! This is a safety feature!', ephemeral=True)
+            return
+
+        game_path = game_states.get_interaction_game_path(interaction)
+        restored_snapshot = gdm.restore_snapshot(game_path, snapshot_id)
+        if restored_snapshot is None:
+            await interaction.response.send_message(f'No snapshot with id {snapshot_id} exists!', ephemeral=True)
+            return
+
+        # Cached state is only dropped once the files were actually replaced, so a mistyped id loses nothing
+        game_states.invalidate(game_path)
+        forget_schedule(game_path)
+        forget_queue(game_path)
+        forget_ledger(game_path)
+
+        await interaction.response.send_message(f'Restored game state to snapshot {restored_snapshot.snapshot_id} '
+                                                f'(generation {restored_snapshot.generation})!', ephemeral=True)
+
+    @app_commands.command(name="sync-commands",
+                          description="Forces the bot's slash commands to re-sync with discord for this server")
+    @app_commands.default_permissions(manage_guild=True)
+    async def sync_commands(self,
+                            interaction: discord.Interaction):
+        log_interaction_call(interaction)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        await sync_guild_commands(self.bot.tree, interaction.guild_id, force=True)
+
+        await interaction.followup.send(f'Synced slash commands for {interaction.guild.name}!', ephemeral=True)
+
 
 async def setup(bot: commands.Bot) -> None:
     cog = GameManager(bot)
-    await bot.add_cog(cog, guilds=[discord.Object(id=Conf.GUILD_ID)])
+    await bot.add_cog(cog, guilds=[discord.Object(id=guild_id) for guild_id in game_states.guild_ids])
     log_info(f'Cog {cog.__class__.__name__} loaded!')
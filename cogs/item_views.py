@@ -2,11 +2,15 @@ import discord
 import time
 from discord import app_commands
 from discord.ext import commands
-from dom.conf_vars import ConfVars as Conf
 import dom.data_model as gdm
+from dom.game_state_manager import game_states
 from dom.data_model import PersistentInteractableView
 from bot_logging.logging_manager import log_interaction_call, log_info
-from utils.message_formatter import *
+from bot_logging.metrics_manager import instrumented_button
+from typing import Optional
+from discord import Guild
+from dom.data_model import Game, Item
+from utils.message_formatter import construct_item_display
 import utils.object_filtering_util as filter_util
 
 item_pi_view_name = "item_view"
@@ -26,7 +30,7 @@ class ItemViewButtons(discord.ui.View):
         await interaction.message.edit(content="List is currently being updated...", view=self)
         await interaction.response.defer(thinking=True, ephemeral=True)
 
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         return game, guild
@@ -61,6 +65,7 @@ class ItemViewButtons(discord.ui.View):
                        style=discord.ButtonStyle.gray,
                        custom_id=f'all_{item_pi_view_name}',
                        disabled=True)
+    @instrumented_button
     async def all_items_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         initial_message_content = interaction.message.content
         game, guild = await self.base_button_initial_functions(interaction=interaction, button=button)
@@ -78,6 +83,7 @@ class ItemViewButtons(discord.ui.View):
     @discord.ui.button(label="Standard Items",
                        style=discord.ButtonStyle.gray,
                        custom_id=f'std_{item_pi_view_name}')
+    @instrumented_button
     async def standard_items_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         initial_message_content = interaction.message.content
         game, guild = await self.base_button_initial_functions(interaction=interaction, button=button)
@@ -97,6 +103,7 @@ class ItemViewButtons(discord.ui.View):
     @discord.ui.button(label="Altered Items",
                        style=discord.ButtonStyle.gray,
                        custom_id=f'altered_{item_pi_view_name}')
+    @instrumented_button
     async def altered_items_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         initial_message_content = interaction.message.content
         game, guild = await self.base_button_initial_functions(interaction=interaction, button=button)
@@ -126,7 +133,7 @@ class ItemPersistentInteractiveView(commands.Cog):
                                              item_view_channel: Optional[discord.TextChannel]):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         if item_pi_view_name in [pi_view.view_name for pi_view in game.pi_views]:
@@ -151,10 +158,10 @@ class ItemPersistentInteractiveView(commands.Cog):
         button_message = await item_view_channel.send("Use the buttons below to filter the action list.",
                                                       view=ItemViewButtons())
 
-        game.pi_views.append(PersistentInteractableView(view_name=item_pi_view_name,
-                                                        channel_id=item_view_channel.id,
-                                                        message_ids=msg_channel_ids,
-                                                        button_msg_id=button_message.id))
+        game.add_pi_view(PersistentInteractableView(view_name=item_pi_view_name,
+                                                    channel_id=item_view_channel.id,
+                                                    message_ids=msg_channel_ids,
+                                                    button_msg_id=button_message.id))
 
         await gdm.write_game(game=game)
 
@@ -163,5 +170,5 @@ class ItemPersistentInteractiveView(commands.Cog):
 
 async def setup(bot: commands.Bot) -> None:
     cog = ItemPersistentInteractiveView(bot)
-    await bot.add_cog(cog, guilds=[discord.Object(id=Conf.GUILD_ID)])
+    await bot.add_cog(cog, guilds=[discord.Object(id=guild_id) for guild_id in game_states.guild_ids])
     log_info(f'Cog {cog.__class__.__name__} loaded!')
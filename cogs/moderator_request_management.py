@@ -4,17 +4,24 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-from dom.conf_vars import ConfVars as Conf
 import dom.data_model as gdm
+from dom.game_state_manager import game_states
+from dom.resource_ledger import ResourceTransaction, LedgerEntry, TRANSACTION_ACTION_COST, apply_transactions
 from bot_logging.logging_manager import log_interaction_call, log_info
 from utils.command_autocompletes import player_action_autocomplete, game_action_autocomplete
-from utils.message_formatter import *
+from typing import Optional, Literal
+from discord import Guild
+from dom.action_queue import QueuedAction, enqueue_action, get_pending_actions, resolve_next_actions, \
+    get_queue_round_number
+from utils.message_formatter import construct_player_resources_display, insufficient_resources_msg, \
+    construct_action_queue_display
 
 
 async def send_message_to_moderator(message: str, guild: Guild):
-    mod_request_channel = await guild.fetch_channel(Conf.REQUEST_CHANNEL)
+    guild_settings = game_states.get_guild_settings(guild.id)
+    mod_request_channel = await guild.fetch_channel(guild_settings.request_channel)
 
-    formatted_request = f'<@&{Conf.MOD_ROLE_ID}>\n'
+    formatted_request = f'<@&{guild_settings.mod_role_id}>\n'
     formatted_request += f'{message}\n'
 
     await mod_request_channel.send(formatted_request)
@@ -30,9 +37,10 @@ class ModRequestManager(commands.Cog):
     async def moderator_request(self, interaction: discord.Interaction,
                                 request: str):
         log_interaction_call(interaction)
-        game = await gdm.get_game(Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
-        mod_request_channel = await interaction.guild.fetch_channel(Conf.REQUEST_CHANNEL)
+        guild_settings = game_states.get_guild_settings(interaction.guild_id)
+        mod_request_channel = await interaction.guild.fetch_channel(guild_settings.request_channel)
 
         requesting_player = game.get_player(interaction.user.id)
 
@@ -47,7 +55,7 @@ class ModRequestManager(commands.Cog):
             await interaction.response.send_message(f'Submitted request **{request}** to the moderator!',
                                                     ephemeral=True)
             await mod_request_channel.send(
-                f'<@&{Conf.MOD_ROLE_ID}>\nPlayer **{requesting_player.player_discord_name}** has submitted an moderator request of **{request}**\n')
+                f'<@&{guild_settings.mod_role_id}>\nPlayer **{requesting_player.player_discord_name}** has submitted an moderator request of **{request}**\n')
 
     @app_commands.command(name="action-submission",
                           description="Submit an action to be performed to the moderator")
@@ -69,11 +77,9 @@ class ModRequestManager(commands.Cog):
                                 request_details: Optional[str]):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
-        mod_request_channel = await interaction.guild.fetch_channel(Conf.REQUEST_CHANNEL)
-
         requesting_player = game.get_player(interaction.user.id)
 
         if requesting_player is None:
@@ -87,37 +93,47 @@ class ModRequestManager(commands.Cog):
             # Here is where we deduct uses and pay costs automatically
             player_action = requesting_player.get_action(action_name=action)
 
-            # Actions with -1 uses are unlimited
-            if player_action.action_uses != -1:
-                # Actions with non -1 value uses have limited uses; players must have remaining uses to submit the action
-                if player_action.action_uses > 0:
-                    player_action.action_uses = player_action.action_uses - 1
-                else:
-                    await interaction.followup.send(f'You do not have any remaining uses for this action!',
-                                                    ephemeral=True)
-                    return
+            # Actions with -1 uses are unlimited; actions with limited uses need one remaining to be submitted
+            if player_action.action_uses != -1 and player_action.action_uses <= 0:
+                await interaction.followup.send(f'You do not have any remaining uses for this action!',
+                                                ephemeral=True)
+                return
 
             # Actions with an empty costs list have no associated costs and can be used freely
             if player_action.action_costs:
                 for action_cost in player_action.action_costs:
-                    player_resource = requesting_player.get_resource(action_cost.res_name)
-                    if not player_resource:
+                    if not requesting_player.get_resource(action_cost.res_name):
                         await interaction.followup.send(f'Could not find resource {action_cost.res_name} for '
                                                         f'player! Please contact the game moderator!')
                         return
-                    # First, verify the player can actually pay the costs
-                    if player_resource.resource_amt < action_cost.amount:
-                        # If costs cannot be paid, reject the action submission with reasoning
-                        ins_res_msg = await insufficient_resources_msg(action=player_action,
-                                                                       player=requesting_player,
-                                                                       game=game,
-                                                                       guild=guild)
-                        await interaction.followup.send(ins_res_msg)
-                        return
-                    else:
-                        # If costs can be paid, update player resources to the new value
-                        player_resource.resource_amt = player_resource.resource_amt - action_cost.amount
+                # Every cost is checked before any is paid, so an action is never left partly paid for
+                cost_transaction = ResourceTransaction(TRANSACTION_ACTION_COST,
+                                                       [LedgerEntry(requesting_player.player_id, action_cost.res_name,
+                                                                    -action_cost.amount)
+                                                        for action_cost in player_action.action_costs],
+                                                       reason=action, actor_id=interaction.user.id)
+                if apply_transactions(game, [cost_transaction]) is not None:
+                    # If costs cannot be paid, reject the action submission with reasoning
+                    ins_res_msg = await insufficient_resources_msg(action=player_action,
+                                                                   player=requesting_player,
+                                                                   game=game,
+                                                                   guild=guild)
+                    await interaction.followup.send(ins_res_msg)
+                    return
 
+            if player_action.action_uses != -1:
+                player_action.action_uses = player_action.action_uses - 1
+
+            # Submissions wait in the round's queue until a moderator resolves them, rather than each pinging the
+            # moderators as it comes in
+            enqueue_action(game, QueuedAction(round_number=get_queue_round_number(game),
+                                              player_id=requesting_player.player_id,
+                                              action_name=action,
+                                              action_priority=player_action.action_priority,
+                                              targets=[target1, target2, target3],
+                                              request_details=request_details))
+
+            game.mark_dirty(gdm.SECTION_PLAYERS)
             await gdm.write_game(game)
 
             await interaction.followup.send(f'Submitted request for action **{action}** to the moderator!',
@@ -131,19 +147,66 @@ class ModRequestManager(commands.Cog):
 
                     for player_resource_display in formatted_resources:
                         await player_moderator_channel.send(player_resource_display)
-                #TODO: Send confirmation in mod chat about action submission
-
-            formatted_request = f'<@&{Conf.MOD_ROLE_ID}>\nPlayer **{requesting_player.player_discord_name}** has requested to use the action **{action}**\n'
-            if target1:
-                formatted_request += f'First Target/Choice: {target1}\n'
-            if target2:
-                formatted_request += f'Second Target/Choice: {target2}\n'
-            if target3:
-                formatted_request += f'Third Target/Choice: {target3}\n'
-            if request_details:
-                formatted_request += f'Additional details: {request_details}\n'
 
-            await mod_request_channel.send(formatted_request)
+    @app_commands.command(name="action-queue-view",
+                          description="Lists the round's unresolved action submissions in the order they resolve")
+    @app_commands.default_permissions(manage_guild=True)
+    @app_commands.describe(round_number="Optional - Round to list; defaults to the latest round")
+    @app_commands.rename(round_number="round")
+    async def action_queue_view(self, interaction: discord.Interaction,
+                                round_number: Optional[int]):
+        log_interaction_call(interaction)
+        game = await game_states.get_interaction_game(interaction)
+        round_number = round_number if round_number is not None else get_queue_round_number(game)
+
+        pending_actions = get_pending_actions(game, round_number)
+
+        if not pending_actions:
+            await interaction.response.send_message(f'No action submissions are waiting for round {round_number}!',
+                                                    ephemeral=True)
+            return
+
+        queue_displays = await construct_action_queue_display(
+            header=f'**{len(pending_actions)} action submission(s) waiting for round {round_number}:**\n',
+            queued_actions=pending_actions, game=game)
+        await interaction.response.send_message(queue_displays[0], ephemeral=True)
+        for queue_display in queue_displays[1:]:
+            await interaction.followup.send(queue_display, ephemeral=True)
+
+    @app_commands.command(name="action-queue-resolve",
+                          description="Resolves the round's next action submissions, posting them as one list")
+    @app_commands.default_permissions(manage_guild=True)
+    @app_commands.describe(count="Optional - How many submissions to resolve; defaults to 25")
+    @app_commands.describe(round_number="Optional - Round to resolve; defaults to the latest round")
+    @app_commands.rename(round_number="round")
+    async def action_queue_resolve(self, interaction: discord.Interaction,
+                                   count: app_commands.Range[int, 1, 50] = 25,
+                                   round_number: Optional[int] = None):
+        log_interaction_call(interaction)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        game = await game_states.get_interaction_game(interaction)
+        round_number = round_number if round_number is not None else get_queue_round_number(game)
+
+        resolved_actions = resolve_next_actions(game, round_number, count, interaction.user.id)
+
+        if not resolved_actions:
+            await interaction.followup.send(f'No action submissions are waiting for round {round_number}!',
+                                            ephemeral=True)
+            return
+
+        # The whole batch goes out as one list with a single ping, in the order the actions resolve
+        remaining_amt = len(get_pending_actions(game, round_number))
+        guild_settings = game_states.get_guild_settings(interaction.guild_id)
+        queue_displays = await construct_action_queue_display(
+            header=f'<@&{guild_settings.mod_role_id}>\n**Resolving {len(resolved_actions)} action submission(s) for '
+                   f'round {round_number}, in order** ({remaining_amt} still waiting):\n',
+            queued_actions=resolved_actions, game=game)
+        mod_request_channel = await interaction.guild.fetch_channel(guild_settings.request_channel)
+        for queue_display in queue_displays:
+            await mod_request_channel.send(queue_display)
+
+        await interaction.followup.send(f'Resolved {len(resolved_actions)} action submission(s) for round '
+                                        f'{round_number}; {remaining_amt} still waiting', ephemeral=True)
 
     @app_commands.command(name="level-up",
                           description="Submit level up requests to the moderator here.")
@@ -155,9 +218,10 @@ class ModRequestManager(commands.Cog):
                        attribute1: Literal['Body', 'Mind', 'Spirit'],
                        attribute2: Literal['Body', 'Mind', 'Spirit']):
         log_interaction_call(interaction)
-        game = await gdm.get_game(Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
-        mod_request_channel = await interaction.guild.fetch_channel(Conf.REQUEST_CHANNEL)
+        guild_settings = game_states.get_guild_settings(interaction.guild_id)
+        mod_request_channel = await interaction.guild.fetch_channel(guild_settings.request_channel)
 
         requesting_player = game.get_player(interaction.user.id)
 
@@ -172,7 +236,7 @@ class ModRequestManager(commands.Cog):
             await interaction.response.send_message(f'Submitted level up request to the moderator!',
                                                     ephemeral=True)
 
-            formatted_request = f'<@&{Conf.MOD_ROLE_ID}>\nPlayer **{requesting_player.player_discord_name}** has submitted a level-up request:\n'
+            formatted_request = f'<@&{guild_settings.mod_role_id}>\nPlayer **{requesting_player.player_discord_name}** has submitted a level-up request:\n'
             formatted_request += f'New Action: {action}\n'
             formatted_request += f'New Skill: {skill}\n'
             formatted_request += f'Attribute 1: {attribute1}\n'
@@ -183,5 +247,5 @@ class ModRequestManager(commands.Cog):
 
 async def setup(bot: commands.Bot) -> None:
     cog = ModRequestManager(bot)
-    await bot.add_cog(cog, guilds=[discord.Object(id=Conf.GUILD_ID)])
+    await bot.add_cog(cog, guilds=[discord.Object(id=guild_id) for guild_id in game_states.guild_ids])
     log_info(f'Cog {cog.__class__.__name__} loaded!')
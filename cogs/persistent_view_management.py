@@ -1,8 +1,8 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-from dom.conf_vars import ConfVars as Conf
 import dom.data_model as gdm
+from dom.game_state_manager import game_states
 from dom.data_model import PersistentInteractableView
 from bot_logging.logging_manager import log_interaction_call, log_info
 from utils.command_autocompletes import persistent_view_autocomplete
@@ -21,7 +21,7 @@ class PersistentViewManager(commands.Cog):
                                      view_name: str):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         pi_view: PersistentInteractableView = game.get_pi_view(view_name)
@@ -49,5 +49,5 @@ class PersistentViewManager(commands.Cog):
 
 async def setup(bot: commands.Bot) -> None:
     cog = PersistentViewManager(bot)
-    await bot.add_cog(cog, guilds=[discord.Object(id=Conf.GUILD_ID)])
+    await bot.add_cog(cog, guilds=[discord.Object(id=guild_id) for guild_id in game_states.guild_ids])
     log_info(f'Cog {cog.__class__.__name__} loaded!')
@@ -0,0 +1,162 @@
+#! phase_scheduler.py
+# Class with slash commands scheduling game phases, and the loop running them automatically at their times of day
+
+import asyncio
+import time
+import discord
+from typing import Literal, Dict
+from discord import app_commands
+from discord.ext import commands, tasks
+from datetime import datetime, timezone
+from dom.conf_vars import ConfVars as Conf
+from dom.game_state_manager import game_states
+from dom.data_model import Game
+from dom.phase_schedule import ScheduledPhase, PHASE_DAILY_INCOMES, PHASE_ROUND_END, PHASE_REPORT_REFRESH, \
+    parse_time_of_day, get_next_run_at, load_schedule, save_schedule, add_scheduled_phase, remove_scheduled_phase, \
+    get_due_phases
+from bot_logging.logging_manager import log_interaction_call, log_info, log_warning, log_error
+from utils.command_autocompletes import scheduled_phase_autocomplete
+from cogs.moderator_request_management import send_message_to_moderator as modmsg
+from cogs.resource_management import trigger_daily_incomes
+from cogs.voting import end_latest_round, refresh_vote_reports
+
+
+def get_game_guild_ids() -> Dict[str, int]:
+    # The guild each routed game belongs to, which is where its scheduled phases send their messages
+    return {game_path: guild_id for (guild_id, channel_id), game_path in game_states.game_routes.items()}
+
+
+def format_scheduled_phase(entry: ScheduledPhase) -> str:
+    last_run = f'<t:{entry.last_run_at}:R>' if entry.last_run_at is not None else 'never'
+    return f'`{entry.schedule_id}` next runs <t:{entry.next_run_at}:f>, last ran {last_run}'
+
+
+async def run_scheduled_phase(guild: discord.Guild, game: Game, entry: ScheduledPhase):
+    if entry.phase == PHASE_DAILY_INCOMES:
+        await trigger_daily_incomes(guild=guild, game=game, send_spacing=Conf.SCHEDULE_SEND_SPACING)
+    elif entry.phase == PHASE_ROUND_END:
+        ended_round = await end_latest_round(game)
+        if ended_round is not None:
+            await modmsg(f'Round {ended_round.round_number} and its dilemmas were ended on schedule', guild)
+    elif entry.phase == PHASE_REPORT_REFRESH:
+        await refresh_vote_reports(guild=guild, game=game, send_spacing=Conf.SCHEDULE_SEND_SPACING)
+
+
+class PhaseScheduler(commands.Cog):
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+
+    async def cog_load(self):
+        self.run_due_phases.change_interval(seconds=Conf.SCHEDULE_CHECK_INTERVAL)
+        self.run_due_phases.start()
+
+    async def cog_unload(self):
+        self.run_due_phases.cancel()
+
+    @tasks.loop(seconds=30)
+    async def run_due_phases(self):
+        now = time.time()
+        for game_path, guild_id in get_game_guild_ids().items():
+            due_phases = get_due_phases(game_path, now)
+            if not due_phases:
+                continue
+
+            # Next run times are saved before anything runs, so a crash part way through never repeats a phase
+            missed_phases = [entry for entry in due_phases if now - entry.next_run_at > Conf.SCHEDULE_MISSED_GRACE]
+            for entry in due_phases:
+                entry.next_run_at = get_next_run_at(entry.time_of_day, now)
+                if entry not in missed_phases:
+                    entry.last_run_at = int(now)
+            save_schedule(game_path, load_schedule(game_path))
+
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                log_warning(f'Skipping scheduled phases for {game_path}; guild {guild_id} is not available')
+                continue
+
+            for entry in due_phases:
+                if entry in missed_phases:
+                    log_warning(f'Skipped scheduled phase {entry.schedule_id} for {game_path}; it was missed by more '
+                                f'than {Conf.SCHEDULE_MISSED_GRACE} seconds')
+                    continue
+                log_info(f'Running scheduled phase {entry.schedule_id} for {game_path}')
+                try:
+                    # Fetched for each phase, as a phase that fails drops the cached game along with its partial changes
+                    game = await game_states.get_game_at_path(game_path)
+                    await run_scheduled_phase(guild, game, entry)
+                except Exception as e:
+                    # One failing phase must not stop the loop, or every later schedule would stop running too
+                    log_error(f'Scheduled phase {entry.schedule_id} for {game_path} failed\n{e}')
+                    game_states.discard_game(game_path)
+                    await modmsg(f'Scheduled phase `{entry.schedule_id}` failed: {e}', guild)
+                # Phases that fall due together still go out one after another, rather than as a single burst
+                await asyncio.sleep(Conf.SCHEDULE_SEND_SPACING)
+
+    @run_due_phases.before_loop
+    async def before_run_due_phases(self):
+        await self.bot.wait_until_ready()
+
+    @app_commands.command(name="schedule-add",
+                          description="Runs a game phase automatically every day at a UTC time, given as HH:MM")
+    @app_commands.default_permissions(manage_guild=True)
+    async def schedule_add(self,
+                           interaction: discord.Interaction,
+                           phase: Literal['daily-incomes', 'round-end', 'report-refresh'],
+                           time_of_day: str):
+        log_interaction_call(interaction)
+        normalized_time = parse_time_of_day(time_of_day)
+
+        if normalized_time is None:
+            await interaction.response.send_message(f'{time_of_day} is not a valid UTC time; use HH:MM, such as 18:00',
+                                                    ephemeral=True)
+            return
+
+        game_path = game_states.get_interaction_game_path(interaction)
+        new_entry = add_scheduled_phase(game_path, phase, normalized_time)
+
+        if new_entry is None:
+            await interaction.response.send_message(f'{phase} is already scheduled for {normalized_time} UTC!',
+                                                    ephemeral=True)
+            return
+
+        await interaction.response.send_message(f'Scheduled {format_scheduled_phase(new_entry)}', ephemeral=True)
+
+    @app_commands.command(name="schedule-list",
+                          description="Lists the game phases that run automatically, and when they next run")
+    @app_commands.default_permissions(manage_guild=True)
+    async def schedule_list(self,
+                            interaction: discord.Interaction):
+        log_interaction_call(interaction)
+        schedule = load_schedule(game_states.get_interaction_game_path(interaction))
+
+        if not schedule:
+            await interaction.response.send_message(f'No game phases are scheduled for this game!', ephemeral=True)
+            return
+
+        current_time = datetime.now(timezone.utc).strftime('%H:%M')
+        schedule_lines = [f'**Scheduled phases** (times are UTC, currently {current_time})']
+        schedule_lines.extend(format_scheduled_phase(entry) for entry in schedule)
+        await interaction.response.send_message('\n'.join(schedule_lines), ephemeral=True)
+
+    @app_commands.command(name="schedule-remove",
+                          description="Stops a game phase from running automatically")
+    @app_commands.default_permissions(manage_guild=True)
+    @app_commands.autocomplete(schedule_id=scheduled_phase_autocomplete)
+    async def schedule_remove(self,
+                              interaction: discord.Interaction,
+                              schedule_id: str):
+        log_interaction_call(interaction)
+        removed_entry = remove_scheduled_phase(game_states.get_interaction_game_path(interaction), schedule_id)
+
+        if removed_entry is None:
+            await interaction.response.send_message(f'No scheduled phase found with the id {schedule_id}!',
+                                                    ephemeral=True)
+            return
+
+        await interaction.response.send_message(f'Removed scheduled phase {removed_entry.schedule_id}', ephemeral=True)
+
+
+async def setup(bot: commands.Bot) -> None:
+    cog = PhaseScheduler(bot)
+    await bot.add_cog(cog, guilds=[discord.Object(id=guild_id) for guild_id in game_states.guild_ids])
+    log_info(f'Cog {cog.__class__.__name__} loaded!')
@@ -4,10 +4,10 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-from dom.conf_vars import ConfVars as Conf
 from dom.data_model import Game, Player, Round, Vote, Party, Dilemma
 from typing import Literal, Optional
 import dom.data_model as gdm
+from dom.game_state_manager import game_states
 from bot_logging.logging_manager import log_interaction_call, log_info
 from utils.command_autocompletes import player_list_autocomplete, party_list_autocomplete
 from cogs.moderator_request_management import send_message_to_moderator as modmsg
@@ -27,7 +27,7 @@ class PlayerManager(commands.Cog):
                          player: discord.Member,
                          channel_name: str):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         if game.get_player(player.id) is None:
 
@@ -36,7 +36,8 @@ class PlayerManager(commands.Cog):
                 player: discord.PermissionOverwrite(read_messages=True)
             }
 
-            category_channel = await interaction.guild.fetch_channel(Conf.MOD_CATEGORY)
+            guild_settings = game_states.get_guild_settings(interaction.guild_id)
+            category_channel = await interaction.guild.fetch_channel(guild_settings.mod_category)
             mod_channel = await interaction.guild.create_text_channel(name=channel_name, overwrites=overwrites,
                                                                       category=category_channel)
 
@@ -60,14 +61,17 @@ class PlayerManager(commands.Cog):
                           player: str,
                           dead: Literal['True', 'False']):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         this_player = game.get_player(int(player))
         if this_player is None:
             await interaction.response.send_message(f'The selected player is not currently defined in this game!',
                                                     ephemeral=True)
         else:
-            this_player.is_dead = True if dead == 'True' else False
+            is_dead = True if dead == 'True' else False
+            if this_player.is_dead != is_dead:
+                this_player.is_dead = is_dead
+                game.mark_dirty(gdm.SECTION_PLAYERS)
 
             await gdm.write_game(game=game)
             await interaction.response.send_message(f'Set alive status of {this_player.player_discord_name} to {dead}!',
@@ -80,14 +84,14 @@ class PlayerManager(commands.Cog):
     #                             interaction: discord.Interaction,
     #                             player: Optional[str] = None):
     #     log_interaction_call(interaction)
-    #     game = await gdm.get_game(file_path=Conf.GAME_PATH)
+    #     game = await game_states.get_interaction_game(interaction)
     #
     #     guild = interaction.guild
     #     discord_user1 = interaction.user
     #     player2 = game.get_player(int(player))
     #     discord_user2 = await guild.fetch_member(player2.player_id)
     #     channel_identifier = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-    #     category_channel = await guild.fetch_channel(Conf.PRIVATE_CHAT_CATEGORY)
+    #     category_channel = await guild.fetch_channel(game_states.get_guild_settings(guild.id).private_chat_category)
     #
     #     overwrites = {
     #         interaction.guild.default_role: discord.PermissionOverwrite(read_messages=False),
@@ -108,10 +112,10 @@ class PlayerManager(commands.Cog):
                            party_name: str,
                            party_max_size: int):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         guild = interaction.guild
-        category_channel = await guild.fetch_channel(Conf.PRIVATE_CHAT_CATEGORY)
+        category_channel = await guild.fetch_channel(game_states.get_guild_settings(guild.id).private_chat_category)
 
         overwrites = {
             interaction.guild.default_role: discord.PermissionOverwrite(read_messages=False)
@@ -135,7 +139,7 @@ class PlayerManager(commands.Cog):
                                party: str,
                                player: str):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         game_party = game.get_party(int(party))
         game_player = game.get_player(int(player))
@@ -171,6 +175,7 @@ class PlayerManager(commands.Cog):
         await party_channel.set_permissions(player_user, read_messages=True, send_messages=True,
                                             read_message_history=True)
 
+        game.mark_dirty(gdm.SECTION_PARTIES)
         await gdm.write_game(game=game)
         await interaction.response.send_message(
             f'Added player {game_player.player_discord_name} to party {game_party.party_name}!', ephemeral=True)
@@ -183,7 +188,7 @@ class PlayerManager(commands.Cog):
     async def remove_party_player(self, interaction: discord.Interaction,
                                   player: str):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         game_player = game.get_player(int(player))
 
@@ -207,6 +212,7 @@ class PlayerManager(commands.Cog):
         await party_channel.set_permissions(player_user, read_messages=False, send_messages=False,
                                             read_message_history=False)
 
+        game.mark_dirty(gdm.SECTION_PARTIES)
         await gdm.write_game(game=game)
         await interaction.response.send_message(
             f'Removed player {game_player.player_discord_name} from party {game_party.party_name}!', ephemeral=True)
@@ -219,7 +225,7 @@ class PlayerManager(commands.Cog):
     async def join_party(self, interaction: discord.Interaction,
                          party: str):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         game_party = game.get_party(int(party))
         game_player = game.get_player(interaction.user.id)
@@ -267,6 +273,7 @@ class PlayerManager(commands.Cog):
         await party_channel.set_permissions(player_user, read_messages=True, send_messages=True,
                                             read_message_history=True)
 
+        game.mark_dirty(gdm.SECTION_PARTIES)
         await gdm.write_game(game=game)
         await interaction.response.send_message(f'You have joined {game_party.party_name}!', ephemeral=True)
         await party_channel.send(f'**{game_player.player_discord_name}** has joined {game_party.party_name}!')
@@ -279,7 +286,7 @@ class PlayerManager(commands.Cog):
     @app_commands.checks.cooldown(1, 5, key=lambda i: i.guild_id)
     async def leave_party(self, interaction: discord.Interaction):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         game_player = game.get_player(interaction.user.id)
 
@@ -313,6 +320,7 @@ class PlayerManager(commands.Cog):
         await party_channel.set_permissions(player_user, read_messages=False, send_messages=False,
                                             read_message_history=False)
 
+        game.mark_dirty(gdm.SECTION_PARTIES)
         await gdm.write_game(game=game)
         await interaction.response.send_message(f'You have left {game_party.party_name}!')
         await party_channel.send(f'**{game_player.player_discord_name}** has left {game_party.party_name}!')
@@ -322,5 +330,5 @@ class PlayerManager(commands.Cog):
 
 async def setup(bot: commands.Bot) -> None:
     cog = PlayerManager(bot)
-    await bot.add_cog(cog, guilds=[discord.Object(id=Conf.GUILD_ID)])
+    await bot.add_cog(cog, guilds=[discord.Object(id=guild_id) for guild_id in game_states.guild_ids])
     log_info(f'Cog {cog.__class__.__name__} loaded!')
\ No newline at end of file
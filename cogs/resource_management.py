@@ -1,14 +1,88 @@
 #! resource_management.py
 # Class with slash commands managing resources
 
+import asyncio
 import discord
+from typing import List
 from discord import app_commands
 from discord.ext import commands
-from dom.conf_vars import ConfVars as Conf
 import dom.data_model as gdm
+from dom.game_state_manager import game_states
+from dom.resource_engine import apply_daily_resource_tick, PlayerResourceDeltas
+from dom.resource_ledger import ResourceTransaction, LedgerEntry, TRANSACTION_TRANSFER, TRANSACTION_GRANT, \
+    TRANSACTION_REMOVAL, TRANSACTION_INCOME, TRANSACTION_EXPIRY, apply_transactions, record_transactions, get_ledger
 from bot_logging.logging_manager import log_interaction_call, log_info
 from utils.command_autocompletes import player_list_autocomplete, resource_type_autocomplete
-from utils.message_formatter import *
+from utils.message_formatter import construct_resource_modified_display, construct_player_resources_display, \
+    construct_player_resources_display_table, construct_resource_history_display
+
+
+def get_daily_tick_transactions(player_deltas: List[PlayerResourceDeltas]) -> List[ResourceTransaction]:
+    # Each player's expirations and incomes become one transaction of each type; perishing always leaves nothing
+    transactions = []
+    for player_delta in player_deltas:
+        player_id = player_delta.player.player_id
+        expiry_entries = [LedgerEntry(player_id, delta.resource.resource_type, -delta.expired_amt,
+                                      applied_amt=-delta.expired_amt, balance=0)
+                          for delta in player_delta.deltas if delta.expired_amt > 0]
+        income_entries = [LedgerEntry(player_id, delta.resource.resource_type, delta.income_amt,
+                                      applied_amt=delta.gained_amt, balance=delta.resource.resource_amt)
+                          for delta in player_delta.deltas if delta.income_amt > 0]
+        if expiry_entries:
+            transactions.append(ResourceTransaction(TRANSACTION_EXPIRY, expiry_entries, reason="daily tick"))
+        if income_entries:
+            transactions.append(ResourceTransaction(TRANSACTION_INCOME, income_entries, reason="daily tick"))
+    return transactions
+
+
+async def trigger_daily_incomes(guild: discord.Guild, game: gdm.Game, send_spacing: float = 0):
+    # Scheduled runs pass a send_spacing, pausing that many seconds before each player's notifications so a large game
+    # does not send them all in one burst
+    game_players = game.players
+    player_deltas = apply_daily_resource_tick(game_players)
+    record_transactions(game, get_daily_tick_transactions(player_deltas))
+
+    # Saved before any notification is sent, so a Discord error part way through cannot leave the incomes applied but
+    # unwritten, to be paid a second time when the tick is retried
+    game.mark_dirty(gdm.SECTION_PLAYERS)
+    await gdm.write_game(game)
+
+    for player_delta in player_deltas:
+        if send_spacing:
+            await asyncio.sleep(send_spacing)
+        player_moderation_channel = await guild.fetch_channel(player_delta.player.player_mod_channel)
+        for delta in player_delta.deltas:
+            if delta.expired_amt > 0:
+                # notify player how much of a resource they lost due to expiration
+                expiration_responses = await construct_resource_modified_display(action='expired',
+                                                                                 player_resource=delta.resource,
+                                                                                 res_change_amt=delta.expired_amt,
+                                                                                 game=game,
+                                                                                 guild=guild)
+                if player_moderation_channel:
+                    for expiration_response in expiration_responses:
+                        await player_moderation_channel.send(expiration_response)
+            if delta.income_amt > 0:
+                income_responses = await construct_resource_modified_display(action='income',
+                                                                             player_resource=delta.resource,
+                                                                             res_change_amt=delta.income_amt,
+                                                                             game=game,
+                                                                             guild=guild)
+                if player_moderation_channel:
+                    for income_response in income_responses:
+                        await player_moderation_channel.send(income_response)
+
+    # Notify player of new resource totals
+    for game_player in game_players:
+        if send_spacing:
+            await asyncio.sleep(send_spacing)
+        player_moderation_channel = await guild.fetch_channel(game_player.player_mod_channel)
+        if player_moderation_channel:
+            display_responses = await construct_player_resources_display(player=game_player,
+                                                                         game=game,
+                                                                         guild=guild)
+            for display_response in display_responses:
+                await player_moderation_channel.send(display_response)
 
 
 class ResourceManager(commands.Cog):
@@ -22,52 +96,10 @@ class ResourceManager(commands.Cog):
                                              interaction: discord.Interaction):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
-        game_players = game.players
-
-        for game_player in game_players:
-            player_moderation_channel = await guild.fetch_channel(game_player.player_mod_channel)
-            for player_resource in game_player.player_resources:
-                if player_resource.is_perishable:
-                    if player_resource.resource_amt > 0:
-                        # notify player how much of a resource they lost due to expiration
-                        expiration_responses = await construct_resource_modified_display(action='expired',
-                                                                                         player_resource=player_resource,
-                                                                                         res_change_amt=player_resource.resource_amt,
-                                                                                         game=game,
-                                                                                         guild=guild)
-                        if player_moderation_channel:
-                            for expiration_response in expiration_responses:
-                                await player_moderation_channel.send(expiration_response)
-
-                    player_resource.resource_amt = 0
-                if player_resource.resource_income and player_resource.resource_income > 0:
-                    player_resource.resource_amt += player_resource.resource_income
-                    if player_resource.resource_amt > player_resource.resource_max:
-                        player_resource.resource_amt = player_resource.resource_max
-                    income_responses = await construct_resource_modified_display(action='income',
-                                                                                 player_resource=player_resource,
-                                                                                 res_change_amt=player_resource.resource_income,
-                                                                                 game=game,
-                                                                                 guild=guild)
-                    if player_moderation_channel:
-                        for income_response in income_responses:
-                            await player_moderation_channel.send(income_response)
-
-        # save game information
-        await gdm.write_game(game)
-
-        # Notify player of new resource totals
-        for game_player in game_players:
-            player_moderation_channel = await guild.fetch_channel(game_player.player_mod_channel)
-            if player_moderation_channel:
-                display_responses = await construct_player_resources_display(player=game_player,
-                                                                             game=game,
-                                                                             guild=guild)
-                for display_response in display_responses:
-                    await player_moderation_channel.send(display_response)
+        await trigger_daily_incomes(guild=guild, game=game)
 
     @app_commands.command(name="resource-player-view",
                           description="Generates a display of the chosen player's resources")
@@ -78,7 +110,7 @@ class ResourceManager(commands.Cog):
                                    player: str):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         game_player = game.get_player(int(player))
@@ -99,7 +131,7 @@ class ResourceManager(commands.Cog):
                                    interaction: discord.Interaction):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
         game_players = game.players
 
@@ -120,7 +152,7 @@ class ResourceManager(commands.Cog):
                             interaction: discord.Interaction):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         game_player = game.get_player(interaction.user.id)
@@ -134,6 +166,55 @@ class ResourceManager(commands.Cog):
         for response in player_resource_responses:
             await interaction.followup.send(f'{response}', ephemeral=True)
 
+    @app_commands.command(name="resource-history",
+                          description="Shows your most recent resource changes")
+    async def resource_history(self,
+                               interaction: discord.Interaction,
+                               limit: app_commands.Range[int, 1, 50] = 20):
+        log_interaction_call(interaction)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        game = await game_states.get_interaction_game(interaction)
+        guild = interaction.guild
+
+        game_player = game.get_player(interaction.user.id)
+
+        if not game_player:
+            await interaction.followup.send(f'You are not a registered player for this game!')
+            return
+
+        transactions = get_ledger(game).get_player_transactions(game_player.player_id, limit=limit)
+        history_responses = await construct_resource_history_display(player=game_player, transactions=transactions,
+                                                                     guild=guild, game=game)
+
+        for response in history_responses:
+            await interaction.followup.send(f'{response}', ephemeral=True)
+
+    @app_commands.command(name="resource-player-history",
+                          description="Shows the chosen player's most recent resource changes")
+    @app_commands.default_permissions(manage_guild=True)
+    @app_commands.autocomplete(player=player_list_autocomplete)
+    async def resource_player_history(self,
+                                      interaction: discord.Interaction,
+                                      player: str,
+                                      limit: app_commands.Range[int, 1, 50] = 20):
+        log_interaction_call(interaction)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        game = await game_states.get_interaction_game(interaction)
+        guild = interaction.guild
+
+        game_player = game.get_player(int(player))
+
+        if not game_player:
+            await interaction.followup.send(f'The selected player is not a registered player for this game!')
+            return
+
+        transactions = get_ledger(game).get_player_transactions(game_player.player_id, limit=limit)
+        history_responses = await construct_resource_history_display(player=game_player, transactions=transactions,
+                                                                     guild=guild, game=game)
+
+        for response in history_responses:
+            await interaction.followup.send(f'{response}', ephemeral=True)
+
     @app_commands.command(name="resource-player-add",
                           description="Adds an amount of resources to a chosen player")
     @app_commands.default_permissions(manage_guild=True)
@@ -146,20 +227,20 @@ class ResourceManager(commands.Cog):
                                   resource_amt: app_commands.Range[int, 1, 100]):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
-        game_player = game.get_player(int(player))
-        resource_to_modify = game_player.get_resource(resource_type)
+        transaction = ResourceTransaction(TRANSACTION_GRANT,
+                                          [LedgerEntry(int(player), resource_type, resource_amt)],
+                                          actor_id=interaction.user.id)
+        transaction_error = apply_transactions(game, [transaction])
 
-        if resource_to_modify is None:
-            await interaction.followup.send(
-                f'Resource {resource_type} not defined for player {game_player.player_discord_name}!',
-                ephemeral=True)
+        if transaction_error is not None:
+            await interaction.followup.send(transaction_error, ephemeral=True)
             return
 
-        game_player.modify_resource(resource_name=resource_type, amt=resource_amt)
-
+        game_player = game.get_player(int(player))
+        resource_to_modify = game_player.get_resource(resource_type)
         await gdm.write_game(game=game)
 
         await interaction.followup.send(f'Added {resource_amt} of resource {resource_type} to player '
@@ -190,20 +271,20 @@ class ResourceManager(commands.Cog):
                                      resource_amt: app_commands.Range[int, 1, 100]):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
-        game_player = game.get_player(int(player))
-        resource_to_modify = game_player.get_resource(resource_type)
+        transaction = ResourceTransaction(TRANSACTION_REMOVAL,
+                                          [LedgerEntry(int(player), resource_type, -resource_amt)],
+                                          actor_id=interaction.user.id)
+        transaction_error = apply_transactions(game, [transaction])
 
-        if resource_to_modify is None:
-            await interaction.followup.send(
-                f'Resource {resource_type} not defined for player {game_player.player_discord_name}!',
-                ephemeral=True)
+        if transaction_error is not None:
+            await interaction.followup.send(transaction_error, ephemeral=True)
             return
 
-        game_player.modify_resource(resource_name=resource_type, amt=-resource_amt)
-
+        game_player = game.get_player(int(player))
+        resource_to_modify = game_player.get_resource(resource_type)
         await gdm.write_game(game=game)
 
         await interaction.followup.send(f'Removed {resource_amt} of resource {resource_type} from player '
@@ -236,34 +317,26 @@ class ResourceManager(commands.Cog):
                                        resource_amt: app_commands.Range[int, 1, 100]):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         sending_player = game.get_player(int(player))
         receiving_player = game.get_player(int(recipient_player))
 
-        resource_to_send = sending_player.get_resource(resource_type)
-
-        if resource_to_send is None:
-            await interaction.followup.send(
-                f'Resource {resource_type} not defined for player {sending_player.player_discord_name}!',
-                ephemeral=True)
-            return
-        if not resource_to_send.is_commodity:
-            await interaction.followup.send(f'Resource {resource_type} is not defined as a commodity! Cannot transfer '
-                                            f'non-commodity resources!', ephemeral=True)
-            return
-        if resource_amt > resource_to_send.resource_amt:
-            await interaction.followup.send(
-                f'Resource Amount {resource_amt} exceeds available amount of {resource_to_send.resource_amt} for player '
-                f'{sending_player.player_discord_name}!', ephemeral=True)
-            return
         if receiving_player is None:
             await interaction.followup.send(f'Recipient player was not a valid choice!', ephemeral=True)
             return
 
-        sending_player.modify_resource(resource_name=resource_type, amt=-resource_amt)
-        receiving_player.modify_resource(resource_name=resource_type, amt=resource_amt)
+        # Both sides of the transfer are validated before either is applied
+        transaction = ResourceTransaction(TRANSACTION_TRANSFER,
+                                          [LedgerEntry(int(player), resource_type, -resource_amt),
+                                           LedgerEntry(receiving_player.player_id, resource_type, resource_amt)],
+                                          actor_id=interaction.user.id)
+        transaction_error = apply_transactions(game, [transaction])
+
+        if transaction_error is not None:
+            await interaction.followup.send(transaction_error, ephemeral=True)
+            return
 
         sent_resource = sending_player.get_resource(resource_name=resource_type)
         received_resource = receiving_player.get_resource(resource_name=resource_type)
@@ -308,7 +381,7 @@ class ResourceManager(commands.Cog):
                                 resource_amt: app_commands.Range[int, 1, 100]):
         log_interaction_call(interaction)
         await interaction.response.defer(ephemeral=True, thinking=True)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
         guild = interaction.guild
 
         if not game.is_active:
@@ -330,28 +403,20 @@ class ResourceManager(commands.Cog):
             await interaction.followup.send(f'You are currently dead and cannot transfer resources!')
             return
 
-        resource_to_send = sending_player.get_resource(resource_type)
-
-        if resource_to_send is None:
-            await interaction.followup.send(
-                f'Resource {resource_type} not defined for player {sending_player.player_discord_name}!',
-                ephemeral=True)
-            return
-        if not resource_to_send.is_commodity:
-            await interaction.followup.send(f'Resource {resource_type} is not defined as a commodity! Cannot transfer '
-                                            f'non-commodity resources!', ephemeral=True)
-            return
-        if resource_amt > resource_to_send.resource_amt:
-            await interaction.followup.send(
-                f'Resource Amount {resource_amt} exceeds available amount of {resource_to_send.resource_amt} for player '
-                f'{sending_player.player_discord_name}!', ephemeral=True)
-            return
         if receiving_player is None:
             await interaction.followup.send(f'Recipient player was not a valid choice!', ephemeral=True)
             return
 
-        sending_player.modify_resource(resource_name=resource_type, amt=-resource_amt)
-        receiving_player.modify_resource(resource_name=resource_type, amt=resource_amt)
+        # Both sides of the transfer are validated before either is applied
+        transaction = ResourceTransaction(TRANSACTION_TRANSFER,
+                                          [LedgerEntry(sending_player.player_id, resource_type, -resource_amt),
+                                           LedgerEntry(receiving_player.player_id, resource_type, resource_amt)],
+                                          actor_id=interaction.user.id)
+        transaction_error = apply_transactions(game, [transaction])
+
+        if transaction_error is not None:
+            await interaction.followup.send(transaction_error, ephemeral=True)
+            return
 
         sent_resource = sending_player.get_resource(resource_name=resource_type)
         received_resource = receiving_player.get_resource(resource_name=resource_type)
@@ -388,5 +453,5 @@ class ResourceManager(commands.Cog):
 
 async def setup(bot: commands.Bot) -> None:
     cog = ResourceManager(bot)
-    await bot.add_cog(cog, guilds=[discord.Object(id=Conf.GUILD_ID)])
+    await bot.add_cog(cog, guilds=[discord.Object(id=guild_id) for guild_id in game_states.guild_ids])
     log_info(f'Cog {cog.__class__.__name__} loaded!')
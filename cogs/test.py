@@ -5,8 +5,7 @@ import os
 import discord
 from discord import app_commands
 from discord.ext import commands
-from dotenv import load_dotenv
-from dom.conf_vars import ConfVars as Conf
+from dom.game_state_manager import game_states
 
 class Test(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
@@ -18,4 +17,4 @@ class Test(commands.Cog):
         await interaction.response.send_message("Test success", ephemeral=True)
 
 async def setup(bot: commands.Bot) -> None:
-    await bot.add_cog(Test(bot), guilds=[discord.Object(id=Conf.GUILD_ID)])
+    await bot.add_cog(Test(bot), guilds=[discord.Object(id=guild_id) for guild_id in game_states.guild_ids])
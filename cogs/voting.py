@@ -1,14 +1,16 @@
 #! voting.py
 # Class with slash commands managing round and dilemma voting
 
+import asyncio
 import discord
 from discord import app_commands
 from discord import TextChannel, Message, Role
 from discord.ext import commands
-from dom.conf_vars import ConfVars as Conf
 import dom.data_model as gdm
+from dom.game_state_manager import game_states
 from typing import Optional, Literal, List
 from dom.data_model import Game, Round, Dilemma, Player, Vote
+from dom.action_queue import prune_resolved_actions
 from bot_logging.logging_manager import log_interaction_call, log_info
 from utils.command_autocompletes import player_list_autocomplete, dilemma_choice_autocomplete, dilemma_name_autocomplete
 import time
@@ -22,9 +24,9 @@ async def create_and_pin_report_message(channel: TextChannel, report_name: str,
     return report_message.id
 
 
-async def update_report_message(interaction: discord.Interaction, channel_id: int, message_id: int, report_name: str,
+async def update_report_message(guild: discord.Guild, channel_id: int, message_id: int, report_name: str,
                                 report_type: str, game: Game, votes: List[Vote]):
-    channel = await interaction.guild.fetch_channel(channel_id)
+    channel = await guild.fetch_channel(channel_id)
     message = await channel.fetch_message(message_id)
     formatted_votes = await construct_vote_report(report_name=report_name, report_type=report_type, game=game,
                                                   votes=votes)
@@ -76,6 +78,37 @@ async def construct_vote_report(report_name: str, report_type: str, game: Option
     return formatted_votes
 
 
+async def end_latest_round(game: Game) -> Optional[Round]:
+    # Closes the latest round along with its dilemmas, returning the round if it was still active
+    latest_round = game.get_latest_round()
+    if latest_round is None or not latest_round.is_active_round:
+        return None
+    latest_round.is_active_round = False
+    latest_round.close_dilemmas()
+    game.mark_dirty(gdm.SECTION_ROUNDS)
+    await gdm.write_game(game=game)
+    prune_resolved_actions(game)
+    return latest_round
+
+
+async def refresh_vote_reports(guild: discord.Guild, game: Game, send_spacing: float = 0):
+    # Rewrites the pinned report of the latest round and each of its dilemmas from the current votes
+    latest_round = game.get_latest_round()
+    if latest_round is None:
+        return
+    await update_report_message(guild=guild, channel_id=latest_round.round_channel_id,
+                                message_id=latest_round.round_message_id,
+                                report_name=f'{latest_round.round_number}',
+                                report_type="Round", game=game, votes=latest_round.votes)
+    for round_dilemma in latest_round.round_dilemmas:
+        if send_spacing:
+            await asyncio.sleep(send_spacing)
+        await update_report_message(guild=guild, channel_id=round_dilemma.dilemma_channel_id,
+                                    message_id=round_dilemma.dilemma_message_id,
+                                    report_name=f'{round_dilemma.dilemma_name}',
+                                    report_type="Dilemma", game=game, votes=round_dilemma.dilemma_votes)
+
+
 class VotingManager(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
@@ -87,11 +120,12 @@ class VotingManager(commands.Cog):
                            interaction: discord.Interaction,
                            channel: Optional[TextChannel]):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         latest_round = game.get_latest_round()
 
-        report_channel = channel if channel is not None else interaction.guild.get_channel(Conf.VOTE_CHANNEL)
+        report_channel = channel if channel is not None \
+            else interaction.guild.get_channel(game_states.get_guild_settings(interaction.guild_id).vote_channel)
 
         if latest_round is None:
             message_id = await create_and_pin_report_message(channel=report_channel, report_name="1",
@@ -121,17 +155,16 @@ class VotingManager(commands.Cog):
     async def round_end(self,
                         interaction: discord.Interaction):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         latest_round = game.get_latest_round()
 
         if latest_round is None:
             await interaction.response.send_message(f'There is not currently an active round to end!', ephemeral=True)
             return
-        else:
-            latest_round.is_active_round = False
 
-        await gdm.write_game(game=game)
+        # The same as a scheduled round end, so the round's dilemmas are closed along with it
+        await end_latest_round(game)
         await interaction.response.send_message(f'Ended round {latest_round.round_number}!', ephemeral=True)
 
     @app_commands.command(name="round-vote",
@@ -142,7 +175,7 @@ class VotingManager(commands.Cog):
                          player: Optional[str] = None,
                          other: Optional[Literal['No Vote', 'Unvote']] = None):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         if not game.is_active:
             await interaction.response.send_message(
@@ -203,10 +236,11 @@ class VotingManager(commands.Cog):
             else:
                 round_current_player_vote.choice = str(voted_player.player_id)
                 round_current_player_vote.timestamp = round(time.time())
+        game.mark_dirty(gdm.SECTION_ROUNDS)
 
         await gdm.write_game(game=game)
 
-        await update_report_message(interaction=interaction, channel_id=latest_round.round_channel_id,
+        await update_report_message(guild=interaction.guild, channel_id=latest_round.round_channel_id,
                                     message_id=latest_round.round_message_id,
                                     report_name=f'{latest_round.round_number}',
                                     report_type="Round", game=game, votes=latest_round.votes)
@@ -239,7 +273,7 @@ class VotingManager(commands.Cog):
                                 interaction: discord.Interaction,
                                 for_round: Optional[app_commands.Range[int, 0, 20]] = None):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         if not game.is_active:
             await interaction.response.send_message(
@@ -275,7 +309,7 @@ class VotingManager(commands.Cog):
                              dilemma_name: str,
                              dilemma_channel: discord.TextChannel):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         latest_round = game.get_latest_round()
 
@@ -292,9 +326,10 @@ class VotingManager(commands.Cog):
             message_id = await create_and_pin_report_message(channel=dilemma_channel, report_name=dilemma_name,
                                                              report_type="Dilemma")
             new_dilemma = Dilemma(dilemma_votes=[], dilemma_name=dilemma_name, dilemma_channel_id=dilemma_channel.id,
-                                  dilemma_message_id=message_id, dilemma_player_ids=[], dilemma_choices=[],
+                                  dilemma_message_id=message_id, dilemma_player_ids=set(), dilemma_choices=set(),
                                   is_active_dilemma=False)
             latest_round.add_dilemma(new_dilemma)
+            game.mark_dirty(gdm.SECTION_ROUNDS)
 
         await gdm.write_game(game=game)
         await interaction.response.send_message(
@@ -310,7 +345,7 @@ class VotingManager(commands.Cog):
                                          role: Optional[Role],
                                          player_action: Literal['Add', 'Remove']):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         latest_round = game.get_latest_round()
 
@@ -352,6 +387,7 @@ class VotingManager(commands.Cog):
                 await interaction.response.send_message(
                     f'Removed all players in {channel.name} with role {role.name} from dilemma {round_dilemma.dilemma_name}!',
                     ephemeral=True)
+            game.mark_dirty(gdm.SECTION_ROUNDS)
         await gdm.write_game(game=game)
 
     @app_commands.command(name="dilemma-update-player",
@@ -364,7 +400,7 @@ class VotingManager(commands.Cog):
                                     player: str,
                                     player_action: Literal['Add', 'Remove']):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         latest_round = game.get_latest_round()
         game_player = game.get_player(int(player))
@@ -400,6 +436,7 @@ class VotingManager(commands.Cog):
                 await interaction.response.send_message(
                     f'Removed player {game_player.player_discord_name} from dilemma {round_dilemma.dilemma_name}!',
                     ephemeral=True)
+            game.mark_dirty(gdm.SECTION_ROUNDS)
         await gdm.write_game(game=game)
 
     @app_commands.command(name="dilemma-update-choices",
@@ -413,7 +450,7 @@ class VotingManager(commands.Cog):
                                      dilemma_choice_add: Optional[str],
                                      dilemma_choice_remove: Optional[str]):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         latest_round = game.get_latest_round()
 
@@ -445,6 +482,7 @@ class VotingManager(commands.Cog):
                 await interaction.response.send_message(
                     f'Removed choice {dilemma_choice_remove} from dilemma {round_dilemma.dilemma_name}!',
                     ephemeral=True)
+            game.mark_dirty(gdm.SECTION_ROUNDS)
         await gdm.write_game(game=game)
 
     @app_commands.command(name="dilemma-vote",
@@ -457,7 +495,7 @@ class VotingManager(commands.Cog):
                            dilemma_choice: Optional[str] = None,
                            other_choices: Optional[Literal['Unvote']] = None):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         if not game.is_active:
             await interaction.response.send_message(
@@ -507,10 +545,11 @@ class VotingManager(commands.Cog):
         else:
             dilemma_current_player_vote.choice = dilemma_choice
             dilemma_current_player_vote.timestamp = round(time.time())
+        game.mark_dirty(gdm.SECTION_ROUNDS)
 
         await gdm.write_game(game=game)
 
-        await update_report_message(interaction=interaction, channel_id=player_dilemma.dilemma_channel_id,
+        await update_report_message(guild=interaction.guild, channel_id=player_dilemma.dilemma_channel_id,
                                     message_id=player_dilemma.dilemma_message_id,
                                     report_name=f'{player_dilemma.dilemma_name}',
                                     report_type="Dilemma", game=game, votes=player_dilemma.dilemma_votes)
@@ -538,7 +577,7 @@ class VotingManager(commands.Cog):
                                   interaction: discord.Interaction,
                                   dilemma_name: str):
         log_interaction_call(interaction)
-        game = await gdm.get_game(file_path=Conf.GAME_PATH)
+        game = await game_states.get_interaction_game(interaction)
 
         if not game.is_active:
             await interaction.response.send_message(
@@ -578,5 +617,5 @@ class VotingManager(commands.Cog):
 
 async def setup(bot: commands.Bot) -> None:
     cog = VotingManager(bot)
-    await bot.add_cog(cog, guilds=[discord.Object(id=Conf.GUILD_ID)])
+    await bot.add_cog(cog, guilds=[discord.Object(id=guild_id) for guild_id in game_states.guild_ids])
     log_info(f'Cog {cog.__class__.__name__} loaded!')
@@ -0,0 +1,134 @@
+#! action_queue.py
+# Holds each round's submitted actions until moderators resolve them in priority order, persisted next to the game
+
+import json
+import os
+import time
+import uuid
+from typing import Optional, List, Dict
+from dom.conf_vars import ConfVars as Conf
+import dom.data_model as gdm
+from dom.data_model import Game
+from bot_logging.logging_manager import logger
+
+# Actions without a priority are given -1, and resolve after every prioritized action
+UNPRIORITIZED = -1
+
+# Queues cached per game path, so a submission does not re-read the queue file
+action_queues: Dict[str, List['QueuedAction']] = {}
+
+
+class QueuedAction:
+    def __init__(self, round_number: int, player_id: int, action_name: str, action_priority: int,
+                 targets: List[str], request_details: Optional[str], submitted_at: Optional[float] = None,
+                 submission_id: Optional[str] = None, resolved_at: Optional[int] = None,
+                 resolved_by: Optional[int] = None):
+        self.round_number = round_number
+        self.player_id = player_id
+        self.action_name = action_name
+        self.action_priority = action_priority
+        self.targets = targets
+        self.request_details = request_details
+        self.submitted_at = submitted_at if submitted_at is not None else time.time()
+        self.submission_id = submission_id if submission_id is not None else uuid.uuid4().hex[:12]
+        self.resolved_at = resolved_at
+        self.resolved_by = resolved_by
+
+    @property
+    def is_resolved(self) -> bool:
+        return self.resolved_at is not None
+
+    @property
+    def resolution_order(self) -> tuple:
+        # Lowest priority number first, unprioritized actions last, and first come first served within a priority
+        return self.action_priority == UNPRIORITIZED, self.action_priority, self.submitted_at
+
+    def to_dict(self) -> dict:
+        return {"submission_id": self.submission_id, "round_number": self.round_number, "player_id": self.player_id,
+                "action_name": self.action_name, "action_priority": self.action_priority, "targets": self.targets,
+                "request_details": self.request_details, "submitted_at": self.submitted_at,
+                "resolved_at": self.resolved_at, "resolved_by": self.resolved_by}
+
+
+def get_queue_path(game: Game) -> str:
+    game_path = game.file_path if game.file_path else f'{Conf.BASE_PATH}/{Conf.GAME_FILE}'
+    return gdm.side_file_path(game_path, gdm.ACTION_QUEUE_FILE_SUFFIX)
+
+
+def forget_queue(game_path: str):
+    # Used when the queue file is replaced on disk, such as by a snapshot restore, so it is read again
+    action_queues.pop(gdm.side_file_path(game_path, gdm.ACTION_QUEUE_FILE_SUFFIX), None)
+
+
+def load_queue(game: Game) -> List[QueuedAction]:
+    queue_path = get_queue_path(game)
+    if queue_path in action_queues:
+        return action_queues[queue_path]
+    queue = []
+    if os.path.isfile(queue_path):
+        try:
+            with open(queue_path, 'r', encoding="utf8") as queue_file:
+                queue = [QueuedAction(round_number=entry.get("round_number"), player_id=entry.get("player_id"),
+                                      action_name=entry.get("action_name"),
+                                      action_priority=entry.get("action_priority", UNPRIORITIZED),
+                                      targets=entry.get("targets", []), request_details=entry.get("request_details"),
+                                      submitted_at=entry.get("submitted_at"), submission_id=entry.get("submission_id"),
+                                      resolved_at=entry.get("resolved_at"), resolved_by=entry.get("resolved_by"))
+                         for entry in json.load(queue_file)]
+        except (OSError, ValueError) as e:
+            logger.error(f'Could not read action queue {queue_path}; starting a new one\n{e}')
+    action_queues[queue_path] = queue
+    return queue
+
+
+def get_queue_round_number(game: Game) -> int:
+    # Submissions made before the first round is created are queued under round 0
+    latest_round = game.get_latest_round()
+    return latest_round.round_number if latest_round is not None else 0
+
+
+def is_queue_round_open(game: Game, round_number: int) -> bool:
+    latest_round = game.get_latest_round()
+    if latest_round is None:
+        return round_number == 0
+    return latest_round.round_number == round_number and latest_round.is_active_round
+
+
+def save_queue(game: Game, queue: List[QueuedAction]):
+    # Resolved actions are dropped once their round has closed, so the file only grows within the current round
+    queue = [queued_action for queued_action in queue
+             if not queued_action.is_resolved or is_queue_round_open(game, queued_action.round_number)]
+    action_queues[get_queue_path(game)] = queue
+    gdm.write_text_file(get_queue_path(game),
+                        json.dumps([queued_action.to_dict() for queued_action in queue], indent=2,
+                                   ensure_ascii=False))
+
+
+def enqueue_action(game: Game, queued_action: QueuedAction):
+    save_queue(game, load_queue(game) + [queued_action])
+
+
+def get_pending_actions(game: Game, round_number: int) -> List[QueuedAction]:
+    return sorted((queued_action for queued_action in load_queue(game)
+                   if queued_action.round_number == round_number and not queued_action.is_resolved),
+                  key=lambda e: e.resolution_order)
+
+
+def resolve_next_actions(game: Game, round_number: int, count: int, resolved_by: int) -> List[QueuedAction]:
+    # Marks the next count pending actions of the round as resolved in one write, returning them in priority order
+    resolved_actions = get_pending_actions(game, round_number)[:count]
+    if resolved_actions:
+        resolved_at = round(time.time())
+        for queued_action in resolved_actions:
+            queued_action.resolved_at = resolved_at
+            queued_action.resolved_by = resolved_by
+        save_queue(game, load_queue(game))
+    return resolved_actions
+
+
+def prune_resolved_actions(game: Game):
+    # Called when a round closes; saving the queue drops the round's resolved actions
+    queue = load_queue(game)
+    if any(queued_action.is_resolved and not is_queue_round_open(game, queued_action.round_number)
+           for queued_action in queue):
+        save_queue(game, queue)
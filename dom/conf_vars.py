@@ -2,44 +2,111 @@
 # Loads and stores environment variables
 
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-class ConfVars:
-    # Required Configs
-    TOKEN = os.getenv('DISCORD_TOKEN')
-    GUILD_ID = int(os.getenv('GUILD_ID'))
-    BASE_PATH = os.getenv('BASE_PATH')
-    GAME_FILE = os.getenv('GAME_FILE')
-    GAME_PATH = f'{BASE_PATH}/{GAME_FILE}'
-
-    # Optional Arguments - Some Commands Require These Commands if used
-    MOD_ROLE_ID = int(os.getenv('MOD_ROLE_ID'))
-    PRIVATE_CHAT_CATEGORY = int(os.getenv('PRIVATE_CHAT_CATEGORY'))
-    MOD_CATEGORY = int(os.getenv('MOD_CATEGORY'))
-    REQUEST_CHANNEL = int(os.getenv('REQUEST_CHANNEL'))
-    VOTE_CHANNEL = int(os.getenv('VOTE_CHANNEL'))
-
-    # Optional Arguments - Enable advanced functionality
-    PLAYER_FILE = os.getenv('PLAYER_FILE')
-    PLAYER_PATH = f'{BASE_PATH}/{PLAYER_FILE}' if PLAYER_FILE else None
-    PARTY_FILE = os.getenv('PARTY_FILE')
-    PARTY_PATH = f'{BASE_PATH}/{PARTY_FILE}' if PARTY_FILE else None
-    ATTRIBUTE_DEF_FILE = os.getenv('ATTRIBUTE_DEF_FILE')
-    ATTRIBUTE_DEF_PATH = f'{BASE_PATH}/{ATTRIBUTE_DEF_FILE}' if ATTRIBUTE_DEF_FILE else None
-    RESOURCE_DEF_FILE = os.getenv('RESOURCE_DEF_FILE')
-    RESOURCE_DEF_PATH = f'{BASE_PATH}/{RESOURCE_DEF_FILE}' if RESOURCE_DEF_FILE else None
-    ITEM_TYPE_DEF_FILE = os.getenv('ITEM_TYPE_DEF_FILE')
-    ITEM_TYPE_DEF_PATH = f'{BASE_PATH}/{ITEM_TYPE_DEF_FILE}' if ITEM_TYPE_DEF_FILE else None
-    SKILL_FILE = os.getenv('SKILL_FILE')
-    SKILL_PATH = f'{BASE_PATH}/{SKILL_FILE}' if SKILL_FILE else None
-    STATUS_MOD_FILE = os.getenv('STATUS_MOD_FILE')
-    STATUS_MOD_PATH = f'{BASE_PATH}/{STATUS_MOD_FILE}' if STATUS_MOD_FILE else None
-    ACTION_FILE = os.getenv('ACTION_FILE')
-    ACTION_PATH = f'{BASE_PATH}/{ACTION_FILE}' if ACTION_FILE else None
-    ITEM_FILE = os.getenv('ITEM_FILE')
-    ITEM_PATH = f'{BASE_PATH}/{ITEM_FILE}' if ITEM_FILE else None
-    CHAR_SHEET_FILE = os.getenv('CHAR_SHEET_FILE')
-    CHAR_SHEET_PATH = f'{BASE_PATH}/{CHAR_SHEET_FILE}' if CHAR_SHEET_FILE else None
 
+
+def read_conf_vars() -> dict:
+    # dotenv is imported here rather than at the top, so it is only loaded once a setting is actually read
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    class EnvConfVars:
+        # Required Configs
+        TOKEN = os.getenv('DISCORD_TOKEN')
+        GUILD_ID = int(os.getenv('GUILD_ID'))
+        BASE_PATH = os.getenv('BASE_PATH')
+        GAME_FILE = os.getenv('GAME_FILE')
+        GAME_PATH = f'{BASE_PATH}/{GAME_FILE}'
+
+        # Optional Arguments - Some Commands Require These Commands if used
+        MOD_ROLE_ID = int(os.getenv('MOD_ROLE_ID'))
+        PRIVATE_CHAT_CATEGORY = int(os.getenv('PRIVATE_CHAT_CATEGORY'))
+        MOD_CATEGORY = int(os.getenv('MOD_CATEGORY'))
+        REQUEST_CHANNEL = int(os.getenv('REQUEST_CHANNEL'))
+        VOTE_CHANNEL = int(os.getenv('VOTE_CHANNEL'))
+
+        # Optional Arguments - Enable advanced functionality
+        PLAYER_FILE = os.getenv('PLAYER_FILE')
+        PLAYER_PATH = f'{BASE_PATH}/{PLAYER_FILE}' if PLAYER_FILE else None
+        PARTY_FILE = os.getenv('PARTY_FILE')
+        PARTY_PATH = f'{BASE_PATH}/{PARTY_FILE}' if PARTY_FILE else None
+        ATTRIBUTE_DEF_FILE = os.getenv('ATTRIBUTE_DEF_FILE')
+        ATTRIBUTE_DEF_PATH = f'{BASE_PATH}/{ATTRIBUTE_DEF_FILE}' if ATTRIBUTE_DEF_FILE else None
+        RESOURCE_DEF_FILE = os.getenv('RESOURCE_DEF_FILE')
+        RESOURCE_DEF_PATH = f'{BASE_PATH}/{RESOURCE_DEF_FILE}' if RESOURCE_DEF_FILE else None
+        ITEM_TYPE_DEF_FILE = os.getenv('ITEM_TYPE_DEF_FILE')
+        ITEM_TYPE_DEF_PATH = f'{BASE_PATH}/{ITEM_TYPE_DEF_FILE}' if ITEM_TYPE_DEF_FILE else None
+        SKILL_FILE = os.getenv('SKILL_FILE')
+        SKILL_PATH = f'{BASE_PATH}/{SKILL_FILE}' if SKILL_FILE else None
+        STATUS_MOD_FILE = os.getenv('STATUS_MOD_FILE')
+        STATUS_MOD_PATH = f'{BASE_PATH}/{STATUS_MOD_FILE}' if STATUS_MOD_FILE else None
+        ACTION_FILE = os.getenv('ACTION_FILE')
+        ACTION_PATH = f'{BASE_PATH}/{ACTION_FILE}' if ACTION_FILE else None
+        ITEM_FILE = os.getenv('ITEM_FILE')
+        ITEM_PATH = f'{BASE_PATH}/{ITEM_FILE}' if ITEM_FILE else None
+        CHAR_SHEET_FILE = os.getenv('CHAR_SHEET_FILE')
+        CHAR_SHEET_PATH = f'{BASE_PATH}/{CHAR_SHEET_FILE}' if CHAR_SHEET_FILE else None
+
+        # Optional Arguments - Persistence tuning
+        # Durability of game writes: 'none' never fsyncs, 'batch' fsyncs at most once per WRITE_BATCH_INTERVAL
+        # seconds, 'always' fsyncs every write before acknowledging it
+        WRITE_DURABILITY = os.getenv('WRITE_DURABILITY', 'always')
+        WRITE_BATCH_INTERVAL = float(os.getenv('WRITE_BATCH_INTERVAL', '5'))
+        # Number of game snapshots kept for restores (0 disables snapshots), and the minimum seconds between them
+        SNAPSHOT_COUNT = int(os.getenv('SNAPSHOT_COUNT', '20'))
+        SNAPSHOT_INTERVAL = int(os.getenv('SNAPSHOT_INTERVAL', '30'))
+
+        # Optional Arguments - Multi-game hosting
+        # Extra games hosted by this process, as comma separated 'guild_id[:channel_id]=game_file' routes where the game
+        # file is relative to BASE_PATH; GUILD_ID and GAME_FILE always remain the default route
+        GAME_ROUTES = os.getenv('GAME_ROUTES', '')
+        # Channel, category and role ids for every guild routed above other than GUILD_ID, which uses the ids set
+        # earlier in this file. Comma separated 'guild_id:request_channel=..;mod_role_id=..;mod_category=..;
+        # private_chat_category=..;vote_channel=..' entries; every routed guild must define all five
+        GUILD_SETTINGS = os.getenv('GUILD_SETTINGS', '')
+        # Seconds a loaded game may go unused before it is flushed and unloaded from memory
+        GAME_IDLE_TIMEOUT = int(os.getenv('GAME_IDLE_TIMEOUT', '1800'))
+
+        # Optional Arguments - Scheduled phases
+        # Seconds between checks for scheduled phases that are due, and seconds a missed run (such as one that fell
+        # while the bot was offline) may be late and still run; later than that it is skipped until its next time
+        SCHEDULE_CHECK_INTERVAL = int(os.getenv('SCHEDULE_CHECK_INTERVAL', '30'))
+        SCHEDULE_MISSED_GRACE = int(os.getenv('SCHEDULE_MISSED_GRACE', '3600'))
+        # Seconds paused between each player's notifications or report edits during a scheduled run
+        SCHEDULE_SEND_SPACING = float(os.getenv('SCHEDULE_SEND_SPACING', '0.5'))
+
+        # Optional Arguments - Diagnostics
+        # Seconds between command latency and error summaries written to the log
+        METRICS_LOG_INTERVAL = int(os.getenv('METRICS_LOG_INTERVAL', '900'))
+        # Port for the local Prometheus style /metrics endpoint (0 disables it) and the address it listens on
+        METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+        METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+        # Event loop lag in milliseconds that gets logged with a stack snapshot, and seconds of a complete stall before
+        # faulthandler dumps every thread's stack to stderr (0 disables the dump)
+        LOOP_LAG_THRESHOLD_MS = int(os.getenv('LOOP_LAG_THRESHOLD_MS', '250'))
+        LOOP_STALL_DUMP_SECONDS = int(os.getenv('LOOP_STALL_DUMP_SECONDS', '30'))
+
+        # Optional Arguments - Logging
+        # Log output format, either 'text' or 'json' for one structured record per line
+        LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+        # Fraction of records kept per level name or sample key, e.g. 'DEBUG=0.1,autocomplete=0.05'
+        LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', 'autocomplete=0.1')
+
+    return {name: value for name, value in vars(EnvConfVars).items() if name.isupper()}
+
+
+class LazyConfVars(type):
+    # Settings are read from the environment the first time any of them is used rather than on import; a setting
+    # assigned before then, such as by a benchmark, keeps its assigned value
+    def __getattr__(cls, name: str):
+        if name.startswith('__') or cls.loaded:
+            raise AttributeError(f"type object '{cls.__name__}' has no attribute '{name}'")
+        conf_vars = read_conf_vars()
+        cls.loaded = True
+        for conf_name, conf_value in conf_vars.items():
+            if conf_name not in cls.__dict__:
+                setattr(cls, conf_name, conf_value)
+        return getattr(cls, name)
+
+
+class ConfVars(metaclass=LazyConfVars):
+    loaded = False
@@ -1,13 +1,36 @@
 #! game_manager.py
 # a class for managing game state details
 import json
+import re
 import traceback
 from typing import Optional, List, Dict, Set
 from bot_logging.logging_manager import logger
-import csv
+from bot_logging.metrics_manager import time_phase, record_game_write, PHASE_PERSIST
 import time
 import os
 from dom.conf_vars import ConfVars as Conf
+import dom.snapshot_manager as snapshots
+
+# Sections of the game state tracked for dirty-checking; a write only needs to flush sections marked dirty
+SECTION_STATE = "state"
+SECTION_CATALOG = "catalog"
+SECTION_PLAYERS = "players"
+SECTION_PARTIES = "parties"
+SECTION_ROUNDS = "rounds"
+SECTION_PI_VIEWS = "pi_views"
+GAME_SECTIONS = (SECTION_STATE, SECTION_CATALOG, SECTION_PLAYERS, SECTION_PARTIES, SECTION_ROUNDS, SECTION_PI_VIEWS)
+
+# Sectioned storage layout: the game file holds live state, with the catalog and past rounds in sibling files
+SECTIONED_FORMAT_VERSION = 2
+GAME_FILE_SECTION = "game"
+CATALOG_FILE_PREFIX = "catalog"
+HISTORY_FILE_PREFIX = "history"
+# Files other modules keep beside the game, named <game>_<suffix>.json; they are recovered and snapshotted with it
+SCHEDULE_FILE_SUFFIX = "schedule"
+ACTION_QUEUE_FILE_SUFFIX = "action_queue"
+SIDE_FILE_SUFFIXES = (SCHEDULE_FILE_SUFFIX, ACTION_QUEUE_FILE_SUFFIX)
+# The resource ledger is appended to rather than rewritten, as <game>_ledger.jsonl; it is snapshotted with the game
+LEDGER_FILE_SUFFIX = "ledger"
 
 
 class PersistentInteractableView:
@@ -37,6 +60,13 @@ class ResourceCost:
         self.amount = amount
 
 
+def clamp_resource_amt(resource_amt: int, resource_max: int) -> int:
+    # Resources never go below zero, nor above their max unless the max is -1 for uncapped
+    if resource_max != -1 and resource_amt >= resource_max:
+        return resource_max
+    return max(resource_amt, 0)
+
+
 class Resource:
     def __init__(self, resource_type: str, resource_amt: int, resource_income: int, resource_max: int,
                  is_commodity: bool, is_perishable):
@@ -112,6 +142,8 @@ class Player:
         self.player_actions = player_actions
         self.player_items = player_items
         self.is_dead = is_dead
+        # Bumped whenever the player's actions or items change, so anything cached from them knows to rebuild
+        self.inventory_version = 0
 
     def get_action(self, action_name: str) -> Optional[Action]:
         specific_action: Optional[Action] = None
@@ -126,9 +158,11 @@ class Player:
 
     def add_action(self, action: Action):
         self.player_actions.append(action)
+        self.inventory_version += 1
 
     def remove_action(self, action: Action):
         self.player_actions.remove(action)
+        self.inventory_version += 1
 
     def get_item(self, item_name: str) -> Optional[Item]:
         specific_item: Optional[Item] = None
@@ -139,9 +173,11 @@ class Player:
 
     def add_item(self, item: Item):
         self.player_items.append(item)
+        self.inventory_version += 1
 
     def remove_item(self, item: Item):
         self.player_items.remove(item)
+        self.inventory_version += 1
 
     def get_item_actions(self) -> list[(str, Action)]:
         item_actions: list[(str, Action)] = []
@@ -160,12 +196,8 @@ class Player:
     def modify_resource(self, resource_name: str, amt: int):
         resource_to_modify = self.get_resource(resource_name=resource_name)
         if resource_to_modify:
-            if resource_to_modify.resource_max != -1 and resource_to_modify.resource_amt + amt >= resource_to_modify.resource_max:
-                resource_to_modify.resource_amt = resource_to_modify.resource_max
-            elif resource_to_modify.resource_amt + amt <= 0:
-                resource_to_modify.resource_amt = 0
-            else:
-                resource_to_modify.resource_amt = resource_to_modify.resource_amt + amt
+            resource_to_modify.resource_amt = clamp_resource_amt(resource_to_modify.resource_amt + amt,
+                                                                 resource_to_modify.resource_max)
         else:
             logger.warn(f"Attempted to add resource {resource_name} to player, but player does not have this resource!")
 
@@ -205,6 +237,8 @@ class Dilemma:
         self.dilemma_player_ids = dilemma_player_ids
         self.dilemma_choices = dilemma_choices
         self.is_active_dilemma = is_active_dilemma
+        # Bumped whenever a player is added or removed, so the round knows to rebuild its membership index
+        self.membership_version = 0
 
     def get_player_vote(self, player_id: int) -> Optional[Vote]:
         player_vote = None
@@ -221,9 +255,11 @@ class Dilemma:
 
     def add_player(self, player: Player):
         self.dilemma_player_ids.add(player.player_id)
+        self.membership_version += 1
 
     def remove_player(self, player: Player):
         self.dilemma_player_ids.remove(player.player_id)
+        self.membership_version += 1
 
     def add_choice(self, choice: str):
         self.dilemma_choices.add(choice)
@@ -255,6 +291,8 @@ class Round:
         self.round_dilemmas = round_dilemmas
         self.round_number = round_number
         self.is_active_round = is_active_round
+        self.dilemma_membership: Dict[int, List[str]] = {}
+        self.dilemma_membership_key: Optional[tuple] = None
 
     def add_dilemma(self, dilemma: Dilemma):
         self.round_dilemmas.append(dilemma)
@@ -266,6 +304,18 @@ class Round:
     def get_dilemmas(self):
         return self.round_dilemmas
 
+    def get_player_dilemma_names(self, player_id: int) -> List[str]:
+        # Player ids map to the names of the dilemmas they are part of; the map is rebuilt once a dilemma is added or
+        # its players change
+        membership_key = tuple((id(dilemma), dilemma.membership_version) for dilemma in self.round_dilemmas)
+        if membership_key != self.dilemma_membership_key:
+            self.dilemma_membership = {}
+            for dilemma in self.round_dilemmas:
+                for dilemma_player_id in dilemma.dilemma_player_ids:
+                    self.dilemma_membership.setdefault(dilemma_player_id, []).append(dilemma.dilemma_name)
+            self.dilemma_membership_key = membership_key
+        return self.dilemma_membership.get(player_id, [])
+
     def get_dilemma(self, dilemma_name) -> Optional[Dilemma]:
         player_dilemma = None
         for a_dilemma in self.round_dilemmas:
@@ -334,6 +384,38 @@ class Game:
         self.actions = actions
         self.items = items
         self.pi_views = pi_views
+        # Bumped whenever the game's actions or items change, so anything cached from them knows to rebuild
+        self.catalog_version = 0
+        # A newly constructed game has never been flushed, so every section starts out dirty
+        self.generation = 1
+        self.flushed_generation = 0
+        self.dirty_sections: Set[str] = set(GAME_SECTIONS)
+        # Whether a round has rolled over into history since the last flush; edits to the latest round leave it unset
+        self.history_dirty = True
+        # Where the game was loaded from, and whether its past rounds have been read from the history file yet
+        self.file_path: Optional[str] = None
+        self.history_loaded = True
+
+    def mark_dirty(self, *sections: str):
+        self.generation += 1
+        self.dirty_sections.update(sections if sections else GAME_SECTIONS)
+        if not sections:
+            self.history_dirty = True
+
+    def is_dirty(self) -> bool:
+        return self.generation != self.flushed_generation
+
+    def mark_flushed(self):
+        self.flushed_generation = self.generation
+        self.dirty_sections.clear()
+        self.history_dirty = False
+
+    def set_flag(self, flag_name: str, value: bool) -> bool:
+        if getattr(self, flag_name) == value:
+            return False
+        setattr(self, flag_name, value)
+        self.mark_dirty(SECTION_STATE)
+        return True
 
     def get_player(self, player_id: int | str) -> Optional[Player]:
         player_int_id = player_id if isinstance(player_id, int) else int(player_id)
@@ -344,6 +426,31 @@ class Game:
 
     def add_player(self, player: Player):
         self.players.append(player)
+        self.mark_dirty(SECTION_PLAYERS)
+
+    def add_action(self, action: Action):
+        self.actions.append(action)
+        self.catalog_version += 1
+
+    def remove_action(self, action: Action):
+        self.actions.remove(action)
+        self.catalog_version += 1
+
+    def set_actions(self, actions: List[Action]):
+        self.actions = actions
+        self.catalog_version += 1
+
+    def add_item(self, item: Item):
+        self.items.append(item)
+        self.catalog_version += 1
+
+    def remove_item(self, item: Item):
+        self.items.remove(item)
+        self.catalog_version += 1
+
+    def set_items(self, items: List[Item]):
+        self.items = items
+        self.catalog_version += 1
 
     def get_living_player_ids(self) -> List[str]:
         game_player_ids = []
@@ -353,13 +460,31 @@ class Game:
 
     def add_round(self, a_round: Round):
         self.rounds.append(a_round)
+        self.history_dirty = True
+        self.mark_dirty(SECTION_ROUNDS)
 
     def get_round(self, round_num: int) -> Optional[Round]:
         for a_round in self.rounds:
             if a_round.round_number == round_num:
                 return a_round
+        if not self.history_loaded:
+            self.ensure_history_loaded()
+            return self.get_round(round_num)
         return None
 
+    def ensure_history_loaded(self):
+        if self.history_loaded:
+            return
+        self.history_loaded = True
+        history_path = section_file_path(self.file_path, HISTORY_FILE_PREFIX)
+        if not os.path.isfile(history_path):
+            return
+        logger.info(f'Loading round history from {history_path}')
+        loaded_round_nums = {a_round.round_number for a_round in self.rounds}
+        history_rounds = [a_round for a_round in read_history_json(history_path)
+                          if a_round.round_number not in loaded_round_nums]
+        self.rounds = history_rounds + self.rounds
+
     def get_latest_round(self) -> Optional[Round]:
         latest_round = None
         previous_round_num = 0
@@ -371,6 +496,7 @@ class Game:
 
     def add_party(self, a_party: Party):
         self.parties.append(a_party)
+        self.mark_dirty(SECTION_PARTIES)
 
     def get_party(self, channel_id: int):
         for a_party in self.parties:
@@ -452,10 +578,15 @@ class Game:
                 return pi_view
         return None
 
+    def add_pi_view(self, pi_view: PersistentInteractableView):
+        self.pi_views.append(pi_view)
+        self.mark_dirty(SECTION_PI_VIEWS)
+
     def remove_pi_view(self, view_name: str):
         for pi_view in self.pi_views:
             if pi_view.view_name == view_name:
                 self.pi_views.remove(pi_view)
+                self.mark_dirty(SECTION_PI_VIEWS)
 
 
 def map_player_list(players: List[Player]) -> Dict[int, Player]:
@@ -502,654 +633,871 @@ def map_item_list(items: List[Item]) -> Dict[str, Item]:
     return item_dict
 
 
+def read_json_file(filepath: str) -> dict:
+    with open(filepath, 'r', encoding="utf8") as openfile:
+        return json.load(openfile)
+
+
+def section_file_path(filepath: str, section_prefix: str) -> str:
+    file_dir, file_name = os.path.split(filepath)
+    return os.path.join(file_dir, f'{section_prefix}_{file_name}')
+
+
+def side_file_path(filepath: str, file_suffix: str) -> str:
+    return f'{os.path.splitext(filepath)[0]}_{file_suffix}.json'
+
+
+def ledger_file_path(filepath: str) -> str:
+    return f'{os.path.splitext(filepath)[0]}_{LEDGER_FILE_SUFFIX}.jsonl'
+
+
 def read_json_to_dom(filepath: str) -> Game:
     try:
-        with open(filepath, 'r', encoding="utf8") as openfile:
-            json_object = json.load(openfile)
-
-            is_active = json_object.get("is_active")
-            parties_locked = json_object.get("parties_locked")
-            voting_locked = json_object.get("voting_locked")
-            items_locked = json_object.get("items_locked")
-            resources_locked = json_object.get("resources_locked")
-            players = []
-            rounds = []
-            parties = []
-            attribute_defs = []
-            if dict_val_ne(json_object, 'attribute_defs'):
-                for attribute_def_entry in json_object.get("attribute_defs"):
-                    attribute_name = attribute_def_entry.get("attribute_name")
-                    attribute_max = int_w_default(
-                        attribute_def_entry.get("attribute_max"), -1) if dict_val_ne(attribute_def_entry,
-                                                                                     'attribute_max') else -1
-                    att_emoji_text = attribute_def_entry.get("emoji_text")
-                    attribute_defs.append(AttributeDefinition(attribute_name=attribute_name,
-                                                              attribute_max=attribute_max,
-                                                              emoji_text=att_emoji_text))
-            resource_defs = []
-            if dict_val_ne(json_object, 'resource_defs'):
-                for resource_def_entry in json_object.get("resource_defs"):
-                    resource_name = resource_def_entry.get("resource_name")
-                    resource_max = int_w_default(
-                        resource_def_entry.get("resource_max"), -1) if dict_val_ne(resource_def_entry,
-                                                                                   'resource_max') else -1
-                    is_commodity = resource_def_entry.get("is_commodity")
-                    is_perishable = resource_def_entry.get("is_perishable")
-                    res_emoji_text = resource_def_entry.get("emoji_text")
-                    resource_defs.append(ResourceDefinition(resource_name=resource_name,
-                                                            resource_max=resource_max,
-                                                            is_commodity=is_commodity,
-                                                            is_perishable=is_perishable,
-                                                            emoji_text=res_emoji_text))
-            item_type_defs = []
-            if dict_val_ne(json_object, 'item_type_defs'):
-                for item_type_def_entry in json_object.get("item_type_defs"):
-                    item_type = item_type_def_entry.get("item_type")
-                    is_equippable = item_type_def_entry.get("is_equippable")
-                    max_equippable = int_w_default(
-                        item_type_def_entry.get("max_equippable"), -1) if dict_val_ne(item_type_def_entry,
-                                                                                      'max_equippable') else -1
-                    item_emoji_text = item_type_def_entry.get("emoji_text")
-                    item_type_defs.append(ItemTypeDefinition(item_type=item_type,
-                                                             is_equippable=is_equippable,
-                                                             max_equippable=max_equippable,
-                                                             emoji_text=item_emoji_text))
-            skills = []
-            if dict_val_ne(json_object, 'skills'):
-                for game_skill_entry in json_object.get("skills"):
-                    game_skill_name = game_skill_entry.get("skill_name")
-                    game_skill_req = game_skill_entry.get("skill_req")
-                    game_skill_restrict = game_skill_entry.get("skill_restrict")
-                    game_skill_desc = game_skill_entry.get("skill_desc")
-                    game_skill_mod_modifies_attributes = []
-                    if dict_val_ne(game_skill_entry, 'modifies_attributes'):
-                        for game_skill_mod_att_entry in game_skill_entry.get("modifies_attributes"):
-                            game_skill_mod_att_name = game_skill_mod_att_entry.get("att_name")
-                            game_skill_mod_mod_amt = int_w_default(game_skill_mod_att_entry.get("modification"), 0)
-                            game_skill_mod_modifies_attributes.append(
-                                AttributeModifier(att_name=game_skill_mod_att_name,
-                                                  modification=game_skill_mod_mod_amt))
-                    skills.append(Skill(skill_name=game_skill_name,
-                                        skill_req=game_skill_req,
-                                        skill_restrict=game_skill_restrict,
-                                        skill_desc=game_skill_desc,
-                                        modifies_attributes=game_skill_mod_modifies_attributes))
-            status_modifiers = []
-            if dict_val_ne(json_object, 'status_modifiers'):
-                for status_mod_entry in json_object.get("status_modifiers"):
-                    game_modifier_type = status_mod_entry.get("modifier_type")
-                    game_modifier_name = status_mod_entry.get("modifier_name")
-                    game_modifier_desc = status_mod_entry.get("modifier_desc")
-                    game_modifier_duration = int_w_default(status_mod_entry.get("modifier_duration"), -1)
-                    game_modifier_stacks = int_w_default(status_mod_entry.get("modifier_stacks"), 0)
-                    game_stat_mod_modifies_attributes = []
-                    if dict_val_ne(status_mod_entry, 'modifies_attributes'):
-                        for game_stat_mod_att_entry in status_mod_entry.get("modifies_attributes"):
-                            game_stat_mod_att_name = game_stat_mod_att_entry.get("att_name")
-                            game_stat_mod_mod_amt = int_w_default(game_stat_mod_att_entry.get("modification"), 0)
-                            game_stat_mod_modifies_attributes.append(AttributeModifier(att_name=game_stat_mod_att_name,
-                                                                                       modification=game_stat_mod_mod_amt))
-                    status_modifiers.append(StatusModifier(modifier_type=game_modifier_type,
-                                                           modifier_name=game_modifier_name,
-                                                           modifier_desc=game_modifier_desc,
-                                                           modifier_duration=game_modifier_duration,
-                                                           modifier_stacks=game_modifier_stacks,
-                                                           modifies_attributes=game_stat_mod_modifies_attributes))
-            pi_views = []
-            if dict_val_ne(json_object, 'pi_views'):
-                for piv_entry in json_object.get("pi_views"):
-                    view_name = piv_entry.get("view_name")
-                    channel_id = piv_entry.get("channel_id")
-                    message_ids = list(piv_entry.get("message_ids"))
-                    button_msg_id = piv_entry.get("button_msg_id")
-                    pi_views.append(PersistentInteractableView(view_name=view_name,
-                                                               channel_id=channel_id,
-                                                               message_ids=message_ids,
-                                                               button_msg_id=button_msg_id))
-            actions = []
-            items = []
-            if dict_val_ne(json_object, 'players'):
-                for player_entry in json_object.get("players"):
-                    player_id = player_entry.get("player_id")
-                    player_mod_channel = player_entry.get("player_mod_channel")
-                    player_discord_name = player_entry.get("player_discord_name")
-                    is_dead = player_entry.get("is_dead")
-                    player_attributes = []
-                    if dict_val_ne(player_entry, 'player_attributes'):
-                        for attribute_entry in player_entry.get("player_attributes"):
-                            attribute_name = attribute_entry.get("name")
-                            attribute_level = int_w_default(attribute_entry.get("level"), 0)
-                            attribute_max_level = int_w_default(attribute_entry.get("max_level"), -1)
-                            player_attributes.append(Attribute(name=attribute_name,
-                                                               level=attribute_level,
-                                                               max_level=attribute_max_level))
-                    player_resources = []
-                    if dict_val_ne(player_entry, 'player_resources'):
-                        for resource_entry in player_entry.get("player_resources"):
-                            resource_type = resource_entry.get("resource_type")
-                            resource_amt = int_w_default(resource_entry.get("resource_amt"), 0)
-                            resource_income = int_w_default(resource_entry.get("resource_income"), 0)
-                            resource_max = int_w_default(resource_entry.get("resource_max"), -1)
-                            is_commodity = resource_entry.get("is_commodity")
-                            is_perishable = resource_entry.get("is_perishable")
-                            player_resources.append(Resource(resource_type=resource_type,
-                                                             resource_amt=resource_amt,
-                                                             resource_income=resource_income,
-                                                             resource_max=resource_max,
-                                                             is_commodity=is_commodity,
-                                                             is_perishable=is_perishable))
-                    player_skills = []
-                    if dict_val_ne(player_entry, 'player_skills'):
-                        for skill_entry in player_entry.get("player_skills"):
-                            skill_name = skill_entry.get("skill_name")
-                            skill_req = skill_entry.get("skill_req")
-                            skill_restrict = skill_entry.get("skill_restrict")
-                            skill_desc = skill_entry.get("skill_desc")
-                            player_skill_modifies_attributes = []
-                            if dict_val_ne(skill_entry, 'modifies_attributes'):
-                                for player_skill_mod_att_entry in skill_entry.get("modifies_attributes"):
-                                    player_skill_mod_att_name = player_skill_mod_att_entry.get("att_name")
-                                    player_skill_mod_mod_amt = int_w_default(
-                                        player_skill_mod_att_entry.get("modification"),
-                                        0)
-                                    player_skill_modifies_attributes.append(
-                                        AttributeModifier(att_name=player_skill_mod_att_name,
-                                                          modification=player_skill_mod_mod_amt))
-                            player_skills.append(Skill(skill_name=skill_name,
-                                                       skill_req=skill_req,
-                                                       skill_restrict=skill_restrict,
-                                                       skill_desc=skill_desc,
-                                                       modifies_attributes=player_skill_modifies_attributes))
-                    player_status_mods = []
-                    if dict_val_ne(player_entry, 'player_status_mods'):
-                        for player_status_mod_entry in player_entry.get("player_status_mods"):
-                            modifier_type = player_status_mod_entry.get("modifier_type")
-                            modifier_name = player_status_mod_entry.get("modifier_name")
-                            modifier_desc = player_status_mod_entry.get("modifier_desc")
-                            modifier_duration = int_w_default(player_status_mod_entry.get("modifier_duration"), -1)
-                            modifier_stacks = int_w_default(player_status_mod_entry.get("modifier_stacks"), 0)
-                            player_stat_mod_modifies_attributes = []
-                            if dict_val_ne(player_status_mod_entry, 'modifies_attributes'):
-                                for player_stat_mod_att_entry in player_status_mod_entry.get("modifies_attributes"):
-                                    player_stat_mod_att_name = player_stat_mod_att_entry.get("att_name")
-                                    player_stat_mod_mod_amt = int_w_default(
-                                        player_stat_mod_att_entry.get("modification"), 0)
-                                    player_stat_mod_modifies_attributes.append(
-                                        AttributeModifier(att_name=player_stat_mod_att_name,
-                                                          modification=player_stat_mod_mod_amt))
-                            player_status_mods.append(StatusModifier(modifier_type=modifier_type,
-                                                                     modifier_name=modifier_name,
-                                                                     modifier_desc=modifier_desc,
-                                                                     modifier_duration=modifier_duration,
-                                                                     modifier_stacks=modifier_stacks,
-                                                                     modifies_attributes=player_stat_mod_modifies_attributes))
-                    player_actions = []
-                    if dict_val_ne(player_entry, 'player_actions'):
-                        for action_entry in player_entry.get("player_actions"):
-                            action_name = action_entry.get("action_name")
-                            player_action_costs = []
-                            if dict_val_ne(action_entry, 'action_costs'):
-                                for player_action_cost_entry in action_entry.get("action_costs"):
-                                    player_res_cost_name = player_action_cost_entry.get("res_name")
-                                    player_res_cost_amt = int_w_default(player_action_cost_entry.get("amount"), 0)
-                                    player_action_costs.append(ResourceCost(res_name=player_res_cost_name,
-                                                                            amount=player_res_cost_amt))
-                            action_uses = int_w_default(action_entry.get("action_uses"), -1)
-                            action_timing = action_entry.get("action_timing")
-                            action_classes = action_entry.get("action_classes")
-                            action_level_req = int_w_default(action_entry.get("action_level_req"), -1)
-                            action_priority = int_w_default(action_entry.get("action_priority"), -1)
-                            action_desc = action_entry.get("action_desc")
-                            player_actions.append(Action(action_name=action_name,
-                                                         action_timing=action_timing,
-                                                         action_costs=player_action_costs,
-                                                         action_uses=action_uses,
-                                                         action_classes=action_classes,
-                                                         action_level_req=action_level_req,
-                                                         action_priority=action_priority,
-                                                         action_desc=action_desc))
-                    player_items = []
-                    if dict_val_ne(player_entry, 'player_items'):
-                        for item_entry in player_entry.get("player_items"):
-                            item_name = item_entry.get("item_name")
-                            item_type = item_entry.get("item_type")
-                            item_subtype = item_entry.get("item_subtype")
-                            item_rarity = item_entry.get("item_rarity")
-                            item_properties = item_entry.get("item_properties")
-                            item_desc = item_entry.get("item_desc")
-                            is_equipped = item_entry.get("is_equipped")
-                            item_action: Optional[Action] = None
-                            if dict_val_ne(item_entry, 'item_action'):
-                                player_item_action = item_entry.get("item_action")
-                                item_action_name = player_item_action.get("action_name")
-                                player_item_action_costs = []
-                                if dict_val_ne(player_item_action, 'action_costs'):
-                                    for player_item_action_cost_entry in player_item_action.get("action_costs"):
-                                        player_item_action_cost_name = player_item_action_cost_entry.get("res_name")
-                                        player_item_action_cost_amt = int_w_default(
-                                            player_item_action_cost_entry.get("amount"), 0)
-                                        player_item_action_costs.append(
-                                            ResourceCost(res_name=player_item_action_cost_name,
-                                                         amount=player_item_action_cost_amt))
-                                item_action_uses = int_w_default(player_item_action.get("action_uses"), -1)
-                                item_action_timing = player_item_action.get("action_timing")
-                                item_action_classes = player_item_action.get("action_classes")
-                                item_action_level_req = int_w_default(player_item_action.get("action_level_req"), -1)
-                                item_action_priority = int_w_default(player_item_action.get("action_priority"), -1)
-                                item_action_desc = player_item_action.get("action_desc")
-                                item_action = Action(action_name=item_action_name,
-                                                     action_timing=item_action_timing,
-                                                     action_costs=player_item_action_costs,
-                                                     action_uses=item_action_uses,
-                                                     action_classes=item_action_classes,
-                                                     action_level_req=item_action_level_req,
-                                                     action_priority=item_action_priority,
-                                                     action_desc=item_action_desc)
-                            player_items.append(Item(item_name=item_name,
-                                                     item_type=item_type,
-                                                     item_subtype=item_subtype,
-                                                     item_rarity=item_rarity,
-                                                     item_properties=item_properties,
-                                                     item_desc=item_desc,
-                                                     is_equipped=is_equipped,
-                                                     item_action=item_action))
-                    players.append(Player(player_id=player_id,
-                                          player_discord_name=player_discord_name,
-                                          player_mod_channel=player_mod_channel,
-                                          player_attributes=player_attributes,
-                                          player_resources=player_resources,
-                                          player_skills=player_skills,
-                                          player_status_mods=player_status_mods,
-                                          player_actions=player_actions,
-                                          player_items=player_items,
-                                          is_dead=is_dead))
-            if dict_val_ne(json_object, 'rounds'):
-                for round_entry in json_object.get("rounds"):
-                    round_channel_id = round_entry.get("round_channel_id")
-                    round_message_id = round_entry.get("round_message_id")
-                    round_num = int_w_default(round_entry.get("round_number"))
-                    is_active_round = round_entry.get("is_active_round")
-                    votes = []
-                    round_dilemmas = []
-                    if dict_val_ne(round_entry, 'votes'):
-                        for vote_entry in round_entry.get("votes"):
-                            player_id = vote_entry.get("player_id")
-                            choice = vote_entry.get("choice")
-                            timestamp = vote_entry.get("timestamp")
-                            votes.append(Vote(player_id=player_id,
-                                              choice=choice,
-                                              timestamp=timestamp))
-                    if dict_val_ne(round_entry, 'round_dilemmas'):
-                        for dilemma_entry in round_entry.get("round_dilemmas"):
-                            dilemma_name = dilemma_entry.get("dilemma_name")
-                            dilemma_channel_id = dilemma_entry.get("dilemma_channel_id")
-                            dilemma_message_id = dilemma_entry.get("dilemma_message_id")
-                            is_active_dilemma = dilemma_entry.get("is_active_dilemma")
-                            dilemma_choices = set(dilemma_entry.get("dilemma_choices"))
-                            dilemma_player_ids = set(dilemma_entry.get("dilemma_player_ids"))
-                            dilemma_votes = []
-                            if dict_val_ne(dilemma_entry, 'dilemma_votes'):
-                                for dilemma_vote_entry in dilemma_entry.get("dilemma_votes"):
-                                    player_id = dilemma_vote_entry.get("player_id")
-                                    choice = dilemma_vote_entry.get("choice")
-                                    timestamp = dilemma_vote_entry.get("timestamp")
-                                    dilemma_votes.append(Vote(player_id=player_id,
-                                                              choice=choice,
-                                                              timestamp=timestamp))
-                            round_dilemmas.append(Dilemma(dilemma_name=dilemma_name,
-                                                          dilemma_channel_id=dilemma_channel_id,
-                                                          dilemma_message_id=dilemma_message_id,
-                                                          dilemma_player_ids=dilemma_player_ids,
-                                                          dilemma_choices=dilemma_choices,
-                                                          dilemma_votes=dilemma_votes,
-                                                          is_active_dilemma=is_active_dilemma))
-                    rounds.append(Round(round_number=round_num,
-                                        round_channel_id=round_channel_id,
-                                        round_message_id=round_message_id,
-                                        round_dilemmas=round_dilemmas,
-                                        is_active_round=is_active_round,
-                                        votes=votes))
-            if dict_val_ne(json_object, 'parties'):
-                for party_entry in json_object.get("parties"):
-                    channel_id = int_w_default(party_entry.get("channel_id"), 0)
-                    max_size = int_w_default(party_entry.get("max_size"), -1)
-                    party_name = party_entry.get("party_name")
-                    player_ids = set(party_entry.get("player_ids"))
-                    parties.append(Party(player_ids=player_ids,
-                                         party_name=party_name,
-                                         channel_id=channel_id,
-                                         max_size=max_size))
-            if dict_val_ne(json_object, 'actions'):
-                for game_action_entry in json_object.get("actions"):
-                    game_action_name = game_action_entry.get("action_name")
-                    game_action_timing = game_action_entry.get("action_timing")
-                    game_action_costs_resources = []
-                    if dict_val_ne(game_action_entry, 'action_costs'):
-                        for game_action_cost_entry in game_action_entry.get("action_costs"):
-                            game_action_cost_name = game_action_cost_entry.get("res_name")
-                            game_action_cost_amt = int_w_default(game_action_cost_entry.get("amount"), 0)
-                            game_action_costs_resources.append(ResourceCost(res_name=game_action_cost_name,
-                                                                            amount=game_action_cost_amt))
-                    game_action_uses = int_w_default(game_action_entry.get("action_uses"), -1)
-                    game_action_classes = game_action_entry.get("action_classes")
-                    game_action_level_req = int_w_default(game_action_entry.get("action_level_req"), 0)
-                    game_action_priority = int_w_default(game_action_entry.get("action_priority"), -1)
-                    game_action_desc = game_action_entry.get("action_desc")
-                    actions.append(Action(action_name=game_action_name,
-                                          action_timing=game_action_timing,
-                                          action_costs=game_action_costs_resources,
-                                          action_uses=game_action_uses,
-                                          action_classes=game_action_classes,
-                                          action_level_req=game_action_level_req,
-                                          action_priority=game_action_priority,
-                                          action_desc=game_action_desc))
-            if dict_val_ne(json_object, 'items'):
-                for game_item_entry in json_object.get("items"):
-                    game_item_name = game_item_entry.get("item_name")
-                    game_item_type = game_item_entry.get("item_type")
-                    game_item_subtype = game_item_entry.get("item_subtype")
-                    game_item_rarity = game_item_entry.get("item_rarity")
-                    game_item_properties = game_item_entry.get("item_properties")
-                    game_is_equipped = game_item_entry.get("is_equipped")
-                    game_item_desc = game_item_entry.get("item_desc")
-                    game_item_action: Optional[Action] = None
-                    if dict_val_ne(game_item_entry, 'item_action'):
-                        game_item_action_entry = game_item_entry.get("item_action")
-                        game_item_action_name = game_item_action_entry.get("action_name")
-                        game_item_action_timing = game_item_action_entry.get("action_timing")
-                        game_item_action_costs_resources = []
-                        if dict_val_ne(game_item_action_entry, 'action_costs'):
-                            for game_item_action_cost_entry in game_item_action_entry.get("action_costs"):
-                                game_item_action_cost_name = game_item_action_cost_entry.get("res_name")
-                                game_item_action_cost_amt = int_w_default(game_item_action_cost_entry.get("amount"), 0)
-                                game_item_action_costs_resources.append(
-                                    ResourceCost(res_name=game_item_action_cost_name,
-                                                 amount=game_item_action_cost_amt))
-                        game_item_action_uses = int_w_default(game_item_action_entry.get("action_uses"), -1)
-                        game_item_action_classes = game_item_action_entry.get("action_classes")
-                        game_item_action_level_req = int_w_default(game_item_action_entry.get("action_level_req"), 0)
-                        game_item_action_priority = int_w_default(game_item_action_entry.get("action_priority"), -1)
-                        game_item_action_desc = game_item_action_entry.get("action_desc")
-                        game_item_action = Action(action_name=game_item_action_name,
-                                                  action_timing=game_item_action_timing,
-                                                  action_costs=game_item_action_costs_resources,
-                                                  action_uses=game_item_action_uses,
-                                                  action_classes=game_item_action_classes,
-                                                  action_level_req=game_item_action_level_req,
-                                                  action_priority=game_item_action_priority,
-                                                  action_desc=game_item_action_desc)
-                    items.append(Item(item_name=game_item_name,
-                                      item_type=game_item_type,
-                                      item_subtype=game_item_subtype,
-                                      item_rarity=game_item_rarity,
-                                      item_properties=game_item_properties,
-                                      item_desc=game_item_desc,
-                                      is_equipped=game_is_equipped,
-                                      item_action=game_item_action))
-            return Game(is_active=is_active,
-                        parties_locked=parties_locked,
-                        voting_locked=voting_locked,
-                        items_locked=items_locked,
-                        resources_locked=resources_locked,
-                        players=players,
-                        rounds=rounds,
-                        parties=parties,
-                        attribute_definitions=attribute_defs,
-                        resource_definitions=resource_defs,
-                        item_type_definitions=item_type_defs,
-                        skills=skills,
-                        status_modifiers=status_modifiers,
-                        actions=actions,
-                        items=items,
-                        pi_views=pi_views)
+        json_object = read_json_file(filepath)
+
+        # Legacy single-file games hold every section (and every round) in the game file itself
+        catalog_object = json_object
+        history_loaded = True
+        if int_w_default(json_object.get("format_version"), 1) >= SECTIONED_FORMAT_VERSION:
+            catalog_object = read_json_file(section_file_path(filepath, CATALOG_FILE_PREFIX))
+            # Historical rounds are only parsed once an older round is actually requested
+            history_loaded = False
+
+        attribute_defs, resource_defs, item_type_defs, skills, status_modifiers, actions, items = \
+            parse_catalog_json(catalog_object)
+
+        is_active = json_object.get("is_active")
+        parties_locked = json_object.get("parties_locked")
+        voting_locked = json_object.get("voting_locked")
+        items_locked = json_object.get("items_locked")
+        resources_locked = json_object.get("resources_locked")
+        players = []
+        parties = []
+        pi_views = []
+        if dict_val_ne(json_object, 'pi_views'):
+            for piv_entry in json_object.get("pi_views"):
+                view_name = piv_entry.get("view_name")
+                channel_id = piv_entry.get("channel_id")
+                message_ids = list(piv_entry.get("message_ids"))
+                button_msg_id = piv_entry.get("button_msg_id")
+                pi_views.append(PersistentInteractableView(view_name=view_name,
+                                                           channel_id=channel_id,
+                                                           message_ids=message_ids,
+                                                           button_msg_id=button_msg_id))
+        if dict_val_ne(json_object, 'players'):
+            for player_entry in json_object.get("players"):
+                player_id = player_entry.get("player_id")
+                player_mod_channel = player_entry.get("player_mod_channel")
+                player_discord_name = player_entry.get("player_discord_name")
+                is_dead = player_entry.get("is_dead")
+                player_attributes = []
+                if dict_val_ne(player_entry, 'player_attributes'):
+                    for attribute_entry in player_entry.get("player_attributes"):
+                        attribute_name = attribute_entry.get("name")
+                        attribute_level = int_w_default(attribute_entry.get("level"), 0)
+                        attribute_max_level = int_w_default(attribute_entry.get("max_level"), -1)
+                        player_attributes.append(Attribute(name=attribute_name,
+                                                           level=attribute_level,
+                                                           max_level=attribute_max_level))
+                player_resources = []
+                if dict_val_ne(player_entry, 'player_resources'):
+                    for resource_entry in player_entry.get("player_resources"):
+                        resource_type = resource_entry.get("resource_type")
+                        resource_amt = int_w_default(resource_entry.get("resource_amt"), 0)
+                        resource_income = int_w_default(resource_entry.get("resource_income"), 0)
+                        resource_max = int_w_default(resource_entry.get("resource_max"), -1)
+                        is_commodity = resource_entry.get("is_commodity")
+                        is_perishable = resource_entry.get("is_perishable")
+                        player_resources.append(Resource(resource_type=resource_type,
+                                                         resource_amt=resource_amt,
+                                                         resource_income=resource_income,
+                                                         resource_max=resource_max,
+                                                         is_commodity=is_commodity,
+                                                         is_perishable=is_perishable))
+                player_skills = []
+                if dict_val_ne(player_entry, 'player_skills'):
+                    for skill_entry in player_entry.get("player_skills"):
+                        skill_name = skill_entry.get("skill_name")
+                        skill_req = skill_entry.get("skill_req")
+                        skill_restrict = skill_entry.get("skill_restrict")
+                        skill_desc = skill_entry.get("skill_desc")
+                        player_skill_modifies_attributes = []
+                        if dict_val_ne(skill_entry, 'modifies_attributes'):
+                            for player_skill_mod_att_entry in skill_entry.get("modifies_attributes"):
+                                player_skill_mod_att_name = player_skill_mod_att_entry.get("att_name")
+                                player_skill_mod_mod_amt = int_w_default(
+                                    player_skill_mod_att_entry.get("modification"),
+                                    0)
+                                player_skill_modifies_attributes.append(
+                                    AttributeModifier(att_name=player_skill_mod_att_name,
+                                                      modification=player_skill_mod_mod_amt))
+                        player_skills.append(Skill(skill_name=skill_name,
+                                                   skill_req=skill_req,
+                                                   skill_restrict=skill_restrict,
+                                                   skill_desc=skill_desc,
+                                                   modifies_attributes=player_skill_modifies_attributes))
+                player_status_mods = []
+                if dict_val_ne(player_entry, 'player_status_mods'):
+                    for player_status_mod_entry in player_entry.get("player_status_mods"):
+                        modifier_type = player_status_mod_entry.get("modifier_type")
+                        modifier_name = player_status_mod_entry.get("modifier_name")
+                        modifier_desc = player_status_mod_entry.get("modifier_desc")
+                        modifier_duration = int_w_default(player_status_mod_entry.get("modifier_duration"), -1)
+                        modifier_stacks = int_w_default(player_status_mod_entry.get("modifier_stacks"), 0)
+                        player_stat_mod_modifies_attributes = []
+                        if dict_val_ne(player_status_mod_entry, 'modifies_attributes'):
+                            for player_stat_mod_att_entry in player_status_mod_entry.get("modifies_attributes"):
+                                player_stat_mod_att_name = player_stat_mod_att_entry.get("att_name")
+                                player_stat_mod_mod_amt = int_w_default(
+                                    player_stat_mod_att_entry.get("modification"), 0)
+                                player_stat_mod_modifies_attributes.append(
+                                    AttributeModifier(att_name=player_stat_mod_att_name,
+                                                      modification=player_stat_mod_mod_amt))
+                        player_status_mods.append(StatusModifier(modifier_type=modifier_type,
+                                                                 modifier_name=modifier_name,
+                                                                 modifier_desc=modifier_desc,
+                                                                 modifier_duration=modifier_duration,
+                                                                 modifier_stacks=modifier_stacks,
+                                                                 modifies_attributes=player_stat_mod_modifies_attributes))
+                player_actions = []
+                if dict_val_ne(player_entry, 'player_actions'):
+                    for action_entry in player_entry.get("player_actions"):
+                        action_name = action_entry.get("action_name")
+                        player_action_costs = []
+                        if dict_val_ne(action_entry, 'action_costs'):
+                            for player_action_cost_entry in action_entry.get("action_costs"):
+                                player_res_cost_name = player_action_cost_entry.get("res_name")
+                                player_res_cost_amt = int_w_default(player_action_cost_entry.get("amount"), 0)
+                                player_action_costs.append(ResourceCost(res_name=player_res_cost_name,
+                                                                        amount=player_res_cost_amt))
+                        action_uses = int_w_default(action_entry.get("action_uses"), -1)
+                        action_timing = action_entry.get("action_timing")
+                        action_classes = action_entry.get("action_classes")
+                        action_level_req = int_w_default(action_entry.get("action_level_req"), -1)
+                        action_priority = int_w_default(action_entry.get("action_priority"), -1)
+                        action_desc = action_entry.get("action_desc")
+                        player_actions.append(Action(action_name=action_name,
+                                                     action_timing=action_timing,
+                                                     action_costs=player_action_costs,
+                                                     action_uses=action_uses,
+                                                     action_classes=action_classes,
+                                                     action_level_req=action_level_req,
+                                                     action_priority=action_priority,
+                                                     action_desc=action_desc))
+                player_items = []
+                if dict_val_ne(player_entry, 'player_items'):
+                    for item_entry in player_entry.get("player_items"):
+                        item_name = item_entry.get("item_name")
+                        item_type = item_entry.get("item_type")
+                        item_subtype = item_entry.get("item_subtype")
+                        item_rarity = item_entry.get("item_rarity")
+                        item_properties = item_entry.get("item_properties")
+                        item_desc = item_entry.get("item_desc")
+                        is_equipped = item_entry.get("is_equipped")
+                        item_action: Optional[Action] = None
+                        if dict_val_ne(item_entry, 'item_action'):
+                            player_item_action = item_entry.get("item_action")
+                            item_action_name = player_item_action.get("action_name")
+                            player_item_action_costs = []
+                            if dict_val_ne(player_item_action, 'action_costs'):
+                                for player_item_action_cost_entry in player_item_action.get("action_costs"):
+                                    player_item_action_cost_name = player_item_action_cost_entry.get("res_name")
+                                    player_item_action_cost_amt = int_w_default(
+                                        player_item_action_cost_entry.get("amount"), 0)
+                                    player_item_action_costs.append(
+                                        ResourceCost(res_name=player_item_action_cost_name,
+                                                     amount=player_item_action_cost_amt))
+                            item_action_uses = int_w_default(player_item_action.get("action_uses"), -1)
+                            item_action_timing = player_item_action.get("action_timing")
+                            item_action_classes = player_item_action.get("action_classes")
+                            item_action_level_req = int_w_default(player_item_action.get("action_level_req"), -1)
+                            item_action_priority = int_w_default(player_item_action.get("action_priority"), -1)
+                            item_action_desc = player_item_action.get("action_desc")
+                            item_action = Action(action_name=item_action_name,
+                                                 action_timing=item_action_timing,
+                                                 action_costs=player_item_action_costs,
+                                                 action_uses=item_action_uses,
+                                                 action_classes=item_action_classes,
+                                                 action_level_req=item_action_level_req,
+                                                 action_priority=item_action_priority,
+                                                 action_desc=item_action_desc)
+                        player_items.append(Item(item_name=item_name,
+                                                 item_type=item_type,
+                                                 item_subtype=item_subtype,
+                                                 item_rarity=item_rarity,
+                                                 item_properties=item_properties,
+                                                 item_desc=item_desc,
+                                                 is_equipped=is_equipped,
+                                                 item_action=item_action))
+                players.append(Player(player_id=player_id,
+                                      player_discord_name=player_discord_name,
+                                      player_mod_channel=player_mod_channel,
+                                      player_attributes=player_attributes,
+                                      player_resources=player_resources,
+                                      player_skills=player_skills,
+                                      player_status_mods=player_status_mods,
+                                      player_actions=player_actions,
+                                      player_items=player_items,
+                                      is_dead=is_dead))
+        rounds = parse_rounds_json(json_object.get("rounds")) if dict_val_ne(json_object, 'rounds') else []
+        if dict_val_ne(json_object, 'parties'):
+            for party_entry in json_object.get("parties"):
+                channel_id = int_w_default(party_entry.get("channel_id"), 0)
+                max_size = int_w_default(party_entry.get("max_size"), -1)
+                party_name = party_entry.get("party_name")
+                player_ids = set(party_entry.get("player_ids"))
+                parties.append(Party(player_ids=player_ids,
+                                     party_name=party_name,
+                                     channel_id=channel_id,
+                                     max_size=max_size))
+        game = Game(is_active=is_active,
+                    parties_locked=parties_locked,
+                    voting_locked=voting_locked,
+                    items_locked=items_locked,
+                    resources_locked=resources_locked,
+                    players=players,
+                    rounds=rounds,
+                    parties=parties,
+                    attribute_definitions=attribute_defs,
+                    resource_definitions=resource_defs,
+                    item_type_definitions=item_type_defs,
+                    skills=skills,
+                    status_modifiers=status_modifiers,
+                    actions=actions,
+                    items=items,
+                    pi_views=pi_views)
+        game.file_path = filepath
+        game.history_loaded = history_loaded
+        # Freshly loaded state matches what is on disk
+        game.mark_flushed()
+        return game
     except Exception as e:
         logger.error(f'Error while reading dom file!\n{e}')
 
 
-def write_dom_to_json(game: Game):
+def read_history_json(filepath: str) -> List[Round]:
+    history_object = read_json_file(filepath)
+    return parse_rounds_json(history_object.get("rounds")) if dict_val_ne(history_object, 'rounds') else []
+
+
+def parse_catalog_json(json_object: dict) -> (List[AttributeDefinition], List[ResourceDefinition],
+                                               List[ItemTypeDefinition], List[Skill], List[StatusModifier],
+                                               List[Action], List[Item]):
+    attribute_defs = []
+    if dict_val_ne(json_object, 'attribute_defs'):
+        for attribute_def_entry in json_object.get("attribute_defs"):
+            attribute_name = attribute_def_entry.get("attribute_name")
+            attribute_max = int_w_default(
+                attribute_def_entry.get("attribute_max"), -1) if dict_val_ne(attribute_def_entry,
+                                                                             'attribute_max') else -1
+            att_emoji_text = attribute_def_entry.get("emoji_text")
+            attribute_defs.append(AttributeDefinition(attribute_name=attribute_name,
+                                                      attribute_max=attribute_max,
+                                                      emoji_text=att_emoji_text))
+    resource_defs = []
+    if dict_val_ne(json_object, 'resource_defs'):
+        for resource_def_entry in json_object.get("resource_defs"):
+            resource_name = resource_def_entry.get("resource_name")
+            resource_max = int_w_default(
+                resource_def_entry.get("resource_max"), -1) if dict_val_ne(resource_def_entry,
+                                                                           'resource_max') else -1
+            is_commodity = resource_def_entry.get("is_commodity")
+            is_perishable = resource_def_entry.get("is_perishable")
+            res_emoji_text = resource_def_entry.get("emoji_text")
+            resource_defs.append(ResourceDefinition(resource_name=resource_name,
+                                                    resource_max=resource_max,
+                                                    is_commodity=is_commodity,
+                                                    is_perishable=is_perishable,
+                                                    emoji_text=res_emoji_text))
+    item_type_defs = []
+    if dict_val_ne(json_object, 'item_type_defs'):
+        for item_type_def_entry in json_object.get("item_type_defs"):
+            item_type = item_type_def_entry.get("item_type")
+            is_equippable = item_type_def_entry.get("is_equippable")
+            max_equippable = int_w_default(
+                item_type_def_entry.get("max_equippable"), -1) if dict_val_ne(item_type_def_entry,
+                                                                              'max_equippable') else -1
+            item_emoji_text = item_type_def_entry.get("emoji_text")
+            item_type_defs.append(ItemTypeDefinition(item_type=item_type,
+                                                     is_equippable=is_equippable,
+                                                     max_equippable=max_equippable,
+                                                     emoji_text=item_emoji_text))
+    skills = []
+    if dict_val_ne(json_object, 'skills'):
+        for game_skill_entry in json_object.get("skills"):
+            game_skill_name = game_skill_entry.get("skill_name")
+            game_skill_req = game_skill_entry.get("skill_req")
+            game_skill_restrict = game_skill_entry.get("skill_restrict")
+            game_skill_desc = game_skill_entry.get("skill_desc")
+            game_skill_mod_modifies_attributes = []
+            if dict_val_ne(game_skill_entry, 'modifies_attributes'):
+                for game_skill_mod_att_entry in game_skill_entry.get("modifies_attributes"):
+                    game_skill_mod_att_name = game_skill_mod_att_entry.get("att_name")
+                    game_skill_mod_mod_amt = int_w_default(game_skill_mod_att_entry.get("modification"), 0)
+                    game_skill_mod_modifies_attributes.append(
+                        AttributeModifier(att_name=game_skill_mod_att_name,
+                                          modification=game_skill_mod_mod_amt))
+            skills.append(Skill(skill_name=game_skill_name,
+                                skill_req=game_skill_req,
+                                skill_restrict=game_skill_restrict,
+                                skill_desc=game_skill_desc,
+                                modifies_attributes=game_skill_mod_modifies_attributes))
+    status_modifiers = []
+    # Game files are written with the key status_mods; status_modifiers is accepted for older files
+    status_mod_key = 'status_mods' if dict_val_ne(json_object, 'status_mods') else 'status_modifiers'
+    if dict_val_ne(json_object, status_mod_key):
+        for status_mod_entry in json_object.get(status_mod_key):
+            game_modifier_type = status_mod_entry.get("modifier_type")
+            game_modifier_name = status_mod_entry.get("modifier_name")
+            game_modifier_desc = status_mod_entry.get("modifier_desc")
+            game_modifier_duration = int_w_default(status_mod_entry.get("modifier_duration"), -1)
+            game_modifier_stacks = int_w_default(status_mod_entry.get("modifier_stacks"), 0)
+            game_stat_mod_modifies_attributes = []
+            if dict_val_ne(status_mod_entry, 'modifies_attributes'):
+                for game_stat_mod_att_entry in status_mod_entry.get("modifies_attributes"):
+                    game_stat_mod_att_name = game_stat_mod_att_entry.get("att_name")
+                    game_stat_mod_mod_amt = int_w_default(game_stat_mod_att_entry.get("modification"), 0)
+                    game_stat_mod_modifies_attributes.append(AttributeModifier(att_name=game_stat_mod_att_name,
+                                                                               modification=game_stat_mod_mod_amt))
+            status_modifiers.append(StatusModifier(modifier_type=game_modifier_type,
+                                                   modifier_name=game_modifier_name,
+                                                   modifier_desc=game_modifier_desc,
+                                                   modifier_duration=game_modifier_duration,
+                                                   modifier_stacks=game_modifier_stacks,
+                                                   modifies_attributes=game_stat_mod_modifies_attributes))
+    actions = []
+    items = []
+    if dict_val_ne(json_object, 'actions'):
+        for game_action_entry in json_object.get("actions"):
+            game_action_name = game_action_entry.get("action_name")
+            game_action_timing = game_action_entry.get("action_timing")
+            game_action_costs_resources = []
+            if dict_val_ne(game_action_entry, 'action_costs'):
+                for game_action_cost_entry in game_action_entry.get("action_costs"):
+                    game_action_cost_name = game_action_cost_entry.get("res_name")
+                    game_action_cost_amt = int_w_default(game_action_cost_entry.get("amount"), 0)
+                    game_action_costs_resources.append(ResourceCost(res_name=game_action_cost_name,
+                                                                    amount=game_action_cost_amt))
+            game_action_uses = int_w_default(game_action_entry.get("action_uses"), -1)
+            game_action_classes = game_action_entry.get("action_classes")
+            game_action_level_req = int_w_default(game_action_entry.get("action_level_req"), 0)
+            game_action_priority = int_w_default(game_action_entry.get("action_priority"), -1)
+            game_action_desc = game_action_entry.get("action_desc")
+            actions.append(Action(action_name=game_action_name,
+                                  action_timing=game_action_timing,
+                                  action_costs=game_action_costs_resources,
+                                  action_uses=game_action_uses,
+                                  action_classes=game_action_classes,
+                                  action_level_req=game_action_level_req,
+                                  action_priority=game_action_priority,
+                                  action_desc=game_action_desc))
+    if dict_val_ne(json_object, 'items'):
+        for game_item_entry in json_object.get("items"):
+            game_item_name = game_item_entry.get("item_name")
+            game_item_type = game_item_entry.get("item_type")
+            game_item_subtype = game_item_entry.get("item_subtype")
+            game_item_rarity = game_item_entry.get("item_rarity")
+            game_item_properties = game_item_entry.get("item_properties")
+            game_is_equipped = game_item_entry.get("is_equipped")
+            game_item_desc = game_item_entry.get("item_desc")
+            game_item_action: Optional[Action] = None
+            if dict_val_ne(game_item_entry, 'item_action'):
+                game_item_action_entry = game_item_entry.get("item_action")
+                game_item_action_name = game_item_action_entry.get("action_name")
+                game_item_action_timing = game_item_action_entry.get("action_timing")
+                game_item_action_costs_resources = []
+                if dict_val_ne(game_item_action_entry, 'action_costs'):
+                    for game_item_action_cost_entry in game_item_action_entry.get("action_costs"):
+                        game_item_action_cost_name = game_item_action_cost_entry.get("res_name")
+                        game_item_action_cost_amt = int_w_default(game_item_action_cost_entry.get("amount"), 0)
+                        game_item_action_costs_resources.append(
+                            ResourceCost(res_name=game_item_action_cost_name,
+                                         amount=game_item_action_cost_amt))
+                game_item_action_uses = int_w_default(game_item_action_entry.get("action_uses"), -1)
+                game_item_action_classes = game_item_action_entry.get("action_classes")
+                game_item_action_level_req = int_w_default(game_item_action_entry.get("action_level_req"), 0)
+                game_item_action_priority = int_w_default(game_item_action_entry.get("action_priority"), -1)
+                game_item_action_desc = game_item_action_entry.get("action_desc")
+                game_item_action = Action(action_name=game_item_action_name,
+                                          action_timing=game_item_action_timing,
+                                          action_costs=game_item_action_costs_resources,
+                                          action_uses=game_item_action_uses,
+                                          action_classes=game_item_action_classes,
+                                          action_level_req=game_item_action_level_req,
+                                          action_priority=game_item_action_priority,
+                                          action_desc=game_item_action_desc)
+            items.append(Item(item_name=game_item_name,
+                              item_type=game_item_type,
+                              item_subtype=game_item_subtype,
+                              item_rarity=game_item_rarity,
+                              item_properties=game_item_properties,
+                              item_desc=game_item_desc,
+                              is_equipped=game_is_equipped,
+                              item_action=game_item_action))
+    return attribute_defs, resource_defs, item_type_defs, skills, status_modifiers, actions, items
+
+
+def parse_rounds_json(round_entries: list) -> List[Round]:
+    rounds = []
+    for round_entry in round_entries:
+            round_channel_id = round_entry.get("round_channel_id")
+            round_message_id = round_entry.get("round_message_id")
+            round_num = int_w_default(round_entry.get("round_number"))
+            is_active_round = round_entry.get("is_active_round")
+            votes = []
+            round_dilemmas = []
+            if dict_val_ne(round_entry, 'votes'):
+                for vote_entry in round_entry.get("votes"):
+                    player_id = vote_entry.get("player_id")
+                    choice = vote_entry.get("choice")
+                    timestamp = vote_entry.get("timestamp")
+                    votes.append(Vote(player_id=player_id,
+                                      choice=choice,
+                                      timestamp=timestamp))
+            if dict_val_ne(round_entry, 'round_dilemmas'):
+                for dilemma_entry in round_entry.get("round_dilemmas"):
+                    dilemma_name = dilemma_entry.get("dilemma_name")
+                    dilemma_channel_id = dilemma_entry.get("dilemma_channel_id")
+                    dilemma_message_id = dilemma_entry.get("dilemma_message_id")
+                    is_active_dilemma = dilemma_entry.get("is_active_dilemma")
+                    dilemma_choices = set(dilemma_entry.get("dilemma_choices"))
+                    dilemma_player_ids = set(dilemma_entry.get("dilemma_player_ids"))
+                    dilemma_votes = []
+                    if dict_val_ne(dilemma_entry, 'dilemma_votes'):
+                        for dilemma_vote_entry in dilemma_entry.get("dilemma_votes"):
+                            player_id = dilemma_vote_entry.get("player_id")
+                            choice = dilemma_vote_entry.get("choice")
+                            timestamp = dilemma_vote_entry.get("timestamp")
+                            dilemma_votes.append(Vote(player_id=player_id,
+                                                      choice=choice,
+                                                      timestamp=timestamp))
+                    round_dilemmas.append(Dilemma(dilemma_name=dilemma_name,
+                                                  dilemma_channel_id=dilemma_channel_id,
+                                                  dilemma_message_id=dilemma_message_id,
+                                                  dilemma_player_ids=dilemma_player_ids,
+                                                  dilemma_choices=dilemma_choices,
+                                                  dilemma_votes=dilemma_votes,
+                                                  is_active_dilemma=is_active_dilemma))
+            rounds.append(Round(round_number=round_num,
+                                round_channel_id=round_channel_id,
+                                round_message_id=round_message_id,
+                                round_dilemmas=round_dilemmas,
+                                is_active_round=is_active_round,
+                                votes=votes))
+    return rounds
+
+
+def catalog_to_dict(game: Game) -> dict:
+    catalog_dict = {}
+    att_def_dicts = []
+    for att_def in game.attribute_definitions:
+        att_def_dicts.append({"attribute_name": att_def.attribute_name,
+                              "attribute_max": att_def.attribute_max,
+                              "emoji_text": att_def.emoji_text})
+    catalog_dict["attribute_defs"] = att_def_dicts
+    res_def_dicts = []
+    for res_def in game.resource_definitions:
+        res_def_dicts.append({"resource_name": res_def.resource_name,
+                              "resource_max": res_def.resource_max,
+                              "is_commodity": res_def.is_commodity,
+                              "is_perishable": res_def.is_perishable,
+                              "emoji_text": res_def.emoji_text})
+    catalog_dict["resource_defs"] = res_def_dicts
+    item_type_def_dicts = []
+    for item_type_def in game.item_type_definitions:
+        item_type_def_dicts.append({"item_type": item_type_def.item_type,
+                                    "is_equippable": item_type_def.is_equippable,
+                                    "max_equippable": item_type_def.max_equippable,
+                                    "emoji_text": item_type_def.emoji_text})
+    catalog_dict["item_type_defs"] = item_type_def_dicts
+    game_skill_dicts = []
+    for game_skill in game.skills:
+        game_skill_modifies_atts_dicts = []
+        if game_skill.modifies_attributes is not None:
+            for game_skill_modifies_atts in game_skill.modifies_attributes:
+                game_skill_modifies_atts_dicts.append({"att_name": game_skill_modifies_atts.att_name,
+                                                       "modification": game_skill_modifies_atts.modification})
+        game_skill_dicts.append({"skill_name": game_skill.skill_name,
+                                 "skill_req": game_skill.skill_req,
+                                 "skill_restrict": game_skill.skill_restrict,
+                                 "skill_desc": game_skill.skill_desc,
+                                 "modifies_attributes": game_skill_modifies_atts_dicts})
+    catalog_dict["skills"] = game_skill_dicts
+    game_stat_mod_dicts = []
+    for game_stat_mod in game.status_modifiers:
+        game_stat_mod_modifies_atts_dicts = []
+        if game_stat_mod.modifies_attributes is not None:
+            for game_stat_mod_modifies_atts in game_stat_mod.modifies_attributes:
+                game_stat_mod_modifies_atts_dicts.append({"att_name": game_stat_mod_modifies_atts.att_name,
+                                                          "modification": game_stat_mod_modifies_atts.modification})
+        game_stat_mod_dicts.append({"modifier_type": game_stat_mod.modifier_type,
+                                    "modifier_name": game_stat_mod.modifier_name,
+                                    "modifier_desc": game_stat_mod.modifier_desc,
+                                    "modifier_duration": game_stat_mod.modifier_duration,
+                                    "modifier_stacks": game_stat_mod.modifier_stacks,
+                                    "modifies_attributes": game_stat_mod_modifies_atts_dicts})
+    catalog_dict["status_mods"] = game_stat_mod_dicts
+    game_action_dicts = []
+    for game_action in game.actions:
+        game_action_cost_dicts = []
+        for game_action_cost in game_action.action_costs:
+            game_action_cost_dicts.append({"res_name": game_action_cost.res_name,
+                                           "amount": game_action_cost.amount})
+        game_action_dicts.append({"action_name": game_action.action_name,
+                                  "action_costs": game_action_cost_dicts,
+                                  "action_uses": game_action.action_uses,
+                                  "action_timing": game_action.action_timing,
+                                  "action_classes": game_action.action_classes,
+                                  "action_level_req": game_action.action_level_req,
+                                  "action_priority": game_action.action_priority,
+                                  "action_desc": game_action.action_desc})
+    catalog_dict["actions"] = game_action_dicts
+    game_item_dicts = []
+    for game_item in game.items:
+        game_item_action_dict = {}
+        if game_item.item_action is not None:
+            game_item_action: Action = game_item.item_action
+            game_item_action_cost_dicts = []
+            if game_item_action.action_costs is not None:
+                for game_item_action_cost in game_item_action.action_costs:
+                    game_item_action_cost_dicts.append({"res_name": game_item_action_cost.res_name,
+                                                        "amount": game_item_action_cost.amount})
+            game_item_action_dict = {"action_name": game_item_action.action_name,
+                                     "action_costs": game_item_action_cost_dicts,
+                                     "action_uses": game_item_action.action_uses,
+                                     "action_timing": game_item_action.action_timing,
+                                     "action_classes": game_item_action.action_classes,
+                                     "action_level_req": game_item_action.action_level_req,
+                                     "action_priority": game_item_action.action_priority,
+                                     "action_desc": game_item_action.action_desc}
+        game_item_dicts.append({"item_name": game_item.item_name,
+                                "item_type": game_item.item_type,
+                                "item_subtype": game_item.item_subtype,
+                                "item_rarity": game_item.item_rarity,
+                                "item_properties": game_item.item_properties,
+                                "item_desc": game_item.item_descr,
+                                "item_action": game_item_action_dict})
+    catalog_dict["items"] = game_item_dicts
+    return catalog_dict
+
+
+def rounds_to_dicts(rounds: List[Round]) -> List[dict]:
+    round_dicts = []
+    for a_round in rounds:
+        vote_dicts = []
+        dilemma_dicts = []
+        for vote in a_round.votes:
+            vote_dicts.append({"player_id": vote.player_id,
+                               "choice": vote.choice,
+                               "timestamp": vote.timestamp})
+        for a_dilemma in a_round.round_dilemmas:
+            dilemma_vote_dicts = []
+            for dilemma_vote in a_dilemma.dilemma_votes:
+                dilemma_vote_dicts.append({"player_id": dilemma_vote.player_id,
+                                           "choice": dilemma_vote.choice,
+                                           "timestamp": dilemma_vote.timestamp})
+            dilemma_dicts.append({"dilemma_name": a_dilemma.dilemma_name,
+                                  "dilemma_channel_id": a_dilemma.dilemma_channel_id,
+                                  "dilemma_message_id": a_dilemma.dilemma_message_id,
+                                  "dilemma_player_ids": list(a_dilemma.dilemma_player_ids),
+                                  "dilemma_choices": sorted(a_dilemma.dilemma_choices),
+                                  "dilemma_votes": dilemma_vote_dicts,
+                                  "is_active_dilemma": a_dilemma.is_active_dilemma})
+        round_dicts.append({"round_number": a_round.round_number,
+                            "round_channel_id": a_round.round_channel_id,
+                            "round_message_id": a_round.round_message_id,
+                            "is_active_round": a_round.is_active_round,
+                            "votes": vote_dicts,
+                            "round_dilemmas": dilemma_dicts})
+    return round_dicts
+
+
+def live_state_to_dict(game: Game, live_rounds: List[Round]) -> dict:
+    game_dict = {"format_version": SECTIONED_FORMAT_VERSION,
+                 "is_active": game.is_active,
+                 "parties_locked": game.parties_locked,
+                 "voting_locked": game.voting_locked,
+                 "items_locked": game.items_locked,
+                 "resources_locked": game.resources_locked}
+    game_pi_view_dicts = []
+    for pi_view in game.pi_views:
+        game_pi_view_dicts.append({"view_name": pi_view.view_name,
+                                   "channel_id": pi_view.channel_id,
+                                   "message_ids": pi_view.message_ids,
+                                   "button_msg_id": pi_view.button_msg_id})
+    game_dict["pi_views"] = game_pi_view_dicts
+    player_dicts = []
+    for player in game.players:
+        player_attribute_dicts = []
+        for attribute in player.player_attributes:
+            player_attribute_dicts.append({"name": attribute.name,
+                                           "level": attribute.level,
+                                           "max_level": attribute.max_level})
+        player_resource_dicts = []
+        for resource in player.player_resources:
+            player_resource_dicts.append({"resource_type": resource.resource_type,
+                                          "resource_amt": resource.resource_amt,
+                                          "resource_income": resource.resource_income,
+                                          "resource_max": resource.resource_max,
+                                          "is_commodity": resource.is_commodity,
+                                          "is_perishable": resource.is_perishable})
+        player_skill_dicts = []
+        for skill in player.player_skills:
+            skill_modifies_atts_dicts = []
+            if skill.modifies_attributes is not None:
+                for skill_modifies_atts in skill.modifies_attributes:
+                    skill_modifies_atts_dicts.append({"att_name": skill_modifies_atts.att_name,
+                                                      "modification": skill_modifies_atts.modification})
+            player_skill_dicts.append({"skill_name": skill.skill_name,
+                                       "skill_req": skill.skill_req,
+                                       "skill_restrict": skill.skill_restrict,
+                                       "skill_desc": skill.skill_desc,
+                                       "modifies_attributes": skill_modifies_atts_dicts})
+        player_status_mod_dicts = []
+        for status_mod in player.player_status_mods:
+            stat_mod_modifies_atts_dicts = []
+            if status_mod.modifies_attributes is not None:
+                for stat_mod_modifies_atts in status_mod.modifies_attributes:
+                    stat_mod_modifies_atts_dicts.append({"att_name": stat_mod_modifies_atts.att_name,
+                                                         "modification": stat_mod_modifies_atts.modification})
+            player_status_mod_dicts.append({"modifier_type": status_mod.modifier_type,
+                                            "modifier_name": status_mod.modifier_name,
+                                            "modifier_desc": status_mod.modifier_desc,
+                                            "modifier_duration": status_mod.modifier_duration,
+                                            "modifier_stacks": status_mod.modifier_stacks,
+                                            "modifies_attributes": stat_mod_modifies_atts_dicts})
+        player_action_dicts = []
+        for player_action in player.player_actions:
+            player_action_cost_dicts = []
+            if player_action.action_costs is not None:
+                for player_action_cost in player_action.action_costs:
+                    player_action_cost_dicts.append({"res_name": player_action_cost.res_name,
+                                                     "amount": player_action_cost.amount})
+            player_action_dicts.append({"action_name": player_action.action_name,
+                                        "action_costs": player_action_cost_dicts,
+                                        "action_uses": player_action.action_uses,
+                                        "action_timing": player_action.action_timing,
+                                        "action_classes": player_action.action_classes,
+                                        "action_level_req": player_action.action_level_req,
+                                        "action_priority": player_action.action_priority,
+                                        "action_desc": player_action.action_desc})
+        player_item_dicts = []
+        for player_item in player.player_items:
+            player_item_action_dict = {}
+            if player_item.item_action is not None:
+                player_item_action: Action = player_item.item_action
+                player_item_action_cost_dicts = []
+                if player_item_action.action_costs is not None:
+                    for player_item_action_cost in player_item_action.action_costs:
+                        player_item_action_cost_dicts.append({"res_name": player_item_action_cost.res_name,
+                                                              "amount": player_item_action_cost.amount})
+                player_item_action_dict = {"action_name": player_item_action.action_name,
+                                           "action_costs": player_item_action_cost_dicts,
+                                           "action_uses": player_item_action.action_uses,
+                                           "action_timing": player_item_action.action_timing,
+                                           "action_classes": player_item_action.action_classes,
+                                           "action_level_req": player_item_action.action_level_req,
+                                           "action_priority": player_item_action.action_priority,
+                                           "action_desc": player_item_action.action_desc}
+            player_item_dicts.append({"item_name": player_item.item_name,
+                                      "item_type": player_item.item_type,
+                                      "item_subtype": player_item.item_subtype,
+                                      "item_rarity": player_item.item_rarity,
+                                      "item_properties": player_item.item_properties,
+                                      "item_desc": player_item.item_descr,
+                                      "item_action": player_item_action_dict})
+        player_dicts.append({"player_id": player.player_id,
+                             "player_discord_name": player.player_discord_name,
+                             "player_mod_channel": player.player_mod_channel,
+                             "player_attributes": player_attribute_dicts,
+                             "player_resources": player_resource_dicts,
+                             "player_skills": player_skill_dicts,
+                             "player_status_mods": player_status_mod_dicts,
+                             "player_actions": player_action_dicts,
+                             "player_items": player_item_dicts,
+                             "is_dead": player.is_dead
+                             })
+    game_dict["players"] = player_dicts
+    game_dict["rounds"] = rounds_to_dicts(live_rounds)
+    party_dicts = []
+    for a_party in game.parties:
+        party_dicts.append({"player_ids": list(a_party.player_ids),
+                            "party_name": a_party.party_name,
+                            "channel_id": a_party.channel_id,
+                            "max_size": a_party.max_size})
+    game_dict["parties"] = party_dicts
+    return game_dict
+
+
+def fsync_path(path: str):
+    # Directories can only be opened read-only; on platforms without directory fds this is a no-op
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+pending_sync_paths: Set[str] = set()
+last_batch_sync = 0.0
+
+
+def sync_pending_writes():
+    global last_batch_sync
+    synced_dirs = set()
+    for pending_path in pending_sync_paths:
+        fsync_path(pending_path)
+        synced_dirs.add(os.path.dirname(pending_path) or '.')
+    for synced_dir in synced_dirs:
+        fsync_path(synced_dir)
+    pending_sync_paths.clear()
+    last_batch_sync = time.monotonic()
+
+
+def write_json_file(filepath: str, json_dict: dict) -> str:
+    json_text = json.dumps(json_dict, indent=2, ensure_ascii=False)
+    write_text_file(filepath, json_text)
+    return json_text
+
+
+def write_text_file(filepath: str, text: str):
     millis_prefix = round(time.time() * 1000)
-    filepath_final = f'{Conf.BASE_PATH}/{Conf.GAME_FILE}'
-    filepath_temp = f'{Conf.BASE_PATH}/{millis_prefix}_{Conf.GAME_FILE}'
+    file_dir, file_name = os.path.split(filepath)
+    filepath_temp = os.path.join(file_dir, f'{millis_prefix}_{file_name}')
+    durability = Conf.WRITE_DURABILITY
 
     with open(filepath_temp, 'w', encoding="utf8") as outfile:
+        outfile.write(text)
+        if durability == 'always':
+            outfile.flush()
+            os.fsync(outfile.fileno())
+
+    # os.replace swaps the file in atomically, so a complete game file exists at every point in time
+    os.replace(filepath_temp, filepath)
+
+    if durability == 'always':
+        fsync_path(file_dir or '.')
+    elif durability == 'batch':
+        pending_sync_paths.add(filepath)
+        if time.monotonic() - last_batch_sync >= Conf.WRITE_BATCH_INTERVAL:
+            sync_pending_writes()
+
+    logger.info(f'Wrote game data to {filepath}')
+
+
+def is_valid_json_file(filepath: str) -> bool:
+    try:
+        read_json_file(filepath)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def recover_orphaned_writes(filepath: str):
+    file_dir, file_name = os.path.split(filepath)
+    file_dir = file_dir or '.'
+    if not os.path.isdir(file_dir):
+        return
+
+    target_names = [file_name,
+                    f'{CATALOG_FILE_PREFIX}_{file_name}',
+                    f'{HISTORY_FILE_PREFIX}_{file_name}']
+    target_names.extend(os.path.basename(side_file_path(filepath, file_suffix)) for file_suffix in SIDE_FILE_SUFFIXES)
+    dir_entries = os.listdir(file_dir)
+
+    for target_name in target_names:
+        orphan_pattern = re.compile(rf'^(\d+)_{re.escape(target_name)}$')
+        orphans = []
+        for dir_entry in dir_entries:
+            orphan_match = orphan_pattern.match(dir_entry)
+            if orphan_match:
+                orphans.append((int(orphan_match.group(1)), dir_entry))
+        if not orphans:
+            continue
+
+        target_path = os.path.join(file_dir, target_name)
+        target_valid = is_valid_json_file(target_path)
+        # Newest temp file first; it is the most recent state that was fully written before the crash
+        for orphan_millis, orphan_name in sorted(orphans, reverse=True):
+            orphan_path = os.path.join(file_dir, orphan_name)
+            if not target_valid and is_valid_json_file(orphan_path):
+                os.replace(orphan_path, target_path)
+                target_valid = True
+                logger.warning(f'Recovered {target_path} from orphaned temp file {orphan_name}')
+            else:
+                os.remove(orphan_path)
+                logger.info(f'Removed orphaned temp file {orphan_name}')
+        fsync_path(file_dir)
+
+
+def get_section_paths(filepath: str) -> Dict[str, str]:
+    section_paths = {GAME_FILE_SECTION: filepath,
+                     CATALOG_FILE_PREFIX: section_file_path(filepath, CATALOG_FILE_PREFIX),
+                     HISTORY_FILE_PREFIX: section_file_path(filepath, HISTORY_FILE_PREFIX)}
+    section_paths.update({file_suffix: side_file_path(filepath, file_suffix) for file_suffix in SIDE_FILE_SUFFIXES})
+    section_paths[LEDGER_FILE_SUFFIX] = ledger_file_path(filepath)
+    return section_paths
+
+
+def write_dom_to_json(game: Game) -> int:
+    filepath_final = game.file_path if game.file_path else f'{Conf.BASE_PATH}/{Conf.GAME_FILE}'
+    section_paths = get_section_paths(filepath_final)
+    catalog_path = section_paths[CATALOG_FILE_PREFIX]
+    history_path = section_paths[HISTORY_FILE_PREFIX]
+    written_sections: Dict[str, str] = {}
+
+    # Only the latest round can still change; every older round belongs to the history section
+    latest_round = game.get_latest_round()
+    live_rounds = [latest_round] if latest_round is not None else []
+    past_rounds = [a_round for a_round in game.rounds if a_round is not latest_round]
+
+    # Catalog and history are written before the live file, which acts as the commit point for a write
+    if SECTION_CATALOG in game.dirty_sections or not os.path.isfile(catalog_path):
+        written_sections[CATALOG_FILE_PREFIX] = write_json_file(catalog_path, catalog_to_dict(game))
+    if past_rounds and (game.history_dirty or not os.path.isfile(history_path)):
+        # A round rolled over into history; merge it with the rounds already stored there
+        game.ensure_history_loaded()
+        past_rounds = [a_round for a_round in game.rounds if a_round is not latest_round]
+        written_sections[HISTORY_FILE_PREFIX] = write_json_file(history_path,
+                                                                {"rounds": rounds_to_dicts(past_rounds)})
+    written_sections[GAME_FILE_SECTION] = write_json_file(filepath_final, live_state_to_dict(game, live_rounds))
+
+    snapshots.record_snapshot(game_path=filepath_final, section_paths=section_paths,
+                              written_sections=written_sections, generation=game.generation)
+    return sum(len(section_text.encode("utf8")) for section_text in written_sections.values())
+
+
+def restore_snapshot(filepath: str, snapshot_id: str) -> Optional[snapshots.Snapshot]:
+    snapshot = snapshots.get_snapshot(filepath, snapshot_id)
+    if snapshot is None:
+        return None
+
+    section_paths = get_section_paths(filepath)
+    section_contents = snapshots.load_snapshot_sections(filepath, snapshot)
+
+    # Keep the state being replaced as its own snapshot so a restore can itself be undone
+    snapshots.record_snapshot(game_path=filepath, section_paths=section_paths, written_sections={},
+                              generation=0, reason=f'before restore of {snapshot_id}', force=True)
+
+    # The ledger is rolled back with the balances, so it never lists transactions the restored game does not hold
+    for section_name in (CATALOG_FILE_PREFIX, HISTORY_FILE_PREFIX, LEDGER_FILE_SUFFIX, GAME_FILE_SECTION):
+        if section_name in section_contents:
+            write_text_file(section_paths[section_name], section_contents[section_name])
+        elif section_name != GAME_FILE_SECTION and os.path.isfile(section_paths[section_name]):
+            # The section did not exist when the snapshot was taken
+            os.remove(section_paths[section_name])
+    for file_suffix in SIDE_FILE_SUFFIXES:
+        # Side files are only replaced when the snapshot holds them; snapshots taken before they were recorded do not
+        if file_suffix in section_contents:
+            write_text_file(section_paths[file_suffix], section_contents[file_suffix])
 
-        # convert Game to dictionary here
-        game_dict = {"is_active": game.is_active,
-                     "parties_locked": game.parties_locked,
-                     "voting_locked": game.voting_locked,
-                     "items_locked": game.items_locked,
-                     "resources_locked": game.resources_locked}
-        att_def_dicts = []
-        for att_def in game.attribute_definitions:
-            att_def_dicts.append({"attribute_name": att_def.attribute_name,
-                                  "attribute_max": att_def.attribute_max,
-                                  "emoji_text": att_def.emoji_text})
-        game_dict["attribute_defs"] = att_def_dicts
-        res_def_dicts = []
-        for res_def in game.resource_definitions:
-            res_def_dicts.append({"resource_name": res_def.resource_name,
-                                  "resource_max": res_def.resource_max,
-                                  "is_commodity": res_def.is_commodity,
-                                  "is_perishable": res_def.is_perishable,
-                                  "emoji_text": res_def.emoji_text})
-        game_dict["resource_defs"] = res_def_dicts
-        item_type_def_dicts = []
-        for item_type_def in game.item_type_definitions:
-            item_type_def_dicts.append({"item_type": item_type_def.item_type,
-                                        "is_equippable": item_type_def.is_equippable,
-                                        "max_equippable": item_type_def.max_equippable,
-                                        "emoji_text": item_type_def.emoji_text})
-        game_dict["item_type_defs"] = item_type_def_dicts
-        game_skill_dicts = []
-        for game_skill in game.skills:
-            game_skill_modifies_atts_dicts = []
-            if game_skill.modifies_attributes is not None:
-                for game_skill_modifies_atts in game_skill.modifies_attributes:
-                    game_skill_modifies_atts_dicts.append({"att_name": game_skill_modifies_atts.att_name,
-                                                           "modification": game_skill_modifies_atts.modification})
-            game_skill_dicts.append({"skill_name": game_skill.skill_name,
-                                     "skill_req": game_skill.skill_req,
-                                     "skill_restrict": game_skill.skill_restrict,
-                                     "skill_desc": game_skill.skill_desc,
-                                     "modifies_attributes": game_skill_modifies_atts_dicts})
-        game_dict["skills"] = game_skill_dicts
-        game_stat_mod_dicts = []
-        for game_stat_mod in game.status_modifiers:
-            game_stat_mod_modifies_atts_dicts = []
-            if game_stat_mod.modifies_attributes is not None:
-                for game_stat_mod_modifies_atts in game_stat_mod.modifies_attributes:
-                    game_stat_mod_modifies_atts_dicts.append({"att_name": game_stat_mod_modifies_atts.att_name,
-                                                              "modification": game_stat_mod_modifies_atts.modification})
-            game_stat_mod_dicts.append({"modifier_type": game_stat_mod.modifier_type,
-                                        "modifier_name": game_stat_mod.modifier_name,
-                                        "modifier_desc": game_stat_mod.modifier_desc,
-                                        "modifier_duration": game_stat_mod.modifier_duration,
-                                        "modifier_stacks": game_stat_mod.modifier_stacks,
-                                        "modifies_attributes": game_stat_mod_modifies_atts_dicts})
-        game_dict["status_mods"] = game_stat_mod_dicts
-        game_pi_view_dicts = []
-        for pi_view in game.pi_views:
-            game_pi_view_dicts.append({"view_name": pi_view.view_name,
-                                       "channel_id": pi_view.channel_id,
-                                       "message_ids": pi_view.message_ids,
-                                       "button_msg_id": pi_view.button_msg_id})
-        game_dict["pi_views"] = game_pi_view_dicts
-        player_dicts = []
-        for player in game.players:
-            player_attribute_dicts = []
-            for attribute in player.player_attributes:
-                player_attribute_dicts.append({"name": attribute.name,
-                                               "level": attribute.level,
-                                               "max_level": attribute.max_level})
-            player_resource_dicts = []
-            for resource in player.player_resources:
-                player_resource_dicts.append({"resource_type": resource.resource_type,
-                                              "resource_amt": resource.resource_amt,
-                                              "resource_income": resource.resource_income,
-                                              "resource_max": resource.resource_max,
-                                              "is_commodity": resource.is_commodity,
-                                              "is_perishable": resource.is_perishable})
-            player_skill_dicts = []
-            for skill in player.player_skills:
-                skill_modifies_atts_dicts = []
-                if skill.modifies_attributes is not None:
-                    for skill_modifies_atts in skill.modifies_attributes:
-                        skill_modifies_atts_dicts.append({"att_name": skill_modifies_atts.att_name,
-                                                          "modification": skill_modifies_atts.modification})
-                player_skill_dicts.append({"skill_name": skill.skill_name,
-                                           "skill_req": skill.skill_req,
-                                           "skill_restrict": skill.skill_restrict,
-                                           "skill_desc": skill.skill_desc,
-                                           "modifies_attributes": skill_modifies_atts_dicts})
-            player_status_mod_dicts = []
-            for status_mod in player.player_status_mods:
-                stat_mod_modifies_atts_dicts = []
-                if status_mod.modifies_attributes is not None:
-                    for stat_mod_modifies_atts in status_mod.modifies_attributes:
-                        stat_mod_modifies_atts_dicts.append({"att_name": stat_mod_modifies_atts.att_name,
-                                                             "modification": stat_mod_modifies_atts.modification})
-                player_status_mod_dicts.append({"modifier_type": status_mod.modifier_type,
-                                                "modifier_name": status_mod.modifier_name,
-                                                "modifier_desc": status_mod.modifier_desc,
-                                                "modifier_duration": status_mod.modifier_duration,
-                                                "modifier_stacks": status_mod.modifier_stacks,
-                                                "modifies_attributes": stat_mod_modifies_atts_dicts})
-            player_action_dicts = []
-            for player_action in player.player_actions:
-                player_action_cost_dicts = []
-                if player_action.action_costs is not None:
-                    for player_action_cost in player_action.action_costs:
-                        player_action_cost_dicts.append({"res_name": player_action_cost.res_name,
-                                                         "amount": player_action_cost.amount})
-                player_action_dicts.append({"action_name": player_action.action_name,
-                                            "action_costs": player_action_cost_dicts,
-                                            "action_uses": player_action.action_uses,
-                                            "action_timing": player_action.action_timing,
-                                            "action_classes": player_action.action_classes,
-                                            "action_level_req": player_action.action_level_req,
-                                            "action_priority": player_action.action_priority,
-                                            "action_desc": player_action.action_desc})
-            player_item_dicts = []
-            for player_item in player.player_items:
-                player_item_action_dict = {}
-                if player_item.item_action is not None:
-                    player_item_action: Action = player_item.item_action
-                    player_item_action_cost_dicts = []
-                    if player_item_action.action_costs is not None:
-                        for player_item_action_cost in player_item_action.action_costs:
-                            player_item_action_cost_dicts.append({"res_name": player_item_action_cost.res_name,
-                                                                  "amount": player_item_action_cost.amount})
-                    player_item_action_dict = {"action_name": player_item_action.action_name,
-                                               "action_costs": player_item_action_cost_dicts,
-                                               "action_uses": player_item_action.action_uses,
-                                               "action_timing": player_item_action.action_timing,
-                                               "action_classes": player_item_action.action_classes,
-                                               "action_level_req": player_item_action.action_level_req,
-                                               "action_priority": player_item_action.action_priority,
-                                               "action_desc": player_item_action.action_desc}
-                player_item_dicts.append({"item_name": player_item.item_name,
-                                          "item_type": player_item.item_type,
-                                          "item_subtype": player_item.item_subtype,
-                                          "item_rarity": player_item.item_rarity,
-                                          "item_properties": player_item.item_properties,
-                                          "item_desc": player_item.item_descr,
-                                          "item_action": player_item_action_dict})
-            player_dicts.append({"player_id": player.player_id,
-                                 "player_discord_name": player.player_discord_name,
-                                 "player_mod_channel": player.player_mod_channel,
-                                 "player_attributes": player_attribute_dicts,
-                                 "player_resources": player_resource_dicts,
-                                 "player_skills": player_skill_dicts,
-                                 "player_status_mods": player_status_mod_dicts,
-                                 "player_actions": player_action_dicts,
-                                 "player_items": player_item_dicts,
-                                 "is_dead": player.is_dead
-                                 })
-        game_dict["players"] = player_dicts
-        round_dicts = []
-        for a_round in game.rounds:
-            vote_dicts = []
-            dilemma_dicts = []
-            for vote in a_round.votes:
-                vote_dicts.append({"player_id": vote.player_id,
-                                   "choice": vote.choice,
-                                   "timestamp": vote.timestamp})
-            for a_dilemma in a_round.round_dilemmas:
-                dilemma_vote_dicts = []
-                for dilemma_vote in a_dilemma.dilemma_votes:
-                    dilemma_vote_dicts.append({"player_id": dilemma_vote.player_id,
-                                               "choice": dilemma_vote.choice,
-                                               "timestamp": dilemma_vote.timestamp})
-                dilemma_dicts.append({"dilemma_name": a_dilemma.dilemma_name,
-                                      "dilemma_channel_id": a_dilemma.dilemma_channel_id,
-                                      "dilemma_message_id": a_dilemma.dilemma_message_id,
-                                      "dilemma_player_ids": list(a_dilemma.dilemma_player_ids),
-                                      "dilemma_choices": list(a_dilemma.dilemma_choices),
-                                      "dilemma_votes": dilemma_vote_dicts,
-                                      "is_active_dilemma": a_dilemma.is_active_dilemma})
-            round_dicts.append({"round_number": a_round.round_number,
-                                "round_channel_id": a_round.round_channel_id,
-                                "round_message_id": a_round.round_message_id,
-                                "is_active_round": a_round.is_active_round,
-                                "votes": vote_dicts,
-                                "round_dilemmas": dilemma_dicts})
-        game_dict["rounds"] = round_dicts
-        party_dicts = []
-        for a_party in game.parties:
-            party_dicts.append({"player_ids": list(a_party.player_ids),
-                                "party_name": a_party.party_name,
-                                "channel_id": a_party.channel_id,
-                                "max_size": a_party.max_size})
-        game_dict["parties"] = party_dicts
-        game_action_dicts = []
-        for game_action in game.actions:
-            game_action_cost_dicts = []
-            for game_action_cost in game_action.action_costs:
-                game_action_cost_dicts.append({"res_name": game_action_cost.res_name,
-                                               "amount": game_action_cost.amount})
-            game_action_dicts.append({"action_name": game_action.action_name,
-                                      "action_costs": game_action_cost_dicts,
-                                      "action_uses": game_action.action_uses,
-                                      "action_timing": game_action.action_timing,
-                                      "action_classes": game_action.action_classes,
-                                      "action_level_req": game_action.action_level_req,
-                                      "action_priority": game_action.action_priority,
-                                      "action_desc": game_action.action_desc})
-        game_dict["actions"] = game_action_dicts
-        game_item_dicts = []
-        for game_item in game.items:
-            game_item_action_dict = {}
-            if game_item.item_action is not None:
-                game_item_action: Action = game_item.item_action
-                game_item_action_cost_dicts = []
-                if game_item_action.action_costs is not None:
-                    for game_item_action_cost in game_item_action.action_costs:
-                        game_item_action_cost_dicts.append({"res_name": game_item_action_cost.res_name,
-                                                            "amount": game_item_action_cost.amount})
-                game_item_action_dict = {"action_name": game_item_action.action_name,
-                                         "action_costs": game_item_action_cost_dicts,
-                                         "action_uses": game_item_action.action_uses,
-                                         "action_timing": game_item_action.action_timing,
-                                         "action_classes": game_item_action.action_classes,
-                                         "action_level_req": game_item_action.action_level_req,
-                                         "action_priority": game_item_action.action_priority,
-                                         "action_desc": game_item_action.action_desc}
-            game_item_dicts.append({"item_name": game_item.item_name,
-                                    "item_type": game_item.item_type,
-                                    "item_subtype": game_item.item_subtype,
-                                    "item_rarity": game_item.item_rarity,
-                                    "item_properties": game_item.item_properties,
-                                    "item_desc": game_item.item_descr,
-                                    "item_action": game_item_action_dict})
-        game_dict["items"] = game_item_dicts
-        json.dump(game_dict, outfile, indent=2, ensure_ascii=False)
-        outfile.close()
-
-        if os.path.isfile(filepath_final):
-            os.remove(filepath_final)
-        os.rename(filepath_temp, filepath_final)
-
-        logger.info(f'Wrote game data to {filepath_final}')
+    logger.info(f'Restored game at {filepath} to snapshot {snapshot_id}')
+    return snapshot
 
 
 async def get_game(file_path: str) -> Game:
@@ -1157,8 +1505,16 @@ async def get_game(file_path: str) -> Game:
     return read_json_to_dom(filepath=file_path)
 
 
-async def write_game(game: Game):
-    write_dom_to_json(game=game)
+async def write_game(game: Game, force: bool = False):
+    if not force and not game.is_dirty():
+        logger.info(f'Game unchanged since generation {game.flushed_generation}; skipping write')
+        return
+    logger.info(f'Flushing game generation {game.generation} with dirty sections {sorted(game.dirty_sections)}')
+    write_start = time.perf_counter()
+    with time_phase(PHASE_PERSIST):
+        bytes_written = write_dom_to_json(game=game)
+    record_game_write((time.perf_counter() - write_start) * 1000, bytes_written)
+    game.mark_flushed()
 
 
 async def read_players_file(file_path: str, game_attribute_definitions: Dict[str, AttributeDefinition] = None,
@@ -1279,7 +1635,7 @@ async def read_parties_file(file_path: str) -> List[Party]:
 
     for row in rows:
         player_ids = set(map(int, list(filter(None, row['player_ids'].split(';'))))) if dict_val_ne(row,
-                                                                                                    'player_ids') else []
+                                                                                                    'player_ids') else set()
         party_name = row['name']
         max_size = int_w_default(row['max_size'], -1) if dict_val_ne(row, 'max_size') else -1
         channel_id = int_w_default(row['channel_id'], 0) if dict_val_ne(row, 'channel_id') else 0
@@ -1468,6 +1824,8 @@ async def read_items_file(file_path: str, game_actions: Dict[str, Action] = None
 
 
 async def read_csv_file(file_path: str) -> List[Dict]:
+    # csv is only needed when a game is initialized, so it is kept off the startup import path
+    import csv
     rows: List[Dict] = []
     with open(file_path, newline='', encoding='utf-8') as csv_file:
         reader = csv.DictReader(csv_file)
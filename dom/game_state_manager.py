@@ -0,0 +1,190 @@
+#! game_state_manager.py
+# Holds the loaded games for every guild hosted by this process and routes interactions to them
+
+import asyncio
+import os
+import time
+from typing import Optional, List, Dict, Tuple
+import dom.data_model as gdm
+from dom.data_model import Game
+from dom.conf_vars import ConfVars as Conf
+from bot_logging.logging_manager import logger
+from bot_logging.metrics_manager import time_phase, record_cache_lookup, PHASE_STATE_LOAD
+
+
+def parse_game_routes(routes: str) -> Dict[Tuple[int, Optional[int]], str]:
+    # Routes look like 'guild_id=game.json,guild_id:channel_id=other_game.json'
+    game_routes: Dict[Tuple[int, Optional[int]], str] = {(Conf.GUILD_ID, None): Conf.GAME_PATH}
+    for route in routes.split(','):
+        if not route.strip():
+            continue
+        route_key, game_file = route.split('=', 1)
+        guild_id, _, channel_id = route_key.strip().partition(':')
+        game_path = game_file.strip() if os.path.isabs(game_file.strip()) else f'{Conf.BASE_PATH}/{game_file.strip()}'
+        game_routes[(int(guild_id), int(channel_id) if channel_id else None)] = game_path
+    return game_routes
+
+
+GUILD_SETTING_NAMES = ("request_channel", "mod_role_id", "mod_category", "private_chat_category", "vote_channel")
+
+
+class GuildNotConfiguredError(Exception):
+    # Raised for interactions from a guild, or a channel of one, that no game is routed to
+    pass
+
+
+class GuildSettings:
+    def __init__(self, request_channel: int, mod_role_id: int, mod_category: int, private_chat_category: int,
+                 vote_channel: int):
+        self.request_channel = request_channel
+        self.mod_role_id = mod_role_id
+        self.mod_category = mod_category
+        self.private_chat_category = private_chat_category
+        self.vote_channel = vote_channel
+
+
+def parse_guild_settings(settings: str) -> Dict[int, GuildSettings]:
+    # Settings look like 'guild_id:request_channel=1;mod_role_id=2;...,other_guild_id:request_channel=3;...'
+    guild_settings = {Conf.GUILD_ID: GuildSettings(request_channel=Conf.REQUEST_CHANNEL,
+                                                   mod_role_id=Conf.MOD_ROLE_ID,
+                                                   mod_category=Conf.MOD_CATEGORY,
+                                                   private_chat_category=Conf.PRIVATE_CHAT_CATEGORY,
+                                                   vote_channel=Conf.VOTE_CHANNEL)}
+    for guild_entry in settings.split(','):
+        if not guild_entry.strip():
+            continue
+        guild_id, _, guild_values = guild_entry.partition(':')
+        setting_values = {}
+        for guild_value in guild_values.split(';'):
+            if '=' in guild_value:
+                setting_name, setting_value = guild_value.split('=', 1)
+                setting_values[setting_name.strip().lower()] = int(setting_value)
+        missing_names = [setting_name for setting_name in GUILD_SETTING_NAMES if setting_name not in setting_values]
+        if missing_names:
+            raise ValueError(f'GUILD_SETTINGS for guild {guild_id.strip()} is missing {", ".join(missing_names)}')
+        guild_settings[int(guild_id)] = GuildSettings(**{setting_name: setting_values[setting_name]
+                                                         for setting_name in GUILD_SETTING_NAMES})
+    return guild_settings
+
+
+class GameStateManager:
+    def __init__(self):
+        # Routes and guild settings are parsed from the configuration the first time either is used, not on import
+        self.loaded_game_routes: Optional[Dict[Tuple[int, Optional[int]], str]] = None
+        self.loaded_guild_settings: Optional[Dict[int, GuildSettings]] = None
+        self.games: Dict[str, Game] = {}
+        self.last_access: Dict[str, float] = {}
+
+    def load_configuration(self):
+        game_routes = parse_game_routes(Conf.GAME_ROUTES)
+        guild_settings = parse_guild_settings(Conf.GUILD_SETTINGS)
+        # A routed guild without its own ids would send moderator messages and create channels in the default guild
+        unconfigured_guild_ids = sorted({guild_id for guild_id, channel_id in game_routes} - guild_settings.keys())
+        if unconfigured_guild_ids:
+            raise ValueError(f'GUILD_SETTINGS has no entry for routed guilds {unconfigured_guild_ids}')
+        self.loaded_game_routes = game_routes
+        self.loaded_guild_settings = guild_settings
+
+    @property
+    def game_routes(self) -> Dict[Tuple[int, Optional[int]], str]:
+        if self.loaded_game_routes is None:
+            self.load_configuration()
+        return self.loaded_game_routes
+
+    @property
+    def guild_settings(self) -> Dict[int, GuildSettings]:
+        if self.loaded_guild_settings is None:
+            self.load_configuration()
+        return self.loaded_guild_settings
+
+    @property
+    def guild_ids(self) -> List[int]:
+        return sorted({guild_id for guild_id, channel_id in self.game_routes})
+
+    def get_game_path(self, guild_id: Optional[int], channel_id: Optional[int] = None) -> Optional[str]:
+        # A channel specific route wins over the guild wide route; a guild never falls back to another guild's game
+        game_path = self.game_routes.get((guild_id, channel_id))
+        if game_path is None:
+            game_path = self.game_routes.get((guild_id, None))
+        return game_path
+
+    def get_interaction_game_path(self, interaction) -> str:
+        game_path = self.get_game_path(interaction.guild_id, interaction.channel_id)
+        if game_path is None:
+            raise GuildNotConfiguredError('No game is set up for this channel!')
+        return game_path
+
+    def get_guild_settings(self, guild_id: Optional[int]) -> GuildSettings:
+        guild_settings = self.guild_settings.get(guild_id)
+        if guild_settings is None:
+            raise GuildNotConfiguredError(f'No game is set up for guild {guild_id}!')
+        return guild_settings
+
+    async def get_game_at_path(self, game_path: str) -> Game:
+        self.last_access[game_path] = time.monotonic()
+        game = self.games.get(game_path)
+        record_cache_lookup("game_state", game is not None)
+        if game is None:
+            with time_phase(PHASE_STATE_LOAD):
+                game = await gdm.get_game(file_path=game_path)
+            self.games[game_path] = game
+        return game
+
+    async def get_game(self, guild_id: Optional[int], channel_id: Optional[int] = None) -> Game:
+        game_path = self.get_game_path(guild_id, channel_id)
+        if game_path is None:
+            raise GuildNotConfiguredError(f'No game is set up for guild {guild_id}!')
+        return await self.get_game_at_path(game_path)
+
+    async def get_interaction_game(self, interaction) -> Game:
+        return await self.get_game_at_path(self.get_interaction_game_path(interaction))
+
+    async def preload_games(self):
+        # Games are parsed on worker threads so startup can overlap them with network bound work
+        game_paths = [path for path in set(self.game_routes.values())
+                      if path not in self.games and os.path.isfile(path)]
+        loaded_games = await asyncio.gather(*(asyncio.to_thread(gdm.read_json_to_dom, path) for path in game_paths))
+        for game_path, game in zip(game_paths, loaded_games):
+            self.games[game_path] = game
+            self.last_access[game_path] = time.monotonic()
+        logger.info(f'Preloaded {len(game_paths)} games')
+
+    def invalidate(self, game_path: str):
+        # Used when a game file is replaced on disk, so the next access reloads it
+        self.games.pop(game_path, None)
+        self.last_access.pop(game_path, None)
+
+    def discard_game(self, game_path: str):
+        # A command that failed part way may have changed the cached game without writing it; dropping the game makes
+        # the next access reload the last state written, rather than a later flush persisting the partial change
+        if game_path in self.games:
+            self.invalidate(game_path)
+            logger.warning(f'Discarded unwritten changes to the game at {game_path} after an error')
+
+    def discard_interaction_game(self, interaction):
+        game_path = self.get_game_path(interaction.guild_id, interaction.channel_id)
+        if game_path is not None:
+            self.discard_game(game_path)
+
+    async def unload_game(self, game_path: str):
+        game = self.games.get(game_path)
+        if game is not None:
+            await gdm.write_game(game=game)
+        self.invalidate(game_path)
+        logger.info(f'Unloaded game at {game_path}')
+
+    async def unload_idle_games(self):
+        idle_cutoff = time.monotonic() - Conf.GAME_IDLE_TIMEOUT
+        for game_path in [path for path, accessed in self.last_access.items() if accessed < idle_cutoff]:
+            await self.unload_game(game_path)
+
+    async def flush_all(self):
+        for game in list(self.games.values()):
+            await gdm.write_game(game=game)
+
+    def recover_orphaned_writes(self):
+        for game_path in set(self.game_routes.values()):
+            gdm.recover_orphaned_writes(game_path)
+
+
+game_states = GameStateManager()
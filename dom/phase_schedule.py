@@ -0,0 +1,109 @@
+#! phase_schedule.py
+# Stores the times of day each game's phases run automatically, persisted next to the game so they survive restarts
+
+import calendar
+import json
+import os
+import time
+from typing import Optional, List, Dict
+import dom.data_model as gdm
+from bot_logging.logging_manager import logger
+
+PHASE_DAILY_INCOMES = "daily-incomes"
+PHASE_ROUND_END = "round-end"
+PHASE_REPORT_REFRESH = "report-refresh"
+SCHEDULE_PHASES = (PHASE_DAILY_INCOMES, PHASE_ROUND_END, PHASE_REPORT_REFRESH)
+
+SECONDS_PER_DAY = 86400
+
+# Schedules cached per game path so the scheduler loop does not re-read them every check
+game_schedules: Dict[str, List['ScheduledPhase']] = {}
+
+
+class ScheduledPhase:
+    def __init__(self, phase: str, time_of_day: str, next_run_at: int, last_run_at: Optional[int] = None):
+        self.phase = phase
+        # 'HH:MM' in UTC
+        self.time_of_day = time_of_day
+        self.next_run_at = next_run_at
+        self.last_run_at = last_run_at
+
+    @property
+    def schedule_id(self) -> str:
+        return f'{self.phase}@{self.time_of_day}'
+
+
+def parse_time_of_day(time_of_day: str) -> Optional[str]:
+    # Returns the time normalized to 'HH:MM', or None when it is not a valid time of day
+    hours, _, minutes = time_of_day.strip().partition(':')
+    if not hours.isdigit() or not minutes.isdigit() or int(hours) > 23 or int(minutes) > 59:
+        return None
+    return f'{int(hours):02d}:{int(minutes):02d}'
+
+
+def get_next_run_at(time_of_day: str, after: float) -> int:
+    # The first occurrence of the UTC time of day strictly after the given timestamp
+    hours, minutes = (int(part) for part in time_of_day.split(':'))
+    day_start = calendar.timegm(time.gmtime(after)[:3] + (0, 0, 0))
+    run_at = day_start + hours * 3600 + minutes * 60
+    return run_at if run_at > after else run_at + SECONDS_PER_DAY
+
+
+def get_schedule_path(game_path: str) -> str:
+    return gdm.side_file_path(game_path, gdm.SCHEDULE_FILE_SUFFIX)
+
+
+def load_schedule(game_path: str) -> List[ScheduledPhase]:
+    if game_path in game_schedules:
+        return game_schedules[game_path]
+    schedule_path = get_schedule_path(game_path)
+    schedule = []
+    if os.path.isfile(schedule_path):
+        try:
+            with open(schedule_path, 'r', encoding="utf8") as schedule_file:
+                schedule = [ScheduledPhase(phase=entry.get("phase"), time_of_day=entry.get("time_of_day"),
+                                           next_run_at=entry.get("next_run_at"),
+                                           last_run_at=entry.get("last_run_at"))
+                            for entry in json.load(schedule_file)]
+        except (OSError, ValueError) as e:
+            logger.error(f'Could not read phase schedule {schedule_path}; no phases will run automatically\n{e}')
+    game_schedules[game_path] = schedule
+    return schedule
+
+
+def save_schedule(game_path: str, schedule: List[ScheduledPhase]):
+    game_schedules[game_path] = schedule
+    gdm.write_text_file(get_schedule_path(game_path),
+                        json.dumps([{"phase": entry.phase, "time_of_day": entry.time_of_day,
+                                     "next_run_at": entry.next_run_at, "last_run_at": entry.last_run_at}
+                                    for entry in schedule], indent=2))
+
+
+def forget_schedule(game_path: str):
+    # Used when the schedule file is replaced on disk, such as by a snapshot restore, so it is read again
+    game_schedules.pop(game_path, None)
+
+
+def add_scheduled_phase(game_path: str, phase: str, time_of_day: str) -> Optional[ScheduledPhase]:
+    # Returns None when the phase is already scheduled at that time
+    schedule = load_schedule(game_path)
+    new_entry = ScheduledPhase(phase=phase, time_of_day=time_of_day,
+                               next_run_at=get_next_run_at(time_of_day, time.time()))
+    if any(entry.schedule_id == new_entry.schedule_id for entry in schedule):
+        return None
+    save_schedule(game_path, sorted(schedule + [new_entry], key=lambda e: (e.time_of_day, e.phase)))
+    return new_entry
+
+
+def remove_scheduled_phase(game_path: str, schedule_id: str) -> Optional[ScheduledPhase]:
+    schedule = load_schedule(game_path)
+    for entry in schedule:
+        if entry.schedule_id == schedule_id:
+            save_schedule(game_path, [other for other in schedule if other is not entry])
+            return entry
+    return None
+
+
+def get_due_phases(game_path: str, now: float) -> List[ScheduledPhase]:
+    return sorted((entry for entry in load_schedule(game_path) if entry.next_run_at <= now),
+                  key=lambda e: e.next_run_at)
@@ -0,0 +1,105 @@
+#! resource_engine.py
+# Applies daily resource incomes and perishing to every player in one batch, holding their resources as columns
+
+from array import array
+from typing import List, Tuple
+from dom.data_model import Player, Resource, clamp_resource_amt
+
+# NumPy is optional and only imported once a batch is first run, as it would otherwise add to the bot's startup time
+numpy_module = None
+numpy_checked = False
+
+
+def get_numpy():
+    global numpy_module, numpy_checked
+    if not numpy_checked:
+        try:
+            import numpy
+            numpy_module = numpy
+        except ImportError:
+            numpy_module = None
+        numpy_checked = True
+    return numpy_module
+
+
+class ResourceDelta:
+    def __init__(self, resource: Resource, expired_amt: int, income_amt: int, gained_amt: int):
+        self.resource = resource
+        # Amount lost to perishing, the income due, and what the income actually added once clamped to the max
+        self.expired_amt = expired_amt
+        self.income_amt = income_amt
+        self.gained_amt = gained_amt
+
+
+class PlayerResourceDeltas:
+    def __init__(self, player: Player, deltas: List[ResourceDelta]):
+        self.player = player
+        self.deltas = deltas
+
+
+class ResourceColumns:
+    # Every player resource is one row, with one column per field the daily tick reads
+    def __init__(self, players: List[Player]):
+        self.player_rows: List[Tuple[Player, int, int]] = []
+        self.resources: List[Resource] = []
+        for player in players:
+            first_row = len(self.resources)
+            self.resources.extend(player.player_resources)
+            self.player_rows.append((player, first_row, len(self.resources)))
+        self.amounts = array('q', [resource.resource_amt for resource in self.resources])
+        self.incomes = array('q', [max(resource.resource_income or 0, 0) for resource in self.resources])
+        self.maxes = array('q', [resource.resource_max for resource in self.resources])
+        self.perishable = array('b', [bool(resource.is_perishable) for resource in self.resources])
+
+    def apply_daily_tick(self) -> Tuple[List[int], List[int]]:
+        # Returns the new amount and the amount expired for every row
+        numpy = get_numpy()
+        if numpy is not None and self.resources:
+            return self.apply_daily_tick_numpy(numpy)
+        return self.apply_daily_tick_arrays()
+
+    def apply_daily_tick_numpy(self, numpy) -> Tuple[List[int], List[int]]:
+        amounts = numpy.frombuffer(self.amounts, dtype=numpy.int64)
+        incomes = numpy.frombuffer(self.incomes, dtype=numpy.int64)
+        maxes = numpy.frombuffer(self.maxes, dtype=numpy.int64)
+        perishable = numpy.frombuffer(self.perishable, dtype=numpy.int8).astype(bool)
+
+        expired = numpy.where(perishable & (amounts > 0), amounts, 0)
+        kept = numpy.where(perishable, 0, amounts)
+        # The same clamping as clamp_resource_amt, where a max of -1 means uncapped
+        gained = numpy.maximum(kept + incomes, 0)
+        gained = numpy.where(maxes != -1, numpy.minimum(gained, maxes), gained)
+        new_amounts = numpy.where(incomes > 0, gained, kept)
+        return new_amounts.tolist(), expired.tolist()
+
+    def apply_daily_tick_arrays(self) -> Tuple[List[int], List[int]]:
+        new_amounts = []
+        expired = []
+        for amount, income, resource_max, is_perishable in zip(self.amounts, self.incomes, self.maxes,
+                                                                self.perishable):
+            expired.append(amount if is_perishable and amount > 0 else 0)
+            kept = 0 if is_perishable else amount
+            if income > 0:
+                new_amounts.append(clamp_resource_amt(kept + income, resource_max))
+            else:
+                new_amounts.append(kept)
+        return new_amounts, expired
+
+
+def apply_daily_resource_tick(players: List[Player]) -> List[PlayerResourceDeltas]:
+    # Perishable resources are emptied first, then income is added and clamped to the resource max; the returned
+    # deltas list, per player, every resource that expired or gained income so it can be reported
+    columns = ResourceColumns(players)
+    new_amounts, expired = columns.apply_daily_tick()
+
+    player_deltas = []
+    for player, first_row, end_row in columns.player_rows:
+        deltas = []
+        for row in range(first_row, end_row):
+            resource = columns.resources[row]
+            resource.resource_amt = new_amounts[row]
+            if expired[row] > 0 or columns.incomes[row] > 0:
+                kept = 0 if columns.perishable[row] else columns.amounts[row]
+                deltas.append(ResourceDelta(resource, expired[row], columns.incomes[row], new_amounts[row] - kept))
+        player_deltas.append(PlayerResourceDeltas(player, deltas))
+    return player_deltas
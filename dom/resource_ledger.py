@@ -0,0 +1,181 @@
+#! resource_ledger.py
+# Records every change to player resources as a transaction, validating a whole batch before applying any of it
+
+import json
+import os
+import time
+import uuid
+from typing import Optional, List, Dict, Tuple
+from dom.conf_vars import ConfVars as Conf
+import dom.data_model as gdm
+from dom.data_model import Game, clamp_resource_amt
+from bot_logging.logging_manager import logger
+
+TRANSACTION_TRANSFER = "transfer"
+TRANSACTION_GRANT = "grant"
+TRANSACTION_REMOVAL = "removal"
+TRANSACTION_ACTION_COST = "action cost"
+TRANSACTION_INCOME = "income"
+TRANSACTION_EXPIRY = "expiry"
+# Withdrawals of these types are refused when the player cannot cover them, where others are clamped to zero
+STRICT_TRANSACTION_TYPES = {TRANSACTION_TRANSFER, TRANSACTION_ACTION_COST}
+
+
+class LedgerEntry:
+    def __init__(self, player_id: int, resource_type: str, amt: int, applied_amt: Optional[int] = None,
+                 balance: Optional[int] = None):
+        self.player_id = player_id
+        self.resource_type = resource_type
+        # The change asked for, then the change actually made once clamped and the amount held afterwards
+        self.amt = amt
+        self.applied_amt = applied_amt
+        self.balance = balance
+
+
+class ResourceTransaction:
+    def __init__(self, transaction_type: str, entries: List[LedgerEntry], reason: str = "",
+                 actor_id: Optional[int] = None, timestamp: Optional[int] = None,
+                 transaction_id: Optional[str] = None):
+        self.transaction_type = transaction_type
+        self.entries = entries
+        self.reason = reason
+        self.actor_id = actor_id
+        self.timestamp = timestamp if timestamp is not None else round(time.time())
+        self.transaction_id = transaction_id if transaction_id is not None else uuid.uuid4().hex[:12]
+
+    @property
+    def player_ids(self) -> List[int]:
+        return list(dict.fromkeys(entry.player_id for entry in self.entries))
+
+    def to_dict(self) -> dict:
+        return {"transaction_id": self.transaction_id, "transaction_type": self.transaction_type,
+                "timestamp": self.timestamp, "reason": self.reason, "actor_id": self.actor_id,
+                "entries": [{"player_id": entry.player_id, "resource_type": entry.resource_type, "amt": entry.amt,
+                             "applied_amt": entry.applied_amt, "balance": entry.balance}
+                            for entry in self.entries]}
+
+
+def read_transaction(transaction_entry: dict) -> ResourceTransaction:
+    return ResourceTransaction(transaction_type=transaction_entry.get("transaction_type"),
+                               entries=[LedgerEntry(player_id=entry.get("player_id"),
+                                                    resource_type=entry.get("resource_type"),
+                                                    amt=entry.get("amt"),
+                                                    applied_amt=entry.get("applied_amt"),
+                                                    balance=entry.get("balance"))
+                                        for entry in transaction_entry.get("entries", [])],
+                               reason=transaction_entry.get("reason", ""),
+                               actor_id=transaction_entry.get("actor_id"),
+                               timestamp=transaction_entry.get("timestamp"),
+                               transaction_id=transaction_entry.get("transaction_id"))
+
+
+class ResourceLedger:
+    def __init__(self, ledger_path: str):
+        self.ledger_path = ledger_path
+        # Transactions per player, newest last; only read from the ledger file once something is queried
+        self.player_transactions: Optional[Dict[int, List[ResourceTransaction]]] = None
+
+    def index_transaction(self, transaction: ResourceTransaction):
+        for player_id in transaction.player_ids:
+            self.player_transactions.setdefault(player_id, []).append(transaction)
+
+    def load(self) -> Dict[int, List[ResourceTransaction]]:
+        if self.player_transactions is None:
+            self.player_transactions = {}
+            if os.path.isfile(self.ledger_path):
+                with open(self.ledger_path, 'r', encoding="utf8") as ledger_file:
+                    for line_number, line in enumerate(ledger_file, start=1):
+                        if not line.strip():
+                            continue
+                        try:
+                            self.index_transaction(read_transaction(json.loads(line)))
+                        except ValueError as e:
+                            # A line cut short by a crash mid-append is skipped rather than losing the whole ledger
+                            logger.error(f'Skipping unreadable line {line_number} of {self.ledger_path}\n{e}')
+        return self.player_transactions
+
+    def append(self, transactions: List[ResourceTransaction]):
+        with open(self.ledger_path, 'a', encoding="utf8") as ledger_file:
+            ledger_file.write(''.join(f'{json.dumps(transaction.to_dict(), ensure_ascii=False)}\n'
+                                      for transaction in transactions))
+            if Conf.WRITE_DURABILITY == 'always':
+                ledger_file.flush()
+                os.fsync(ledger_file.fileno())
+        if Conf.WRITE_DURABILITY == 'batch':
+            # Synced along with the game files on the next batch sync
+            gdm.pending_sync_paths.add(self.ledger_path)
+        if self.player_transactions is not None:
+            for transaction in transactions:
+                self.index_transaction(transaction)
+
+    def get_player_transactions(self, player_id: int, limit: int = 20) -> List[ResourceTransaction]:
+        # Newest first
+        return self.load().get(player_id, [])[::-1][:limit]
+
+
+ledgers: Dict[str, ResourceLedger] = {}
+
+
+def get_ledger(game: Game) -> ResourceLedger:
+    game_path = game.file_path if game.file_path else f'{Conf.BASE_PATH}/{Conf.GAME_FILE}'
+    ledger = ledgers.get(game_path)
+    if ledger is None:
+        ledger = ledgers[game_path] = ResourceLedger(gdm.ledger_file_path(game_path))
+    return ledger
+
+
+def forget_ledger(game_path: str):
+    # Used when the ledger file is replaced on disk, such as by a snapshot restore, so it is indexed again
+    ledgers.pop(game_path, None)
+
+
+def validate_transactions(game: Game, transactions: List[ResourceTransaction]) -> Optional[str]:
+    # Returns why the batch cannot be applied, or None when every entry of it can; withdrawals are checked against
+    # what the player will hold after the earlier entries of the batch
+    projected_amts: Dict[Tuple[int, str], int] = {}
+    for transaction in transactions:
+        for entry in transaction.entries:
+            player = game.get_player(entry.player_id)
+            if player is None:
+                return f'Player {entry.player_id} is not a registered player for this game!'
+            resource = player.get_resource(entry.resource_type)
+            if resource is None:
+                return f'Resource {entry.resource_type} not defined for player {player.player_discord_name}!'
+            if transaction.transaction_type == TRANSACTION_TRANSFER and not resource.is_commodity:
+                return f'Resource {entry.resource_type} is not defined as a commodity! Cannot transfer ' \
+                       f'non-commodity resources!'
+            available_amt = projected_amts.get((player.player_id, entry.resource_type), resource.resource_amt)
+            if transaction.transaction_type in STRICT_TRANSACTION_TYPES and -entry.amt > available_amt:
+                return f'Resource Amount {-entry.amt} exceeds available amount of {available_amt} for player ' \
+                       f'{player.player_discord_name}!'
+            projected_amts[(player.player_id, entry.resource_type)] = clamp_resource_amt(available_amt + entry.amt,
+                                                                                        resource.resource_max)
+    return None
+
+
+def apply_transactions(game: Game, transactions: List[ResourceTransaction]) -> Optional[str]:
+    # Either every transaction is applied or none are, and nothing awaits in between so no other command can see
+    # the batch half applied. The ledger is appended before the caller writes the game; with 'always' durability each
+    # is fsynced as it is written, so after a crash the ledger can hold a transaction the game file lost but never the
+    # reverse. With 'batch' both are only synced together later, and either may lose its latest writes
+    validation_error = validate_transactions(game, transactions)
+    if validation_error is not None:
+        return validation_error
+    for transaction in transactions:
+        for entry in transaction.entries:
+            player = game.get_player(entry.player_id)
+            resource = player.get_resource(entry.resource_type)
+            previous_amt = resource.resource_amt
+            player.modify_resource(resource_name=entry.resource_type, amt=entry.amt)
+            entry.applied_amt = resource.resource_amt - previous_amt
+            entry.balance = resource.resource_amt
+    game.mark_dirty(gdm.SECTION_PLAYERS)
+    get_ledger(game).append(transactions)
+    return None
+
+
+def record_transactions(game: Game, transactions: List[ResourceTransaction]):
+    # For changes already applied elsewhere, such as the daily resource tick, whose entries carry their own applied
+    # amounts and balances
+    if transactions:
+        get_ledger(game).append(transactions)
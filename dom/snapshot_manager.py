@@ -0,0 +1,169 @@
+#! snapshot_manager.py
+# Keeps a bounded ring of compressed game snapshots for point-in-time restores
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from typing import Optional, List, Dict, Tuple
+from bot_logging.logging_manager import logger
+from dom.conf_vars import ConfVars as Conf
+
+SNAPSHOT_DIR_NAME = "snapshots"
+SNAPSHOT_INDEX_FILE = "snapshot_index.json"
+
+# Snapshot indexes cached per snapshot directory so a write does not have to re-read the index
+snapshot_indexes: Dict[str, List[dict]] = {}
+# Last known (mtime, size, hash) per section file so unchanged sections are not re-read and re-hashed
+section_stamps: Dict[str, Tuple[int, int, str]] = {}
+
+
+class Snapshot:
+    def __init__(self, snapshot_id: str, timestamp: int, reason: str, generation: int, section_hashes: Dict[str, str]):
+        self.snapshot_id = snapshot_id
+        self.timestamp = timestamp
+        self.reason = reason
+        self.generation = generation
+        self.section_hashes = section_hashes
+
+
+def get_snapshot_dir(game_path: str) -> str:
+    # Each game gets its own folder, so games sharing a directory never list, evict or restore each other's snapshots
+    game_dir, game_file = os.path.split(game_path)
+    return os.path.join(game_dir or '.', SNAPSHOT_DIR_NAME, os.path.splitext(game_file)[0])
+
+
+def get_blob_path(snapshot_dir: str, section_hash: str) -> str:
+    return os.path.join(snapshot_dir, f'{section_hash}.json.gz')
+
+
+def load_snapshot_index(snapshot_dir: str) -> List[dict]:
+    if snapshot_dir in snapshot_indexes:
+        return snapshot_indexes[snapshot_dir]
+    index_path = os.path.join(snapshot_dir, SNAPSHOT_INDEX_FILE)
+    index_entries = []
+    if os.path.isfile(index_path):
+        try:
+            with open(index_path, 'r', encoding="utf8") as index_file:
+                index_entries = json.load(index_file)
+        except (OSError, ValueError) as e:
+            logger.error(f'Could not read snapshot index {index_path}; starting a new one\n{e}')
+    snapshot_indexes[snapshot_dir] = index_entries
+    return index_entries
+
+
+def save_snapshot_index(snapshot_dir: str, index_entries: List[dict]):
+    index_path = os.path.join(snapshot_dir, SNAPSHOT_INDEX_FILE)
+    index_path_temp = f'{index_path}.tmp'
+    with open(index_path_temp, 'w', encoding="utf8") as index_file:
+        json.dump(index_entries, index_file, indent=2)
+    os.replace(index_path_temp, index_path)
+
+
+def store_blob(snapshot_dir: str, content: str) -> str:
+    section_hash = hashlib.sha1(content.encode("utf8")).hexdigest()
+    blob_path = get_blob_path(snapshot_dir, section_hash)
+    # Blobs are content-addressed, so a section that has not changed since the last snapshot is never stored twice
+    if not os.path.isfile(blob_path):
+        # Written to a temp file and swapped in, since a blob cut short by a crash would otherwise never be rewritten
+        # and every snapshot referencing it could not be restored
+        blob_path_temp = f'{blob_path}.tmp'
+        with open(blob_path_temp, 'wb') as raw_blob_file:
+            with gzip.GzipFile(fileobj=raw_blob_file, mode='wb', compresslevel=6) as blob_file:
+                blob_file.write(content.encode("utf8"))
+            if Conf.WRITE_DURABILITY != 'none':
+                raw_blob_file.flush()
+                os.fsync(raw_blob_file.fileno())
+        os.replace(blob_path_temp, blob_path)
+    return section_hash
+
+
+def snapshot_section_file(snapshot_dir: str, section_path: str) -> Optional[str]:
+    if not os.path.isfile(section_path):
+        return None
+    file_stat = os.stat(section_path)
+    stamp = section_stamps.get(section_path)
+    if stamp is not None and stamp[0] == file_stat.st_mtime_ns and stamp[1] == file_stat.st_size:
+        return stamp[2]
+    with open(section_path, 'r', encoding="utf8") as section_file:
+        section_hash = store_blob(snapshot_dir, section_file.read())
+    section_stamps[section_path] = (file_stat.st_mtime_ns, file_stat.st_size, section_hash)
+    return section_hash
+
+
+def record_snapshot(game_path: str, section_paths: Dict[str, str], written_sections: Dict[str, str],
+                    generation: int, reason: str = "write", force: bool = False) -> Optional[Snapshot]:
+    if Conf.SNAPSHOT_COUNT <= 0:
+        return None
+
+    snapshot_dir = get_snapshot_dir(game_path)
+    index_entries = load_snapshot_index(snapshot_dir)
+    now = int(time.time())
+
+    if not force and index_entries and now - index_entries[-1]["timestamp"] < Conf.SNAPSHOT_INTERVAL:
+        return None
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    section_hashes: Dict[str, str] = {}
+    for section_name, section_path in section_paths.items():
+        if section_name in written_sections:
+            section_hash = store_blob(snapshot_dir, written_sections[section_name])
+            file_stat = os.stat(section_path)
+            section_stamps[section_path] = (file_stat.st_mtime_ns, file_stat.st_size, section_hash)
+        else:
+            # Section was not rewritten by this write; only re-read it if the file changed since it was last seen
+            section_hash = snapshot_section_file(snapshot_dir, section_path)
+        if section_hash is not None:
+            section_hashes[section_name] = section_hash
+
+    snapshot_id = f'{round(time.time() * 1000)}'
+    index_entries.append({"snapshot_id": snapshot_id,
+                          "timestamp": now,
+                          "reason": reason,
+                          "generation": generation,
+                          "section_hashes": section_hashes})
+
+    # Drop the oldest snapshots beyond the ring size, along with any blob no remaining snapshot references
+    evicted_entries = index_entries[:-Conf.SNAPSHOT_COUNT]
+    del index_entries[:-Conf.SNAPSHOT_COUNT]
+    if evicted_entries:
+        live_hashes = {section_hash for entry in index_entries for section_hash in entry["section_hashes"].values()}
+        evicted_hashes = {section_hash for entry in evicted_entries for section_hash in entry["section_hashes"].values()}
+        for section_hash in evicted_hashes - live_hashes:
+            blob_path = get_blob_path(snapshot_dir, section_hash)
+            if os.path.isfile(blob_path):
+                os.remove(blob_path)
+
+    save_snapshot_index(snapshot_dir, index_entries)
+    logger.info(f'Recorded snapshot {snapshot_id} ({reason}) for generation {generation}')
+    return entry_to_snapshot(index_entries[-1])
+
+
+def entry_to_snapshot(index_entry: dict) -> Snapshot:
+    return Snapshot(snapshot_id=index_entry.get("snapshot_id"),
+                    timestamp=index_entry.get("timestamp"),
+                    reason=index_entry.get("reason"),
+                    generation=index_entry.get("generation"),
+                    section_hashes=index_entry.get("section_hashes"))
+
+
+def list_snapshots(game_path: str) -> List[Snapshot]:
+    index_entries = load_snapshot_index(get_snapshot_dir(game_path))
+    return [entry_to_snapshot(index_entry) for index_entry in reversed(index_entries)]
+
+
+def get_snapshot(game_path: str, snapshot_id: str) -> Optional[Snapshot]:
+    for snapshot in list_snapshots(game_path):
+        if snapshot.snapshot_id == snapshot_id:
+            return snapshot
+    return None
+
+
+def load_snapshot_sections(game_path: str, snapshot: Snapshot) -> Dict[str, str]:
+    snapshot_dir = get_snapshot_dir(game_path)
+    section_contents: Dict[str, str] = {}
+    for section_name, section_hash in snapshot.section_hashes.items():
+        with gzip.open(get_blob_path(snapshot_dir, section_hash), 'rt', encoding="utf8") as blob_file:
+            section_contents[section_name] = blob_file.read()
+    return section_contents
@@ -0,0 +1,58 @@
+#! autocomplete_cache.py
+# Remembers each user's last autocomplete results so the following keystrokes can narrow them instead of starting over
+
+import time
+from collections import OrderedDict
+from typing import Sequence, Callable, TypeVar, List, Optional, Tuple, Hashable
+from bot_logging.metrics_manager import record_cache_lookup
+from utils.fuzzy_matcher import MatchIndex, MAX_CHOICES, get_match_index, normalize_query
+
+T = TypeVar('T')
+
+# Seconds a user's results are reused for; sources without a version of their own are at most this stale
+AUTOCOMPLETE_CACHE_TTL = 10
+AUTOCOMPLETE_CACHE_SIZE = 1024
+
+
+class AutocompleteSession:
+    def __init__(self, source_version: Hashable, entries: Sequence, match_index: MatchIndex):
+        self.source_version = source_version
+        self.entries = entries
+        self.match_index = match_index
+        self.expires_at = time.monotonic() + AUTOCOMPLETE_CACHE_TTL
+        self.query = ""
+        # Every position whose name contains the last query, or None when that is not known
+        self.substring_matches: Optional[List[int]] = None
+
+    def is_valid(self, source_version: Hashable) -> bool:
+        return self.source_version == source_version and time.monotonic() < self.expires_at
+
+    def match(self, query: str, limit: int) -> List:
+        # Typing more characters can only drop names from the substring matches, so the last ones are narrowed
+        query = normalize_query(query)
+        candidates = self.substring_matches if query.startswith(self.query) else None
+        positions, self.substring_matches = self.match_index.match(query, limit, candidates)
+        self.query = query
+        return [self.entries[position] for position in positions]
+
+
+autocomplete_sessions: 'OrderedDict[Tuple[int, Optional[str], str], AutocompleteSession]' = OrderedDict()
+
+
+def rank_user_matches(interaction, option_name: str, cache_key: str, source_version: Hashable, query: str,
+                      get_entries: Callable[[], Sequence[T]], get_name: Callable[[T], str],
+                      limit: int = MAX_CHOICES, sort_alphabetically: bool = True) -> List[T]:
+    # Like rank_matches, but the entries are only gathered again once the source_version given for them changes
+    session_key = (interaction.user.id, interaction.command.name if interaction.command is not None else None,
+                   option_name)
+    session = autocomplete_sessions.get(session_key)
+    is_hit = session is not None and session.is_valid(source_version)
+    record_cache_lookup("autocomplete", is_hit)
+    if not is_hit:
+        entries = get_entries()
+        match_index = get_match_index(cache_key, [get_name(entry) for entry in entries], sort_alphabetically)
+        session = autocomplete_sessions[session_key] = AutocompleteSession(source_version, entries, match_index)
+        if len(autocomplete_sessions) > AUTOCOMPLETE_CACHE_SIZE:
+            autocomplete_sessions.popitem(last=False)
+    autocomplete_sessions.move_to_end(session_key)
+    return session.match(query or "", limit)
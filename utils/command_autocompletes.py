@@ -4,15 +4,19 @@
 import discord
 from discord import app_commands, Member, Guild, User
 from typing import List, Optional, Literal, Dict
-import dom.data_model as gdm
+from dom.game_state_manager import game_states
 from dom.data_model import Game, Player, Round, Vote, Party, Dilemma
-from dom.conf_vars import ConfVars as Conf
 from utils.string_decorator import emojify
+from utils.fuzzy_matcher import rank_matches
+from utils.autocomplete_cache import rank_user_matches
+import dom.snapshot_manager as snapshots
+import dom.phase_schedule as phase_schedule
+from datetime import datetime
 
 
 async def player_list_autocomplete(interaction: discord.Interaction,
                                    current: str) -> List[app_commands.Choice[str]]:
-    game = await gdm.get_game(file_path=Conf.GAME_PATH)
+    game = await game_states.get_interaction_game(interaction)
     players = await get_valid_players(current, game.players)
     return [
         app_commands.Choice(name=player.player_discord_name, value=str(player.player_id))
@@ -21,18 +25,13 @@ async def player_list_autocomplete(interaction: discord.Interaction,
 
 
 async def get_valid_players(substr: str, players: List[Player]) -> List[Player]:
-    player_list = []
-    for player in sorted(players, key=lambda e: e.player_discord_name.lower()):
-        if substr and substr.lower() not in player.player_discord_name.lower():
-            continue
-        if not player.is_dead:
-            player_list.append(player)
-    return player_list[:25]
+    living_players = [player for player in players if not player.is_dead]
+    return rank_matches(f'players:{id(players)}', substr, living_players, lambda e: e.player_discord_name)
 
 
 async def party_list_autocomplete(interaction: discord.Interaction,
                                   current: str) -> List[app_commands.Choice[str]]:
-    game = await gdm.get_game(file_path=Conf.GAME_PATH)
+    game = await game_states.get_interaction_game(interaction)
     parties = await get_valid_parties(current, game.parties)
     return [
         app_commands.Choice(name=f'{party.party_name} ({len(party.player_ids)}/{party.max_size})',
@@ -42,19 +41,14 @@ async def party_list_autocomplete(interaction: discord.Interaction,
 
 
 async def get_valid_parties(substr: str, parties: List[Party]) -> List[Party]:
-    party_list = []
-    for party in sorted(parties, key=lambda e: e.party_name.lower()):
-        if substr and substr.lower() not in party.party_name.lower():
-            continue
-        party_list.append(party)
-    return party_list[:25]
+    return rank_matches(f'parties:{id(parties)}', substr, parties, lambda e: e.party_name)
 
 
 async def dilemma_name_autocomplete(interaction: discord.Interaction,
                                     current: str) -> List[app_commands.Choice[str]]:
-    game = await gdm.get_game(file_path=Conf.GAME_PATH)
-    guild_member = await interaction.guild.fetch_member(interaction.user.id)
-    dilemma_names = await get_valid_dilemma_names(current, game, guild_member)
+    game = await game_states.get_interaction_game(interaction)
+    # Discord resolves the member with the interaction, so no member fetch is needed within the response deadline
+    dilemma_names = await get_valid_dilemma_names(current, game, interaction.user)
     return [
         app_commands.Choice(name=dilemma_name, value=dilemma_name)
         for dilemma_name in dilemma_names
@@ -63,25 +57,21 @@ async def dilemma_name_autocomplete(interaction: discord.Interaction,
 
 async def get_valid_dilemma_names(substr: str, game: Game, member: Member) -> List[str]:
     name_list = []
-    dilemma_list = []
     game_round = game.get_latest_round()
     if game_round is not None:
         if member.guild_permissions.manage_guild:
-            dilemma_list.extend(game_round.round_dilemmas)
+            cache_key = f'dilemmas:{id(game_round)}'
+            dilemma_names = [a_dilemma.dilemma_name for a_dilemma in game_round.round_dilemmas]
         else:
-            for round_dilemma in game_round.round_dilemmas:
-                if member.id in round_dilemma.dilemma_player_ids:
-                    dilemma_list.append(round_dilemma)
-        for a_dilemma in dilemma_list:
-            if substr and substr.lower() not in a_dilemma.dilemma_name.lower():
-                continue
-            name_list.append(a_dilemma.dilemma_name)
-    return name_list[:25]
+            cache_key = f'dilemmas:{id(game_round)}:{member.id}'
+            dilemma_names = game_round.get_player_dilemma_names(member.id)
+        name_list = rank_matches(cache_key, substr, dilemma_names, lambda e: e, sort_alphabetically=False)
+    return name_list
 
 
 async def dilemma_choice_autocomplete(interaction: discord.Interaction,
                                       current: str) -> List[app_commands.Choice[str]]:
-    game = await gdm.get_game(file_path=Conf.GAME_PATH)
+    game = await game_states.get_interaction_game(interaction)
     dilemma_name = interaction.namespace.dilemma_name
     dilemma_choices = await get_valid_dilemma_choices(current, game, dilemma_name)
     return [
@@ -95,111 +85,99 @@ async def get_valid_dilemma_choices(substr: str, game: Game, dilemma_name: str)
     game_round = game.get_latest_round()
     if game_round is not None:
         dilemma = game_round.get_dilemma(dilemma_name)
-        for dilemma_choice in sorted(dilemma.dilemma_choices, key=lambda e: e.lower()):
-            if substr and substr.lower() not in dilemma_choice.lower():
-                continue
-            choice_list.append(dilemma_choice)
-    return choice_list[:25]
+        # Choices are a set, so they are put in a fixed order for the index to be reusable between keystrokes
+        choice_list = rank_matches(f'dilemma_choices:{id(dilemma)}', substr, sorted(dilemma.dilemma_choices),
+                                   lambda e: e)
+    return choice_list
 
 
 async def player_item_autocomplete(interaction: discord.Interaction,
                                    current: str) -> List[app_commands.Choice[str]]:
-    game = await gdm.get_game(file_path=Conf.GAME_PATH)
+    game = await game_states.get_interaction_game(interaction)
     player_id = interaction.namespace.player if interaction.namespace.player is not None else interaction.user.id
     game_player = game.get_player(player_id)
-    item_choices = await get_player_item_choices(current, game_player)
+    item_choices = await get_player_item_choices(interaction, current, game_player)
     return [
         app_commands.Choice(name=choice, value=choice)
         for choice in item_choices
     ]
 
 
-async def get_player_item_choices(substr: str, player: Player) -> List[str]:
-    choice_list = []
-
-    for item in sorted(player.player_items, key=lambda e: e.item_name.lower()):
-        if substr and substr.lower() not in item.item_name.lower():
-            continue
-        choice_list.append(item.item_name)
-    return choice_list[:25]
+async def get_player_item_choices(interaction: discord.Interaction, substr: str, player: Player) -> List[str]:
+    return [item.item_name for item in rank_user_matches(interaction, "item", f'player_items:{id(player)}',
+                                                         (id(player), player.inventory_version), substr,
+                                                         lambda: list(player.player_items), lambda e: e.item_name)]
 
 
 async def game_item_autocomplete(interaction: discord.Interaction,
                                  current: str) -> List[app_commands.Choice[str]]:
-    game = await gdm.get_game(file_path=Conf.GAME_PATH)
-    item_choices = await get_game_item_choices(current, game)
+    game = await game_states.get_interaction_game(interaction)
+    item_choices = await get_game_item_choices(interaction, current, game)
     return [
         app_commands.Choice(name=choice, value=choice)
         for choice in item_choices
     ]
 
 
-async def get_game_item_choices(substr: str, game: Game) -> List[str]:
-    choice_list = []
-
-    for item in sorted(game.items, key=lambda e: e.item_name.lower()):
-        if substr and substr.lower() not in item.item_name.lower():
-            continue
-        choice_list.append(item.item_name)
-    return choice_list[:25]
+async def get_game_item_choices(interaction: discord.Interaction, substr: str, game: Game) -> List[str]:
+    return [item.item_name for item in rank_user_matches(interaction, "item", f'game_items:{id(game)}',
+                                                         (id(game), game.catalog_version), substr,
+                                                         lambda: list(game.items), lambda e: e.item_name)]
 
 
 async def player_action_autocomplete(interaction: discord.Interaction,
                                      current: str) -> List[app_commands.Choice[str]]:
-    game = await gdm.get_game(file_path=Conf.GAME_PATH)
+    game = await game_states.get_interaction_game(interaction)
     player_id = interaction.namespace.player if interaction.namespace.player is not None else interaction.user.id
     game_player = game.get_player(player_id)
-    action_choices = await get_player_action_choices(current, game_player)
+    action_choices = await get_player_action_choices(interaction, current, game_player)
     return [
         app_commands.Choice(name=choice, value=choice)
         for choice in action_choices
     ]
 
 
-async def get_player_action_choices(substr: str, player: Player) -> List[str]:
-    choice_list = []
+async def get_player_action_choices(interaction: discord.Interaction, substr: str, player: Player) -> List[str]:
+    return [action_name for match_name, action_name in
+            rank_user_matches(interaction, "action", f'player_actions:{id(player)}',
+                              (id(player), player.inventory_version), substr,
+                              lambda: get_player_action_entries(player), lambda e: e[0])]
+
 
-    for action in sorted(player.player_actions, key=lambda e: e.action_name.lower()):
-        if substr and substr.lower() not in action.action_name.lower():
-            continue
-        choice_list.append(action.action_name)
+def get_player_action_entries(player: Player) -> List[tuple[str, str]]:
+    # Pairs of the name matched against and the action name returned
+    choice_entries = [(action.action_name, action.action_name) for action in player.player_actions]
 
-    # Also include item actions, where they are defined
-    for item in sorted(player.player_items, key=lambda e: e.item_name.lower()):
+    # Also include item actions, where they are defined; these are matched by the name of the item granting them
+    for item in player.player_items:
         if item.item_action is not None:
             item_action = item.item_action
             if item_action.action_name is not None:
-                if substr and substr.lower() not in item.item_name.lower():
-                    continue
-                choice_list.append(item_action.action_name)
-    return choice_list[:25]
+                choice_entries.append((item.item_name, item_action.action_name))
+    return choice_entries
 
 
 async def game_action_autocomplete(interaction: discord.Interaction,
                                    current: str) -> List[app_commands.Choice[str]]:
-    game = await gdm.get_game(file_path=Conf.GAME_PATH)
+    game = await game_states.get_interaction_game(interaction)
 
-    action_choices = await get_game_action_choices(current, game)
+    action_choices = await get_game_action_choices(interaction, current, game)
     return [
         app_commands.Choice(name=choice, value=choice)
         for choice in action_choices
     ]
 
 
-async def get_game_action_choices(substr: str, game: Game) -> List[str]:
-    choice_list = []
-
-    for action in sorted(game.actions, key=lambda e: e.action_name.lower()):
-        if substr and substr.lower() not in action.action_name.lower():
-            continue
-        choice_list.append(action.action_name)
-
-    return choice_list[:25]
+async def get_game_action_choices(interaction: discord.Interaction, substr: str, game: Game) -> List[str]:
+    return [action.action_name for action in
+            rank_user_matches(interaction, "action", f'game_actions:{id(game)}',
+                              (id(game), game.catalog_version), substr, lambda: list(game.actions),
+                              lambda e: e.action_name)]
 
 
 async def attribute_type_autocomplete(interaction: discord.Interaction,
                                       current: str) -> List[app_commands.Choice[str]]:
-    game = await gdm.get_game(file_path=Conf.GAME_PATH)
+    game = await game_states.get_interaction_game(interaction)
 
     attribute_type_choices: list[str] = await get_attribute_type_names(current, game)
     return [
@@ -209,20 +187,14 @@ async def attribute_type_autocomplete(interaction: discord.Interaction,
 
 
 async def get_attribute_type_names(substr: str, game: Game) -> list[str]:
-    choice_list: list[str] = []
-
-    for attribute_definition in sorted(game.attribute_definitions, key=lambda e: e.attribute_name.lower()):
-        if substr and substr.lower() not in attribute_definition.attribute_name.lower():
-            continue
-        display_value = attribute_definition.attribute_name
-        choice_list.append(display_value)
-
-    return choice_list[:25]
+    return [attribute_definition.attribute_name for attribute_definition in
+            rank_matches(f'attribute_types:{id(game.attribute_definitions)}', substr, game.attribute_definitions,
+                         lambda e: e.attribute_name)]
 
 
 async def resource_type_autocomplete(interaction: discord.Interaction,
                                      current: str) -> List[app_commands.Choice[str]]:
-    game = await gdm.get_game(file_path=Conf.GAME_PATH)
+    game = await game_states.get_interaction_game(interaction)
 
     resource_type_choices: list[str] = await get_resource_type_names(current, game)
     return [
@@ -232,20 +204,14 @@ async def resource_type_autocomplete(interaction: discord.Interaction,
 
 
 async def get_resource_type_names(substr: str, game: Game) -> list[str]:
-    choice_list: list[str] = []
-
-    for resource_definition in sorted(game.resource_definitions, key=lambda e: e.resource_name.lower()):
-        if substr and substr.lower() not in resource_definition.resource_name.lower():
-            continue
-        display_value = resource_definition.resource_name
-        choice_list.append(display_value)
-
-    return choice_list[:25]
+    return [resource_definition.resource_name for resource_definition in
+            rank_matches(f'resource_types:{id(game.resource_definitions)}', substr, game.resource_definitions,
+                         lambda e: e.resource_name)]
 
 
 async def persistent_view_autocomplete(interaction: discord.Interaction,
                                        current: str) -> List[app_commands.Choice[str]]:
-    game = await gdm.get_game(file_path=Conf.GAME_PATH)
+    game = await game_states.get_interaction_game(interaction)
 
     view_choices = await get_persistent_view_names(current, game)
     return [
@@ -255,11 +221,37 @@ async def persistent_view_autocomplete(interaction: discord.Interaction,
 
 
 async def get_persistent_view_names(substr: str, game: Game) -> List[str]:
+    return [pi_view.view_name for pi_view in rank_matches(f'pi_views:{id(game.pi_views)}', substr, game.pi_views,
+                                                          lambda e: e.view_name, sort_alphabetically=False)]
+
+
+async def snapshot_autocomplete(interaction: discord.Interaction,
+                                current: str) -> List[app_commands.Choice[str]]:
+    game_path = game_states.get_interaction_game_path(interaction)
+    snapshot_choices = await get_snapshot_choices(current, snapshots.list_snapshots(game_path))
+    return [
+        app_commands.Choice(name=choice_name, value=snapshot_id)
+        for choice_name, snapshot_id in snapshot_choices
+    ]
+
+
+async def get_snapshot_choices(substr: str, snapshot_list: List[snapshots.Snapshot]) -> List[tuple[str, str]]:
     choice_list = []
 
-    for pi_view in game.pi_views:
-        if substr and substr.lower() not in pi_view.view_name.lower():
-            continue
-        choice_list.append(pi_view.view_name)
+    for snapshot in snapshot_list:
+        snapshot_time = datetime.fromtimestamp(snapshot.timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        choice_name = f'{snapshot_time} - {snapshot.reason} (gen {snapshot.generation})'
+        choice_list.append((choice_name, snapshot.snapshot_id))
+    # Snapshots stay newest first rather than alphabetical
+    return rank_matches('snapshots', substr, choice_list, lambda e: e[0], sort_alphabetically=False)
+
 
-    return choice_list[:25]
+async def scheduled_phase_autocomplete(interaction: discord.Interaction,
+                                       current: str) -> List[app_commands.Choice[str]]:
+    schedule = phase_schedule.load_schedule(game_states.get_interaction_game_path(interaction))
+    schedule_ids = rank_matches('scheduled_phases', current, [entry.schedule_id for entry in schedule], lambda e: e,
+                                sort_alphabetically=False)
+    return [
+        app_commands.Choice(name=schedule_id, value=schedule_id)
+        for schedule_id in schedule_ids
+    ]
@@ -0,0 +1,69 @@
+#! command_sync.py
+# Utility class for syncing the app command tree only when its commands have changed
+
+import hashlib
+import json
+import os
+import discord
+from discord import app_commands
+from dom.conf_vars import ConfVars as Conf
+import dom.data_model as gdm
+from bot_logging.logging_manager import log_info, log_warning
+
+COMMAND_HASH_FILE = "command_tree_hashes.json"
+
+
+def get_command_hash_path() -> str:
+    return f'{Conf.BASE_PATH}/{COMMAND_HASH_FILE}'
+
+
+def load_command_hashes() -> dict[str, str]:
+    hash_path = get_command_hash_path()
+    if not os.path.isfile(hash_path):
+        return {}
+    try:
+        with open(hash_path, 'r', encoding="utf8") as hash_file:
+            return json.load(hash_file)
+    except (OSError, ValueError) as e:
+        log_warning(f'Could not read command tree hashes from {hash_path}; commands will be re-synced\n{e}')
+        return {}
+
+
+def save_command_hash(guild_id: int, tree_hash: str):
+    # The file is read again here, after the sync, with no await before the write; guilds synced concurrently each
+    # add their own entry instead of the last one to finish overwriting the others
+    command_hashes = load_command_hashes()
+    command_hashes[str(guild_id)] = tree_hash
+    gdm.write_text_file(get_command_hash_path(), json.dumps(command_hashes, indent=2))
+
+
+def command_payload(command, tree: app_commands.CommandTree) -> dict:
+    # Newer discord.py versions need the tree to serialize a command, older ones take no arguments
+    try:
+        return command.to_dict(tree)
+    except TypeError:
+        return command.to_dict()
+
+
+def hash_command_tree(tree: app_commands.CommandTree, guild: discord.Object) -> str:
+    payloads = [command_payload(command, tree) for command in tree.get_commands(guild=guild)]
+    payloads.sort(key=lambda e: (e.get("type", 1), e.get("name")))
+    serialized_tree = json.dumps(payloads, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(serialized_tree.encode("utf8")).hexdigest()
+
+
+async def sync_guild_commands(tree: app_commands.CommandTree, guild_id: int, force: bool = False) -> bool:
+    guild = discord.Object(id=guild_id)
+    tree.copy_global_to(guild=guild)
+
+    tree_hash = hash_command_tree(tree, guild)
+    if not force and load_command_hashes().get(str(guild_id)) == tree_hash:
+        log_info(f'Command tree for guild {guild_id} is unchanged; skipping sync')
+        return False
+
+    synced_app_commands = await tree.sync(guild=guild)
+    for command in synced_app_commands:
+        log_info(f'Synced command: {command.name} for guild {guild_id}')
+
+    save_command_hash(guild_id, tree_hash)
+    return True
@@ -0,0 +1,183 @@
+#! fuzzy_matcher.py
+# Ranked, typo tolerant matching of autocomplete input against lists of names, backed by precomputed n-gram indexes
+
+import heapq
+from collections import OrderedDict
+from typing import Sequence, Callable, TypeVar, List, Dict, Set, Tuple, Optional
+
+T = TypeVar('T')
+
+# Discord shows at most 25 autocomplete choices
+MAX_CHOICES = 25
+NGRAM_SIZE = 3
+# Typo matching only runs when the input starts no name or word and matches fewer names than this as a substring, and
+# then only checks the names sharing the most bigrams with the input, which bounds the edit distance work
+FUZZY_FALLBACK_BELOW = 5
+MAX_FUZZY_CANDIDATES = 50
+MATCH_INDEX_CACHE_SIZE = 64
+# Indexes over fewer names than this are cheaper to rebuild than to keep, such as a single player's inventory
+MIN_CACHED_NAMES = 50
+
+TIER_EXACT = 0
+TIER_PREFIX = 1
+TIER_WORD_PREFIX = 2
+TIER_SUBSTRING = 3
+TIER_FUZZY = 4
+
+
+def get_ngrams(text: str, size: int) -> Set[str]:
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def get_word_starts(text: str) -> List[int]:
+    return [i for i, char in enumerate(text) if char.isalnum() and (i == 0 or not text[i - 1].isalnum())]
+
+
+def normalize_query(query: str) -> str:
+    return query.strip().lower()
+
+
+def get_max_typos(query: str) -> int:
+    return 1 if len(query) <= 5 else 2
+
+
+def prefix_edit_distance(query: str, text: str, max_distance: int) -> int:
+    # Fewest typos turning the query into some prefix of the text, using optimal string alignment so swapping two
+    # letters counts as one typo; gives up once every alignment is past max_distance
+    text = text[:len(query) + max_distance]
+    before_previous: List[int] = []
+    previous = list(range(len(text) + 1))
+    for i in range(1, len(query) + 1):
+        current = [i] + [0] * len(text)
+        for j in range(1, len(text) + 1):
+            cost = 0 if query[i - 1] == text[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and query[i - 1] == text[j - 2] and query[i - 2] == text[j - 1]:
+                current[j] = min(current[j], before_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        before_previous, previous = previous, current
+    return min(previous[max(len(query) - max_distance, 0):])
+
+
+class MatchIndex:
+    def __init__(self, names: Sequence[str], sort_alphabetically: bool = True):
+        self.names = tuple(names)
+        self.lowered = [name.lower() for name in self.names]
+        positions = range(len(self.names))
+        # Ties within a tier keep this order, which is also what an empty input returns
+        self.ordered = sorted(positions, key=lambda e: self.lowered[e]) if sort_alphabetically else list(positions)
+        self.rank = [0] * len(self.names)
+        for rank, position in enumerate(self.ordered):
+            self.rank[position] = rank
+        self.word_starts = [get_word_starts(lowered) for lowered in self.lowered]
+
+        # Every n-gram up to NGRAM_SIZE long maps to the names containing it, so any input can find its substring
+        # matches without scanning the whole list; inputs shorter than NGRAM_SIZE also get a word prefix index
+        self.ngrams: Dict[str, List[int]] = {}
+        self.word_prefixes: Dict[str, List[int]] = {}
+        for position in self.ordered:
+            lowered = self.lowered[position]
+            for size in range(1, NGRAM_SIZE + 1):
+                for ngram in get_ngrams(lowered, size):
+                    self.ngrams.setdefault(ngram, []).append(position)
+            for prefix in {lowered[start:start + size] for start in self.word_starts[position]
+                           for size in range(1, NGRAM_SIZE) if start + size <= len(lowered)}:
+                self.word_prefixes.setdefault(prefix, []).append(position)
+
+    def get_tier(self, position: int, query: str) -> int:
+        lowered = self.lowered[position]
+        if lowered == query:
+            return TIER_EXACT
+        if lowered.startswith(query):
+            return TIER_PREFIX
+        if any(lowered.startswith(query, start) for start in self.word_starts[position]):
+            return TIER_WORD_PREFIX
+        return TIER_SUBSTRING
+
+    def get_substring_candidates(self, query: str, limit: int) -> List[int]:
+        if len(query) < NGRAM_SIZE:
+            word_prefix_hits = self.word_prefixes.get(query, [])
+            # Enough word prefix hits outrank every plain substring hit, so the wider posting list can be skipped
+            return word_prefix_hits if len(word_prefix_hits) >= limit else self.ngrams.get(query, [])
+        postings = [self.ngrams.get(ngram) for ngram in get_ngrams(query, NGRAM_SIZE)]
+        if not all(postings):
+            return []
+        return min(postings, key=len)
+
+    def get_typo_distance(self, position: int, query: str, max_distance: int) -> int:
+        # The input is compared against the text starting at each word of the name
+        lowered = self.lowered[position]
+        return min(prefix_edit_distance(query, lowered[start:], max_distance)
+                   for start in self.word_starts[position]) if self.word_starts[position] else max_distance + 1
+
+    def get_fuzzy_matches(self, query: str, matched: Set[int]) -> List[Tuple[int, int, int, int]]:
+        query_bigrams = get_ngrams(query, 2)
+        shared_counts: Dict[int, int] = {}
+        for bigram in query_bigrams:
+            for position in self.ngrams.get(bigram, ()):
+                shared_counts[position] = shared_counts.get(position, 0) + 1
+        max_distance = get_max_typos(query)
+        # A typo breaks at most three of the input's bigrams (a swap of two letters), so names sharing fewer cannot be
+        # within reach
+        min_shared = len(query_bigrams) - 3 * max_distance
+        candidates = [position for position, shared_count in shared_counts.items()
+                      if shared_count >= min_shared and position not in matched]
+        fuzzy_matches = []
+        for position in heapq.nlargest(MAX_FUZZY_CANDIDATES, candidates, key=shared_counts.get):
+            distance = self.get_typo_distance(position, query, max_distance)
+            if distance <= max_distance:
+                fuzzy_matches.append((TIER_FUZZY, distance, self.rank[position], position))
+        return fuzzy_matches
+
+    def get_substring_matches(self, query: str, limit: int, candidates: Optional[List[int]] = None) -> List[int]:
+        # Candidates from an earlier, shorter input already hold every name containing this one
+        if candidates is None:
+            candidates = self.get_substring_candidates(query, limit)
+        return [position for position in candidates if query in self.lowered[position]]
+
+    def match(self, query: str, limit: int = MAX_CHOICES,
+              candidates: Optional[List[int]] = None) -> Tuple[List[int], Optional[List[int]]]:
+        # Returns the best positions first, along with every substring match so a longer input can be narrowed from
+        # them; an empty input matches everything, which is returned as None
+        query = normalize_query(query)
+        if not query:
+            return self.ordered[:limit], None
+        substring_matches = self.get_substring_matches(query, limit, candidates)
+        # A short input with enough word prefix hits only checked those, so its matches cannot be narrowed from
+        is_complete = candidates is not None or len(query) >= NGRAM_SIZE \
+            or len(self.word_prefixes.get(query, ())) < limit
+        matches = [(self.get_tier(position, query), 0, self.rank[position], position)
+                   for position in substring_matches]
+        if len(query) >= NGRAM_SIZE and len(matches) < min(limit, FUZZY_FALLBACK_BELOW) \
+                and all(match[0] == TIER_SUBSTRING for match in matches):
+            matches.extend(self.get_fuzzy_matches(query, set(substring_matches)))
+        return [match[3] for match in heapq.nsmallest(limit, matches)], \
+            substring_matches if is_complete else None
+
+    def search(self, query: str, limit: int = MAX_CHOICES) -> List[int]:
+        # Returns positions into the names the index was built from, best match first
+        return self.match(query, limit)[0]
+
+
+match_index_cache: 'OrderedDict[str, MatchIndex]' = OrderedDict()
+
+
+def get_match_index(cache_key: str, names: Sequence[str], sort_alphabetically: bool = True) -> MatchIndex:
+    # An index is reused for as long as the names it was built from are unchanged
+    names = tuple(names)
+    if len(names) < MIN_CACHED_NAMES:
+        return MatchIndex(names, sort_alphabetically)
+    match_index = match_index_cache.get(cache_key)
+    if match_index is None or match_index.names != names:
+        match_index = match_index_cache[cache_key] = MatchIndex(names, sort_alphabetically)
+        if len(match_index_cache) > MATCH_INDEX_CACHE_SIZE:
+            match_index_cache.popitem(last=False)
+    match_index_cache.move_to_end(cache_key)
+    return match_index
+
+
+def rank_matches(cache_key: str, query: str, entries: Sequence[T], get_name: Callable[[T], str],
+                 limit: int = MAX_CHOICES, sort_alphabetically: bool = True) -> List[T]:
+    match_index = get_match_index(cache_key, [get_name(entry) for entry in entries], sort_alphabetically)
+    return [entries[position] for position in match_index.search(query or "", limit)]
@@ -3,6 +3,8 @@ from typing import Optional, List, Literal
 from discord import Guild
 from dom.data_model import Player, Action, Item, Game, ResourceDefinition, ResourceCost, Resource, AttributeDefinition, \
     Attribute
+from dom.resource_ledger import ResourceTransaction, LedgerEntry, TRANSACTION_TRANSFER
+from dom.action_queue import QueuedAction, UNPRIORITIZED
 import utils.string_decorator as sdec
 
 uses_to_emoji_map = {0: ":uses_zero:",
@@ -483,3 +485,82 @@ async def insufficient_resources_msg(action: Action, player: Player, game: Game,
     formatted_responses.append(await sdec.format_text(text=formatted_resources, guild=guild))
 
     return formatted_responses
+
+
+async def format_ledger_entry(entry: LedgerEntry, transaction: ResourceTransaction, game: Game) -> str:
+    res_def: ResourceDefinition = game.get_resource_definition_by_name(entry.resource_type)
+    applied_amt = entry.applied_amt if entry.applied_amt is not None else entry.amt
+    formatted_change = await format_resource(resource_amt=applied_amt, resource_definition=res_def) \
+        if res_def else f'{applied_amt} {entry.resource_type}'
+    formatted_entry = f'{"+" if applied_amt > 0 else ""}{formatted_change}'
+
+    # Transfers name the player on the other side
+    other_entries = [other for other in transaction.entries if other.player_id != entry.player_id]
+    if transaction.transaction_type == TRANSACTION_TRANSFER and other_entries:
+        other_player = game.get_player(other_entries[0].player_id)
+        other_name = other_player.player_discord_name if other_player else other_entries[0].player_id
+        formatted_entry += f' {"to" if applied_amt < 0 else "from"} {other_name}'
+    if entry.balance is not None:
+        formatted_entry += f' (now {entry.balance})'
+    return formatted_entry
+
+
+async def construct_resource_history_display(player: Player, transactions: List[ResourceTransaction], guild: Guild,
+                                             game: Game) -> List[str]:
+    formatted_responses = []
+
+    formatted_history_header = f'**Player {player.player_discord_name} Resource History as of <t:{int(time.time())}>**\n'
+    formatted_responses.append(formatted_history_header)
+
+    formatted_history = ""
+    for transaction in transactions:
+        reason = f' ({transaction.reason})' if transaction.reason else ""
+        for entry in transaction.entries:
+            if entry.player_id != player.player_id:
+                continue
+            this_formatted_entry = f'<t:{transaction.timestamp}:f> **{transaction.transaction_type}**{reason}: ' \
+                                   f'{await format_ledger_entry(entry, transaction, game)}\n'
+            if len(await sdec.format_text(text=formatted_history, guild=guild)) + len(
+                    await sdec.format_text(text=this_formatted_entry, guild=guild)) <= 1750:
+                formatted_history += this_formatted_entry
+            else:
+                formatted_responses.append(await sdec.format_text(text=formatted_history, guild=guild))
+                formatted_history = this_formatted_entry
+    if formatted_history:
+        formatted_responses.append(await sdec.format_text(text=formatted_history, guild=guild))
+    else:
+        formatted_responses.append(f'No resource changes have been recorded yet.')
+
+    return formatted_responses
+
+
+async def format_queued_action(queued_action: QueuedAction, game: Game) -> str:
+    queued_player = game.get_player(queued_action.player_id)
+    player_name = queued_player.player_discord_name if queued_player else queued_action.player_id
+    priority = f'priority {queued_action.action_priority}' if queued_action.action_priority != UNPRIORITIZED \
+        else 'no priority'
+    formatted_action = f'**{player_name}**: **{queued_action.action_name}** ({priority}, submitted ' \
+                       f'<t:{int(queued_action.submitted_at)}:R>)\n'
+    for target_label, target in zip(['First', 'Second', 'Third'], queued_action.targets):
+        if target:
+            formatted_action += f'    {target_label} Target/Choice: {target}\n'
+    if queued_action.request_details:
+        formatted_action += f'    Additional details: {queued_action.request_details}\n'
+    return formatted_action
+
+
+async def construct_action_queue_display(header: str, queued_actions: List[QueuedAction], game: Game) -> List[str]:
+    formatted_responses = []
+
+    formatted_queue = header
+    for position, queued_action in enumerate(queued_actions, start=1):
+        this_formatted_action = f'{position}. {await format_queued_action(queued_action, game)}'
+        if len(formatted_queue) + len(this_formatted_action) <= 1750:
+            formatted_queue += this_formatted_action
+        else:
+            formatted_responses.append(formatted_queue)
+            formatted_queue = this_formatted_action
+    if formatted_queue:
+        formatted_responses.append(formatted_queue)
+
+    return formatted_responses
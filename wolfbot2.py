@@ -1,57 +1,140 @@
 # wolfbot2.py
+import time
+import asyncio
 import discord
 import faulthandler
-from discord.ext import commands
 from discord import app_commands
-from bot_logging.logging_manager import logger, log_info
+from discord.ext import commands, tasks
+from bot_logging.logging_manager import logger, log_info, log_warning
+from bot_logging.metrics_manager import InstrumentedCommandTree, instrument_http_client, instrument_webhook_adapter, \
+    log_metrics_summary, record_error
+from bot_logging.loop_watchdog import LoopWatchdog
 from dom.conf_vars import ConfVars as Conf
+import dom.data_model as gdm
+from dom.game_state_manager import game_states, GuildNotConfiguredError
+from utils.command_sync import sync_guild_commands
 from cogs.action_views import ActionViewButtons
 from cogs.item_views import ItemViewButtons
+from cogs.emoji_manager import populate_guild_emojis
+from cogs import COG_EXTENSIONS
+
+PROCESS_START = time.perf_counter()
+
+
+class GameCommandTree(InstrumentedCommandTree):
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        # Failed checks, such as cooldowns, stop a command before it runs, so only errors raised by the command itself
+        # can have left the cached game part way through a change
+        if not isinstance(error, app_commands.CheckFailure):
+            game_states.discard_interaction_game(interaction)
+        if isinstance(error, app_commands.CommandInvokeError) and isinstance(error.original, GuildNotConfiguredError):
+            # Used where no game is routed; tell the user rather than logging a traceback
+            record_error("command", (interaction.data or {}).get("name", "unknown"), error)
+            if interaction.response.is_done():
+                await interaction.followup.send(str(error.original), ephemeral=True)
+            else:
+                await interaction.response.send_message(str(error.original), ephemeral=True)
+            return
+        await super().on_error(interaction, error)
+
 
 class WolfBot(commands.Bot):
     def __init__(self):
-        super().__init__(command_prefix='!', intents=discord.Intents.all(), help_command=None)
+        super().__init__(command_prefix='!', intents=discord.Intents.all(), help_command=None,
+                         tree_cls=GameCommandTree)
         self.synced = False
+        self.metrics_runner = None
+        self.loop_watchdog = LoopWatchdog(Conf.LOOP_LAG_THRESHOLD_MS, Conf.LOOP_STALL_DUMP_SECONDS)
         faulthandler.enable()
 
     async def setup_hook(self):
-        # await self.load_extension(f"cogs.test")
-        await self.load_extension(f"cogs.game_management")
-        await self.load_extension(f"cogs.player_management")
-        await self.load_extension(f"cogs.voting")
-        # await self.load_extension(f"cogs.dice_rolling")
-        await self.load_extension(f"cogs.resource_management")
-        # await self.load_extension(f"cogs.attribute_management")
-        await self.load_extension(f"cogs.action_item_management")
-        await self.load_extension(f"cogs.action_views")
-        await self.load_extension(f"cogs.item_views")
-        # await self.load_extension(f"cogs.stat_mod_views")
-        # await self.load_extension(f"cogs.persistent_view_management")
-        await self.load_extension(f"cogs.moderator_request_management")
-        await self.load_extension(f"cogs.emoji_manager")
-        guild = discord.Object(id=Conf.GUILD_ID)
-        self.tree.copy_global_to(guild=guild)
-        synced_app_commands = await self.tree.sync(guild=guild)
-        for command in synced_app_commands:
-            log_info(f'Synced command: {command.name}')
+        startup_timings: dict[str, float] = {}
+        instrument_http_client(self.http)
+        instrument_webhook_adapter()
+
+        phase_start = time.perf_counter()
+        # Clean up after any write that was interrupted by a crash before the games are read
+        game_states.recover_orphaned_writes()
+        startup_timings['recover writes'] = time.perf_counter() - phase_start
+
+        # Cogs do not depend on each other, so they are loaded together rather than one at a time
+        phase_start = time.perf_counter()
+        cog_timings = await asyncio.gather(*(self.timed_load_extension(cog) for cog in COG_EXTENSIONS))
+        startup_timings['load cogs'] = time.perf_counter() - phase_start
+
+        # Syncing is a rate limited API call, so it only happens when the command tree actually changed.
+        # Game state and emoji maps are warmed up alongside it rather than on the first command
+        phase_start = time.perf_counter()
+        await asyncio.gather(*(sync_guild_commands(self.tree, guild_id) for guild_id in game_states.guild_ids),
+                             game_states.preload_games(),
+                             *(self.prefetch_guild_emojis(guild_id) for guild_id in game_states.guild_ids))
+        startup_timings['sync and prefetch'] = time.perf_counter() - phase_start
+
+        self.unload_idle_games.start()
+        if Conf.WRITE_DURABILITY == 'batch':
+            self.sync_batched_writes.change_interval(seconds=Conf.WRITE_BATCH_INTERVAL)
+            self.sync_batched_writes.start()
+        self.log_command_metrics.change_interval(seconds=Conf.METRICS_LOG_INTERVAL)
+        self.log_command_metrics.start()
+        self.loop_watchdog.start()
+        if Conf.METRICS_PORT:
+            # Imported here so aiohttp's web server is only loaded when the endpoint is enabled
+            from bot_logging.metrics_server import start_metrics_server
+            self.metrics_runner = await start_metrics_server(self, Conf.METRICS_HOST, Conf.METRICS_PORT)
+
+        cog_report = ', '.join(f'{cog} {cog_time * 1000:.0f}ms' for cog, cog_time in cog_timings)
+        phase_report = ', '.join(f'{phase} {phase_time * 1000:.0f}ms' for phase, phase_time in startup_timings.items())
+        since_start = time.perf_counter() - PROCESS_START
+        log_info(f'Startup timings: {phase_report}; {since_start * 1000:.0f}ms since process start')
+        log_info(f'Cog load timings: {cog_report}')
+
+    async def timed_load_extension(self, extension: str) -> tuple[str, float]:
+        load_start = time.perf_counter()
+        await self.load_extension(extension)
+        return extension, time.perf_counter() - load_start
+
+    async def prefetch_guild_emojis(self, guild_id: int):
+        try:
+            guild = await self.fetch_guild(guild_id)
+        except discord.HTTPException as e:
+            log_warning(f'Could not prefetch emojis for guild {guild_id}; they will load on first use\n{e}')
+            return
+        await populate_guild_emojis(guild=guild)
 
     async def on_ready(self):
         await self.wait_until_ready()
         self.add_view(ActionViewButtons())
         self.add_view(ItemViewButtons())
         print(f"We have logged in as {self.user}.")
+        log_info(f'Ready {(time.perf_counter() - PROCESS_START) * 1000:.0f}ms after process start')
 
+    @tasks.loop(seconds=60)
+    async def unload_idle_games(self):
+        await game_states.unload_idle_games()
 
-bot = WolfBot()
+    @tasks.loop(seconds=5)
+    async def sync_batched_writes(self):
+        # Batched writes are otherwise only synced when a later write comes along, which an idle bot may never make
+        if gdm.pending_sync_paths:
+            gdm.sync_pending_writes()
 
+    @tasks.loop(seconds=900)
+    async def log_command_metrics(self):
+        # The first iteration runs immediately at startup, before there is anything to report
+        if self.log_command_metrics.current_loop > 0:
+            log_metrics_summary()
 
-@bot.event
-async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
-    if isinstance(error, app_commands.CommandOnCooldown):
-        await interaction.response.send_message(
-            f"Cooldown is in force, please wait for {round(error.retry_after)} seconds", ephemeral=True)
-    else:
-        raise error
+    async def close(self):
+        self.loop_watchdog.stop()
+        # Flush any loaded games, then any game writes still waiting on a batched fsync
+        await game_states.flush_all()
+        gdm.sync_pending_writes()
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+        await super().close()
+
+
+bot = WolfBot()
 
 
 def log_interaction_call(interaction: discord.Interaction):